@@ -9,7 +9,7 @@
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 from pathlib import Path
 
-from PyQt6.QtCore import QDir
+from PyQt6.QtCore import QDir, QStandardPaths
 
 
 def get_settings_file():
@@ -36,3 +36,8 @@ def get_icons_folder():
 
 def get_custom_column_lists_file():
     return Path(__file__).resolve().with_name("custom_column_lists.json")
+
+
+def get_package_cache_folder():
+    cache_folder = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)
+    return Path(cache_folder) / "aas_manager" / "package_snapshots"
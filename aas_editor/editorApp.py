@@ -20,7 +20,7 @@ from aas_editor.settings_dialog import SettingsDialog
 from aas_editor.widgets.compliance_tool import ComplianceToolDialog
 from aas_editor.widgets import AddressLine
 from aas_editor import design
-from aas_editor.models import DetailedInfoTable, PacksTable
+from aas_editor.models import DetailedInfoTable, PacksTable, StandardTable
 from aas_editor.utils.util import toggleStylesheet
 from aas_editor import dialogs
 from aas_editor.widgets.treeview import HeaderView
@@ -125,6 +125,8 @@ class EditorApp(QMainWindow, design.Ui_MainWindow):
         self.menuOpenRecent = QMenu("Open Recent", self.menuFile)
         for recentFileAct in self.mainTreeView.recentFileActs:
             self.menuOpenRecent.addAction(recentFileAct)
+        self.menuOpenRecent.addSeparator()
+        self.menuOpenRecent.addAction(self.mainTreeView.openAllRecentFilesAct)
         self.menuFile.addAction(self.menuOpenRecent.menuAction())
         self.mainTreeView.recentFilesSeparator = self.menuFile.addSeparator()
         self.mainTreeView.updateRecentFileActs()
@@ -257,6 +259,7 @@ class EditorApp(QMainWindow, design.Ui_MainWindow):
         if theme in self.themes:
             toggleStylesheet(self.themes[theme])
             self.currTheme = theme
+            StandardTable.resetStyles()
 
     def closeEvent(self, a0: QCloseEvent) -> None:
         if not self.packTreeModel.openedFiles():
@@ -268,7 +271,7 @@ class EditorApp(QMainWindow, design.Ui_MainWindow):
                                          QMessageBox.StandardButton.No)
 
             if reply == QMessageBox.StandardButton.Yes:
-                self.mainTreeView.saveAll()
+                self.mainTreeView.saveAll(wait=True)
                 a0.accept()
             elif reply == QMessageBox.StandardButton.No:
                 a0.accept()
@@ -287,15 +290,17 @@ class EditorApp(QMainWindow, design.Ui_MainWindow):
 
     def openLastSessionFiles(self):
         openedAasFiles = AppSettings.AAS_FILES_TO_OPEN_ON_START.value()
-        for file in openedAasFiles:
-            self.openAASFile(file)
+        for loader in self.mainTreeView.openPacks(openedAasFiles):
+            self._clearUndoAfterLoading(loader)
 
     def openAASFile(self, filePath: str):
-        try:
-            self.mainTreeView.openPack(filePath)
-        except OSError:
-            pass
-        self.packTreeModel.setData(QModelIndex(), [], UNDO_ROLE)
+        loader = self.mainTreeView.openPack(filePath)
+        if loader:
+            self._clearUndoAfterLoading(loader)
+
+    def _clearUndoAfterLoading(self, loader):
+        # package is added to the tree after reading, clear the undo entry of adding it
+        loader.finished.connect(lambda: self.packTreeModel.setData(QModelIndex(), [], UNDO_ROLE))
 
     def applyLastSessionTreeStates(self):
         packTreeViewHeader: HeaderView = self.mainTreeView.header()
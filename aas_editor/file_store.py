@@ -0,0 +1,370 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""
+Containers for supplementary files of packages without any Qt or GUI dependency.
+Contents of added files are kept on disk in a content addressed blob store shared by all packages.
+"""
+
+import atexit
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union, Optional, Dict, IO, Iterator, List, Tuple, Set
+
+import pyecma376_2
+from pyecma376_2.package_model import normalize_part_name
+from basyx.aas.adapter.aasx import DictSupplementaryFileContainer, AbstractSupplementaryFileContainer
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """
+    Content addressed store of file contents in a temporary folder. Blobs are keyed by their sha256
+    and reference counted, so identical files are stored once and removed when no longer used.
+    """
+
+    def __init__(self, folder: Union[str, Path, None] = None):
+        self.folder = Path(folder) if folder else Path(tempfile.mkdtemp(prefix="aas_manager_files_"))
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._refs: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+
+    def path(self, sha: bytes) -> Path:
+        return self.folder / sha.hex()
+
+    def add(self, file: IO[bytes]) -> bytes:
+        """Store the content of the stream and return its sha256, the caller holds one reference"""
+        sha = hashlib.sha256()
+        fd, tmpFile = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: file.read(COPY_BUFFER_SIZE), b""):
+                    sha.update(chunk)
+                    f.write(chunk)
+            digest = sha.digest()
+            with self._lock:
+                if digest in self._refs:
+                    os.remove(tmpFile)
+                else:
+                    os.replace(tmpFile, self.path(digest))
+                self._refs[digest] = self._refs.get(digest, 0) + 1
+        except BaseException:
+            if os.path.exists(tmpFile):
+                os.remove(tmpFile)
+            raise
+        return digest
+
+    def acquire(self, sha: bytes):
+        with self._lock:
+            if sha not in self._refs:
+                raise KeyError(sha)
+            self._refs[sha] += 1
+
+    def release(self, sha: bytes):
+        with self._lock:
+            refs = self._refs.get(sha, 0) - 1
+            if refs > 0:
+                self._refs[sha] = refs
+                return
+            self._refs.pop(sha, None)
+            try:
+                os.remove(self.path(sha))
+            except FileNotFoundError:
+                pass
+
+    def releaseAll(self, shas: List[bytes]):
+        for sha in shas:
+            self.release(sha)
+
+    def open(self, sha: bytes) -> IO[bytes]:
+        return open(self.path(sha), "rb")
+
+    def __contains__(self, sha: object) -> bool:
+        return sha in self._refs
+
+    def __len__(self):
+        return len(self._refs)
+
+    def size(self) -> int:
+        """Size of all stored blobs in bytes"""
+        return sum(self.path(sha).stat().st_size for sha in list(self._refs))
+
+    def clear(self):
+        with self._lock:
+            self._refs.clear()
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+
+_blobStore: Optional[BlobStore] = None
+_blobStoreLock = threading.Lock()
+
+
+def blobStore() -> BlobStore:
+    """Blob store shared by all packages of the process, removed at exit"""
+    global _blobStore
+    with _blobStoreLock:
+        if _blobStore is None:
+            _blobStore = BlobStore()
+            atexit.register(_blobStore.clear)
+        return _blobStore
+
+
+class BlobSupplementaryFileContainer(DictSupplementaryFileContainer):
+    """Supplementary file container which keeps only handles, the contents are stored in the shared blob store"""
+
+    def __init__(self):
+        super(BlobSupplementaryFileContainer, self).__init__()
+        self._initBlobRefs([])
+
+    def _initBlobRefs(self, blobRefs: List[bytes]):
+        # One reference per stored name, released when the container is garbage collected
+        self._blobRefs = blobRefs
+        weakref.finalize(self, blobStore().releaseAll, self._blobRefs)
+
+    def __getstate__(self):
+        # Blob store is local to the process, so the contents are pickled with the container
+        state = self.__dict__.copy()
+        del state["_blobRefs"]
+        blobs = {}
+        for sha in set(self._blobRefs):
+            with blobStore().open(sha) as f:
+                blobs[sha] = f.read()
+        state["_blobs"] = blobs
+        return state
+
+    def __setstate__(self, state):
+        blobs = state.pop("_blobs")
+        self.__dict__.update(state)
+        blobRefs = []
+        for name, (sha, contentType) in self._name_map.items():
+            blobRefs.append(blobStore().add(io.BytesIO(blobs[sha])))
+        self._initBlobRefs(blobRefs)
+
+    def __deepcopy__(self, memo):
+        # Contents are immutable, so a copy only needs new references to the blobs
+        cls = self.__class__
+        result = cls.__new__(cls)
+        memo[id(self)] = result
+        state = self.__dict__.copy()
+        del state["_blobRefs"]
+        result.__dict__.update(state)
+        result._name_map = dict(self._name_map)
+        for sha in self._blobRefs:
+            blobStore().acquire(sha)
+        result._initBlobRefs(list(self._blobRefs))
+        return result
+
+    def _addBlob(self, name: str, sha: bytes, contentType: str):
+        self._name_map[name] = (sha, contentType)
+        self._blobRefs.append(sha)
+
+    def _removeBlob(self, name: str):
+        sha, contentType = self._name_map.pop(name)
+        self._blobRefs.remove(sha)
+        blobStore().release(sha)
+
+    def add_file(self, name: str, file: IO[bytes], content_type: str) -> str:
+        sha = blobStore().add(file)
+        newName = name
+        i = 1
+        while newName in self:
+            if self.get_content_type(newName) == content_type and self.get_sha256(newName) == sha:
+                blobStore().release(sha)
+                return newName
+            newName = self._append_counter(name, i)
+            i += 1
+        self._addBlob(newName, sha, content_type)
+        return newName
+
+    def open(self, name: str) -> IO[bytes]:
+        """Open the file for reading, the returned stream must be closed"""
+        return blobStore().open(self._name_map[name][0])
+
+    def write_file(self, name: str, file: IO[bytes]) -> None:
+        with self.open(name) as f:
+            shutil.copyfileobj(f, file, COPY_BUFFER_SIZE)
+
+
+class ZipSupplementaryFileContainer(BlobSupplementaryFileContainer):
+    """
+    Supplementary files of an AASX package. Files of the archive are only indexed while reading
+    and are streamed from the archive on demand, added files are kept in the blob store.
+    """
+
+    def __init__(self, archive: Union[str, Path]):
+        super(ZipSupplementaryFileContainer, self).__init__()
+        self.archive = Path(archive)
+        # Maps names of files in the archive to their content type
+        self._entries: Dict[str, str] = {}
+        # sha256 of files in the archive, calculated on demand
+        self._hashes: Dict[str, bytes] = {}
+        self._indexing = False
+        self._reader: Optional[pyecma376_2.ZipPackageReader] = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = super(ZipSupplementaryFileContainer, self).__getstate__()
+        state["_reader"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        super(ZipSupplementaryFileContainer, self).__setstate__(state)
+        self._lock = threading.RLock()
+
+    def __deepcopy__(self, memo):
+        result = super(ZipSupplementaryFileContainer, self).__deepcopy__(memo)
+        result._entries = dict(self._entries)
+        result._hashes = dict(self._hashes)
+        result._reader = None
+        result._lock = threading.RLock()
+        return result
+
+    @contextmanager
+    def indexing(self):
+        """While indexing, added files are streams of the archive, so they are only indexed and not read"""
+        self._indexing = True
+        try:
+            yield self
+        finally:
+            self._indexing = False
+
+    def _zipReader(self) -> pyecma376_2.ZipPackageReader:
+        with self._lock:
+            if self._reader is None:
+                self._reader = pyecma376_2.ZipPackageReader(self.archive)
+            return self._reader
+
+    def close(self):
+        """Close the archive, it is opened again on demand"""
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def isArchived(self, name: str) -> bool:
+        return name in self._entries
+
+    def add_file(self, name: str, file: IO[bytes], content_type: str) -> str:
+        if self._indexing:
+            self._entries[name] = content_type
+            return name
+        # The container may be rebased by a background save at the same time
+        with self._lock:
+            return super(ZipSupplementaryFileContainer, self).add_file(name, file, content_type)
+
+    def get_content_type(self, name: str) -> str:
+        with self._lock:
+            if name in self._entries:
+                return self._entries[name]
+            return super(ZipSupplementaryFileContainer, self).get_content_type(name)
+
+    def get_sha256(self, name: str) -> bytes:
+        if name in self._entries:
+            if name not in self._hashes:
+                sha = hashlib.sha256()
+                with self.open(name) as f:
+                    for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+                        sha.update(chunk)
+                self._hashes[name] = sha.digest()
+            return self._hashes[name]
+        return super(ZipSupplementaryFileContainer, self).get_sha256(name)
+
+    def open(self, name: str) -> IO[bytes]:
+        with self._lock:
+            if name in self._entries:
+                return self._zipReader().open_part(name)
+            return super(ZipSupplementaryFileContainer, self).open(name)
+
+    def __contains__(self, item: object) -> bool:
+        with self._lock:
+            return item in self._entries or super(ZipSupplementaryFileContainer, self).__contains__(item)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            names = list(self._entries)
+            names.extend(super(ZipSupplementaryFileContainer, self).__iter__())
+        return iter(names)
+
+    def prepareRebase(self, archive: Union[str, Path], writtenArchive: Union[str, Path]) -> 'ArchiveRebase':
+        """
+        Prepare switching to the newly written archive, before it replaces the current one.
+        Files of the current archive, which are missing in the written one, are copied to the blob store.
+        The container itself is not changed, so this can be called on a snapshot in another thread.
+        :param writtenArchive: current location of the written archive, it is moved to archive afterwards
+        """
+        with pyecma376_2.ZipPackageReader(writtenArchive) as reader:
+            writtenParts = {normalize_part_name(name) for name, contentType in reader.list_parts()}
+        rebase = ArchiveRebase(archive, writtenParts)
+        with self._lock:
+            for name in self._entries:
+                if normalize_part_name(name) not in writtenParts:
+                    with self.open(name) as f:
+                        rebase.addMovedFile(name, blobStore().add(f))
+        return rebase
+
+    def rebase(self, rebase: 'ArchiveRebase'):
+        """Use the written archive as source of the files, must be called after it replaced the current one"""
+        with self._lock:
+            entries: Dict[str, str] = {}
+            hashes: Dict[str, bytes] = {}
+            for name in list(self):
+                contentType = self.get_content_type(name)
+                if normalize_part_name(name) in rebase.writtenParts:
+                    entries[name] = contentType
+                    if name in self._name_map:
+                        hashes[name] = self._name_map[name][0]
+                        self._removeBlob(name)
+                    elif name in self._hashes:
+                        hashes[name] = self._hashes[name]
+                elif name in self._entries:
+                    sha = rebase.movedFiles[name]
+                    blobStore().acquire(sha)
+                    self._addBlob(name, sha, contentType)
+
+            self.close()
+            self.archive = rebase.archive
+            self._entries = entries
+            self._hashes = hashes
+
+
+class ArchiveRebase:
+    """
+    Parts of a newly written archive and the files of the previous archive, which are missing in it and were
+    copied to the blob store. The blobs are released when the rebase is garbage collected.
+    """
+
+    def __init__(self, archive: Union[str, Path], writtenParts: Set[str]):
+        self.archive = Path(archive)
+        self.writtenParts = writtenParts
+        # Maps names of moved files to their sha256 in the blob store
+        self.movedFiles: Dict[str, bytes] = {}
+        self._blobRefs: List[bytes] = []
+        weakref.finalize(self, blobStore().releaseAll, self._blobRefs)
+
+    def addMovedFile(self, name: str, sha: bytes):
+        self.movedFiles[name] = sha
+        self._blobRefs.append(sha)
+
+
+def readSupplementaryFile(fileStore: AbstractSupplementaryFileContainer, name: str) -> bytes:
+    if isinstance(fileStore, BlobSupplementaryFileContainer):
+        with fileStore.open(name) as f:
+            return f.read()
+    fileContent = io.BytesIO()
+    fileStore.write_file(name, fileContent)
+    return fileContent.getvalue()
@@ -122,8 +122,10 @@ class ImportManageWidget(QWidget):
                 try:
                     aasFile = dialog.aasFileLine.text()
                     self.importApp.mainTreeView.closeAllFiles()
-                    ImportManageWidget.IMPORT_SETTINGS.mappingPackage = self.importApp.mainTreeView.openPack(aasFile)
+                    ImportManageWidget.IMPORT_SETTINGS.mappingPackage = self.importApp.mainTreeView.openPack(aasFile, wait=True)
                     self.importApp.packTreeModel.setData(QModelIndex(), [], settings.UNDO_ROLE)
+                    if not ImportManageWidget.IMPORT_SETTINGS.mappingPackage:
+                        continue
                 except Exception as e:
                     dialogs.ErrorMessageBox.withTraceback(self, f"Could not open AAS File: {e}").exec()
                     continue
@@ -27,17 +27,21 @@ from aas_editor.package import Package
 from aas_editor.settings import PACKAGE_ROLE
 from aas_editor.utils.util_classes import ClassesInfo
 from aas_editor.utils.util_type import isIterable
+from aas_editor.workers import PackageLoader
 
 
 class ImportTreeViewItem(PackTreeViewItem):
+    __slots__ = ()
+
     def __init__(self, obj, parent, **kwargs):
+        if isinstance(obj, PackageLoader):
+            PackTreeViewItem.__init__(self, obj, parent, **kwargs)
+            return
         StandardItem.__init__(self, obj, parent=parent, **kwargs)
-        if obj is None and parent is None:
-            self.child = []
-        elif isinstance(obj, Package):
+        if isinstance(obj, Package):
             self.typehint = Package
             self.package = obj
-        else:
+        elif parent is not None:
             self.package = parent.data(PACKAGE_ROLE)
 
         if isinstance(obj, Referable):
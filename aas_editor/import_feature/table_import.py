@@ -11,15 +11,15 @@ import copy
 import traceback
 from typing import Any
 
-from PyQt6.QtCore import QModelIndex, Qt, QPersistentModelIndex
+from PyQt6.QtCore import QModelIndex, Qt
 from basyx.aas.model import Referable
 
 from aas_editor.import_feature.import_settings import MAPPING_ATTR
 from aas_editor.import_feature.item_import_treeview import ImportTreeViewItem
 from aas_editor.import_feature.import_util_classes import PreObjectImport
-from aas_editor.models import PacksTable, PackTreeViewItem, SetDataItem
+from aas_editor.models import PacksTable, PackTreeViewItem
 from aas_editor.settings import ATTRIBUTE_COLUMN, OBJECT_ROLE, COLUMN_NAME_ROLE, EXTENDED_COLUMNS_IN_PACK_TABLE, \
-    ADD_ITEM_ROLE, CLEAR_ROW_ROLE, DATA_CHANGE_FAILED_ROLE
+    ADD_ITEM_ROLE, CLEAR_ROW_ROLE, DATA_CHANGE_FAILED_ROLE, ADD_ITEMS_ROLE
 
 
 class ImportTable(PacksTable):
@@ -47,6 +47,11 @@ class ImportTable(PacksTable):
         return super(ImportTable, self).data(index, role)
 
     def setData(self, index: QModelIndex, value: Any, role: int = ...) -> bool:
+        if role == ADD_ITEMS_ROLE and any(isinstance(obj, PreObjectImport) for obj in value):
+            # pre objects are initialized and mapped one by one
+            with self.transaction():
+                results = [self.setData(index, obj, ADD_ITEM_ROLE) for obj in value]
+            return all(results)
         try:
             preObject = None
             if isinstance(value, PreObjectImport):
@@ -66,11 +71,9 @@ class ImportTable(PacksTable):
 
             if preObject and result:
                 if role == Qt.ItemDataRole.EditRole:
-                    self.undo.pop()
-                    self.undo.append(SetDataItem(index=QPersistentModelIndex(index), value=preObject, role=role))
+                    self.undo.append(self.undo.pop()._replace(value=preObject))
                 elif role == CLEAR_ROW_ROLE:
-                    self.undo.pop()
-                    self.undo.append(SetDataItem(index=QPersistentModelIndex(index), value=preObject, role=ADD_ITEM_ROLE))
+                    self.undo.append(self.undo.pop()._replace(value=preObject, role=ADD_ITEM_ROLE))
 
             return result
         except Exception as e:
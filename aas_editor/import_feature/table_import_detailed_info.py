@@ -18,15 +18,15 @@
 
 from typing import Any, List
 
-from PyQt6.QtCore import QModelIndex, QPersistentModelIndex, Qt
+from PyQt6.QtCore import QModelIndex, Qt
 from PyQt6.QtGui import QFont
 from basyx.aas.model import Referable
 
 from aas_editor.import_feature.import_settings import MAPPING_ATTR
 from aas_editor.import_feature.import_util_classes import PreObjectImport
-from aas_editor.models import DetailedInfoItem, DetailedInfoTable, SetDataItem
+from aas_editor.models import DetailedInfoItem, DetailedInfoTable, ItemHandle
 from aas_editor.settings.app_settings import PACKAGE_ROLE, NAME_ROLE, OBJECT_ROLE, DEFAULT_COLUMNS_IN_DETAILED_INFO, \
-    DEFAULT_FONT, COLUMN_NAME_ROLE, ADD_ITEM_ROLE, CLEAR_ROW_ROLE, PARENT_OBJ_ROLE
+    DEFAULT_FONT, COLUMN_NAME_ROLE, ADD_ITEM_ROLE, CLEAR_ROW_ROLE, PARENT_OBJ_ROLE, ADD_ITEMS_ROLE
 
 MAPPING_COLUMN_NAME = "mapping"
 
@@ -35,11 +35,12 @@ class DetailedInfoImportTable(DetailedInfoTable):
     currFont = QFont(DEFAULT_FONT)
 
     def __init__(self, packItem: QModelIndex):
-        self.packItem = QPersistentModelIndex(packItem)
+        self.packItem = ItemHandle.ofIndex(packItem)
         self.mainObj = packItem.data(OBJECT_ROLE)
         self.package = packItem.data(PACKAGE_ROLE)
         root = DetailedInfoItem(self.mainObj, name=packItem.data(NAME_ROLE),
                                 package=self.package, new=False)
+        root.populate()
         columns = (*DEFAULT_COLUMNS_IN_DETAILED_INFO, MAPPING_COLUMN_NAME)
         super(DetailedInfoTable, self).__init__(columns, root)
 
@@ -84,6 +85,11 @@ class DetailedInfoImportTable(DetailedInfoTable):
         return super().data(index, role)
 
     def setData(self, index: QModelIndex, value: Any, role: int = ...) -> bool:
+        if role == ADD_ITEMS_ROLE and any(isinstance(obj, PreObjectImport) for obj in value):
+            # pre objects are initialized and mapped one by one
+            with self.transaction():
+                results = [self.setData(index, obj, ADD_ITEM_ROLE) for obj in value]
+            return all(results)
         preObject = None
         if isinstance(value, PreObjectImport):
             preObject = value
@@ -101,10 +107,8 @@ class DetailedInfoImportTable(DetailedInfoTable):
 
         if preObject and result:
             if role == Qt.ItemDataRole.EditRole:
-                self.undo.pop()
-                self.undo.append(SetDataItem(index=QPersistentModelIndex(index), value=preObject, role=role))
+                self.undo.append(self.undo.pop()._replace(value=preObject))
             elif role == CLEAR_ROW_ROLE:
-                self.undo.pop()
-                self.undo.append(SetDataItem(index=QPersistentModelIndex(index), value=preObject, role=ADD_ITEM_ROLE))
+                self.undo.append(self.undo.pop()._replace(value=preObject, role=ADD_ITEM_ROLE))
 
         return result
@@ -40,7 +40,8 @@ class KwargPackage(Package):
 
     def add(self, obj):
         if isinstance(obj, StoredFile):
-            newName = self.fileStore.add_file(name=obj.name, file=obj.file(), content_type=obj.content_type)
+            with obj.file() as file:
+                newName = self.fileStore.add_file(name=obj.name, file=file, content_type=obj.content_type)
             obj.setFileStore(newName, self.fileStore)
         else:
             self._objStore.append(obj)
@@ -21,6 +21,7 @@
 from .item_standard import *
 from .item_detailed_info import *
 from .item_pack_treeview import *
+from .item_handle import *
 from .table_standard import *
 from .table_detailed_info import *
 from .table_packs import *
@@ -18,7 +18,7 @@
 
 from aas_editor.models import StandardItem
 from aas_editor import settings
-from aas_editor.settings import DICT_TYPES
+from aas_editor.settings import DICT_TYPES, NOT_GIVEN
 from aas_editor.utils.util import getAttrs4detailInfo
 from aas_editor.utils.util_type import getTypeName, isSimpleIterable
 from aas_editor.additional.classes import DictItem
@@ -26,17 +26,36 @@ from aas_editor.package import Package
 
 
 class DetailedInfoItem(StandardItem):
+    __slots__ = ()
+
     def __init__(self, obj, name="", parent=None, package: Package = None, **kwargs):
         super().__init__(obj, name, parent, **kwargs)
         if parent and not package:
             self.package = parent.data(settings.PACKAGE_ROLE)
         else:
             self.package = package
-        self.populate()
+        # children are populated on expand, see StandardTable.fetchMore()
+        self.populated = False
+
+    def _isNotToPopulate(self) -> bool:
+        return isinstance(self.obj, settings.TYPES_WITH_INSTANCES_NOT_TO_POPULATE) \
+            or type(self.obj) in settings.TYPES_NOT_TO_POPULATE
+
+    def hasChildItems(self) -> bool:
+        if self.populated:
+            return super(DetailedInfoItem, self).hasChildItems()
+        if self._isNotToPopulate():
+            return False
+        if isinstance(self.obj, DICT_TYPES) or isSimpleIterable(self.obj):
+            try:
+                return len(self.obj) > 0
+            except TypeError:
+                return next(iter(self.obj), NOT_GIVEN) is not NOT_GIVEN
+        return bool(getAttrs4detailInfo(self.obj))
 
     def populate(self):
-        if isinstance(self.obj, settings.TYPES_WITH_INSTANCES_NOT_TO_POPULATE) \
-                or type(self.obj) in settings.TYPES_NOT_TO_POPULATE:
+        self.populated = True
+        if self._isNotToPopulate():
             return
 
         kwargs = {
@@ -0,0 +1,81 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import weakref
+from typing import Tuple, Optional
+
+from PyQt6.QtCore import QModelIndex, QSortFilterProxyModel
+
+from aas_editor.models.item_standard import StandardItem
+
+
+class ItemHandle:
+    """
+    Long-lived reference to an item of a StandardTable, resolved to an index on demand. Unlike
+    QPersistentModelIndex it is not updated by the model on row changes. If the item was replaced,
+    e.g. by an update or undo, the item with the same names on the path from the root is used.
+    The item is referred weakly, so handles kept e.g. in undo journals don't keep removed subtrees alive.
+    """
+    __slots__ = ("model", "_itemRef", "path", "column", "proxies")
+
+    def __init__(self, model, item: StandardItem, path: Tuple[Tuple[int, str], ...], column: int = 0,
+                 proxies: Tuple[QSortFilterProxyModel, ...] = ()):
+        """
+        :param path: (row, name) of the item and its ancestors from the root
+        :param proxies: proxy models from the source model outwards, the index is mapped through them
+        """
+        self.model = model
+        self.item = item
+        self.path = path
+        self.column = column
+        self.proxies = proxies
+
+    @property
+    def item(self) -> Optional[StandardItem]:
+        return self._itemRef() if self._itemRef is not None else None
+
+    @item.setter
+    def item(self, item: Optional[StandardItem]):
+        self._itemRef = weakref.ref(item) if item is not None else None
+
+    @classmethod
+    def ofIndex(cls, index: QModelIndex) -> 'ItemHandle':
+        """Return a handle of the index of a StandardTable or of a proxy model of it"""
+        proxies = []
+        while isinstance(index.model(), QSortFilterProxyModel):
+            proxies.append(index.model())
+            index = index.model().mapToSource(index)
+        if index.model() is None:
+            return cls(None, None, ())
+        handle = index.model().itemHandle(index)
+        handle.proxies = tuple(reversed(proxies))
+        return handle
+
+    def index(self) -> QModelIndex:
+        """Return the current index of the item, invalid if it was removed or for the root"""
+        index = self._sourceIndex()
+        for proxy in self.proxies:
+            index = proxy.mapFromSource(index)
+        return index
+
+    def _sourceIndex(self) -> QModelIndex:
+        if self.model is None:
+            return QModelIndex()
+        item = self.item
+        if not self.model.isInModel(item):
+            item = self.model.itemAtPath(self.path)
+            if item is None:
+                return QModelIndex()
+            self.item = item
+        index = self.model.indexOfItem(item)
+        return index.siblingAtColumn(self.column) if self.column else index
+
+    def isValid(self) -> bool:
+        return self.index().isValid()
@@ -20,41 +20,71 @@ from types import GeneratorType
 from basyx.aas.adapter.aasx import DictSupplementaryFileContainer
 
 from aas_editor.models import StandardItem
+from aas_editor.settings import NOT_GIVEN
 from aas_editor.settings.app_settings import PACKAGE_ROLE, ATTRIBUTE_COLUMN
 from aas_editor.utils.util_classes import ClassesInfo
 from aas_editor.utils.util_type import isIterable
 from aas_editor.package import Package, StoredFile
+from aas_editor.workers import PackageLoader
 
 
 class PackTreeViewItem(StandardItem):
+    __slots__ = ()
+
     def __init__(self, obj, parent, **kwargs):
+        if isinstance(obj, PackageLoader):
+            # placeholder row for a package which is still being read
+            kwargs["typehint"] = PackageLoader
         super().__init__(obj, parent=parent, **kwargs)
-        if obj is None and parent is None:
-            self.child = []
+        if isinstance(obj, PackageLoader):
+            return
         elif isinstance(obj, Package):
             self.typehint = Package
             self.package = obj
-        else:
+        elif parent is not None:
             self.package = parent.data(PACKAGE_ROLE)
-        self.populate()
+        # children are populated on expand, see StandardTable.fetchMore()
+        self.populated = obj is None
 
     def populate(self):
+        self.populated = True
         kwargs = {
             "parent": self,
             "new": self.new,
         }
-        if ClassesInfo.hasPackViewAttrs(type(self.obj)):
-            for attr in ClassesInfo.packViewAttrs(type(self.obj)):
+        obj = self._populationObj()
+        if ClassesInfo.hasPackViewAttrs(type(obj)):
+            for attr in ClassesInfo.packViewAttrs(type(obj)):
                 # set package objStore as obj, so that delete works
-                itemObj = getattr(self.obj, attr)
+                itemObj = getattr(obj, attr)
                 packItem = PackTreeViewItem(itemObj, name=attr, **kwargs)
                 if isinstance(itemObj, GeneratorType):
-                    packItem.obj = self.obj.objStore
-        elif isIterable(self.obj):
-            if isinstance(self.obj, DictSupplementaryFileContainer):
-                self._populateFileContainer(self.obj, **kwargs)
+                    packItem.obj = obj.objStore
+        elif isIterable(obj):
+            if isinstance(obj, DictSupplementaryFileContainer):
+                self._populateFileContainer(obj, **kwargs)
             else:
-                self._populateIterable(self.obj, **kwargs)
+                self._populateIterable(obj, **kwargs)
+
+    def _populationObj(self):
+        """Return the object to populate from, for attributes of the package view it is got again from its parent"""
+        parentObj = self.parentObj
+        if self.objName and self.objName in ClassesInfo.packViewAttrs(type(parentObj)):
+            return getattr(parentObj, self.objName)
+        return self.obj
+
+    def hasChildItems(self) -> bool:
+        if self.populated:
+            return super(PackTreeViewItem, self).hasChildItems()
+        obj = self._populationObj()
+        if ClassesInfo.hasPackViewAttrs(type(obj)):
+            return bool(ClassesInfo.packViewAttrs(type(obj)))
+        elif isIterable(obj):
+            try:
+                return len(obj) > 0
+            except TypeError:
+                return next(iter(obj), NOT_GIVEN) is not NOT_GIVEN
+        return False
 
     @staticmethod
     def _populateIterable(obj, **kwargs):
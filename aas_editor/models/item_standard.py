@@ -16,14 +16,15 @@
 #
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 
-import io
 import logging
 from collections import namedtuple
+from typing import Dict, Tuple, Any, Optional
 
 from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import QObject, QVariant
+from PyQt6.QtCore import QVariant
 
 from aas_editor.package import StoredFile
+from aas_editor.file_store import readSupplementaryFile
 from aas_editor import settings
 from aas_editor.utils.util import getAttrDoc, simplifyInfo, getLimitStr
 from aas_editor.utils.util_type import checkType, getTypeName, getTypeHintName, isIterable, \
@@ -35,26 +36,96 @@ from aas_editor.utils.util_classes import ClassesInfo
 MediaContent = namedtuple("MediaContent", ("value", "content_type"))
 
 
-class StandardItem(QObject):
+# Tables of data, which only depend on the type of the item object, shared by all items
+_typeNames: Dict[type, str] = {}
+_typeIcons: Dict[type, QIcon] = {}
+_attrDocs: Dict[Tuple[type, str], str] = {}
+_typehintNames: Dict[Any, str] = {}
+
+
+def typeNameOf(objType: type) -> str:
+    try:
+        return _typeNames[objType]
+    except KeyError:
+        name = _typeNames[objType] = getTypeName(objType)
+        return name
+
+
+def iconOf(objType: type) -> QIcon:
+    try:
+        return _typeIcons[objType]
+    except KeyError:
+        pass
+    icon = QIcon()
+    if issubclass(objType, StoredFile):
+        content_type: str = settings.MEDIA_TYPES_INFOS.get(
+            objType, {settings.CONTENT_TYPE_ATTR: "N\A"})[settings.CONTENT_TYPE_ATTR]
+        icon = QIcon(settings.MIME_TYPE_ICON_DICT.get(content_type, settings.FILE_ICON))
+    elif objType in settings.TYPE_ICON_DICT:
+        icon = QIcon(settings.TYPE_ICON_DICT[objType])
+    else:
+        for cls in settings.TYPE_ICON_DICT:
+            if issubclass(objType, cls):
+                icon = QIcon(settings.TYPE_ICON_DICT[cls])
+    _typeIcons[objType] = icon
+    return icon
+
+
+def attrDocOf(attr: str, parentObj) -> str:
+    if parentObj is None:
+        return getAttrDoc(attr, parentObj)
+    key = (type(parentObj), attr)
+    try:
+        return _attrDocs[key]
+    except KeyError:
+        doc = _attrDocs[key] = getAttrDoc(attr, parentObj)
+        return doc
+
+
+def typehintNameOf(typehint) -> str:
+    try:
+        return _typehintNames[typehint]
+    except (KeyError, TypeError):
+        pass
+    try:
+        name = getTypeHintName(typehint)
+    except TypeError as e:
+        logging.exception(e)
+        name = str(typehint)
+    try:
+        _typehintNames[typehint] = name
+    except TypeError:
+        pass
+    return name
+
+
+class StandardItem:
+    """
+    Node of the tree models. Items are kept small, as there is one per element of a package:
+    data depending only on types is kept in shared tables and children are kept in a plain list.
+    """
+    __slots__ = ("new", "changed", "typecheck", "package", "populated",
+                 "_obj", "_objName", "_typehint", "_parent", "_childItems", "_firstDirtyRow", "_row", "__weakref__")
+
     def __init__(self, obj, name=None, parent=None, new=True, typehint=None):
-        super().__init__(parent)
+        self._parent = parent
+        # Child items and their cached rows, rows from _firstDirtyRow on must be recalculated
+        self._childItems = []
+        self._firstDirtyRow = 0
+        self._row = 0
+        # Items which populate their children lazily set it to False until populate() is called
+        self.populated = True
+        self.package = None
+        if isinstance(parent, StandardItem):
+            parent._appendChild(self)
         self.new = new
         self.changed = False
-
-        # following attrs will be set during self.obj = obj
         self.typecheck = None
-        self.doc = None
-        self.icon = QIcon()
 
         self._obj = obj
-        self.objTypeName = getTypeName(type(self.obj))
-        self.updateIcon()
-
         self.objName = name
-        self.doc = getAttrDoc(self.objName, self.parentObj)
 
         self.typehint = typehint if typehint else self.getTypeHint()
-        self.typecheck = checkType(self.obj, self.typehint)
 
     def __str__(self):
         return f"{getTypeName(type(self))}: {self.data(Qt.ItemDataRole.DisplayRole)}"
@@ -65,12 +136,6 @@ class StandardItem(QObject):
 
     @property
     def obj(self):
-        # try:
-        #     obj = getattr(self.parentObj, self.objName)
-        #     if not isinstance(obj, GeneratorType):
-        #         return obj
-        # except (TypeError, AttributeError):
-        #     pass
         return self._obj
 
     @obj.setter
@@ -80,9 +145,6 @@ class StandardItem(QObject):
             self.typecheck = checkType(self.obj, self.typehint)
         except AttributeError:
             pass
-        self.objTypeName = getTypeName(type(self.obj))
-        self.updateIcon()
-        self.doc = getAttrDoc(self.objName, self.parentObj)
 
     @property
     def objName(self) -> str:
@@ -91,7 +153,18 @@ class StandardItem(QObject):
     @objName.setter
     def objName(self, value):
         self._objName = value
-        self.doc = getAttrDoc(self.objName, self.parentObj)
+
+    @property
+    def objTypeName(self) -> str:
+        return typeNameOf(type(self.obj))
+
+    @property
+    def icon(self) -> QIcon:
+        return iconOf(type(self.obj))
+
+    @property
+    def doc(self) -> str:
+        return attrDocOf(self.objName, self.parentObj)
 
     @property
     def objectName(self) -> str:
@@ -114,28 +187,10 @@ class StandardItem(QObject):
     def typehint(self, value):
         self._typehint = value
         self.typecheck = checkType(self.obj, self.typehint)
-        self.updateTypehintName()
 
-    def updateTypehintName(self):
-        try:
-            self.typehintName = getTypeHintName(self.typehint)
-        except TypeError as e:
-            logging.exception(e)
-            self.typehintName = str(self.typehint)
-
-    def updateIcon(self):
-        if isinstance(self.obj, StoredFile):
-            self.obj: StoredFile
-            content_type: str = settings.MEDIA_TYPES_INFOS.get(
-                type(self.obj),{settings.CONTENT_TYPE_ATTR: "N\A"})[settings.CONTENT_TYPE_ATTR]
-            self.icon = QIcon(settings.MIME_TYPE_ICON_DICT.get(content_type, settings.FILE_ICON))
-        else:
-            try:
-                self.icon = QIcon(settings.TYPE_ICON_DICT[type(self.obj)])
-            except KeyError:
-                for cls in settings.TYPE_ICON_DICT:
-                    if isinstance(self.obj, cls):
-                        self.icon = QIcon(settings.TYPE_ICON_DICT[cls])
+    @property
+    def typehintName(self) -> str:
+        return typehintNameOf(self.typehint)
 
     def data(self, role, column=settings.ATTRIBUTE_COLUMN, column_name=""):
         # custom roles
@@ -231,8 +286,16 @@ class StandardItem(QObject):
         tooltip = getLimitStr(tooltip)
         return tooltip if tooltip else QVariant()
 
-    def setParent(self, a0: 'QObject') -> None:
-        super().setParent(a0)
+    def parent(self) -> Optional['StandardItem']:
+        return self._parent
+
+    def setParent(self, a0: Optional['StandardItem']) -> None:
+        oldParent = self._parent
+        if isinstance(oldParent, StandardItem):
+            oldParent._removeChild(self)
+        self._parent = a0
+        if isinstance(a0, StandardItem):
+            a0._appendChild(self)
         if a0 is None:
             return
         if a0.data(settings.PACKAGE_ROLE):
@@ -251,12 +314,7 @@ class StandardItem(QObject):
     def isLink(self, column: int, column_name: str) -> bool:
         data = self._getEditRoleData(column, column_name)
         if self.package and isinstance(data, settings.LINK_TYPES):
-            try:
-                data.resolve(self.package.objStore)
-                return True
-            except (AttributeError, KeyError, NotImplementedError, TypeError, IndexError) as e:
-                logging.exception(e)
-                return False
+            return self.package.resolveLink(data) is not None
         return False
 
     @property
@@ -271,11 +329,53 @@ class StandardItem(QObject):
         return isinstance(value, str) and value.startswith(("http", "www."))
 
     def row(self):
-        if self.parent():
-            return self.parent().children().index(self)
+        parent = self._parent
+        if parent is not None:
+            return parent.childRow(self)
         else:
             return 0
 
+    def children(self):
+        return list(self._childItems)
+
+    def child(self, row: int) -> 'StandardItem':
+        return self._childItems[row]
+
+    def childCount(self) -> int:
+        return len(self._childItems)
+
+    def canPopulate(self) -> bool:
+        """Return True if the children of the item are not populated yet"""
+        return not self.populated
+
+    def hasChildItems(self) -> bool:
+        """Return True if the item has or will have children after populating, without populating them"""
+        return bool(self._childItems)
+
+    def childRow(self, child: 'StandardItem') -> int:
+        if child._row >= self._firstDirtyRow:
+            for row in range(self._firstDirtyRow, len(self._childItems)):
+                self._childItems[row]._row = row
+            self._firstDirtyRow = len(self._childItems)
+        return child._row
+
+    def _appendChild(self, child: 'StandardItem'):
+        if self._firstDirtyRow == len(self._childItems):
+            self._firstDirtyRow += 1
+        child._row = len(self._childItems)
+        self._childItems.append(child)
+
+    def _removeChild(self, child: 'StandardItem'):
+        row = self.childRow(child)
+        del self._childItems[row]
+        self._firstDirtyRow = min(self._firstDirtyRow, row)
+
+    def _removeChildren(self, row: int, count: int):
+        for child in self._childItems[row:row + count]:
+            child._parent = None
+        del self._childItems[row:row + count]
+        self._firstDirtyRow = min(self._firstDirtyRow, row)
+
     def getTypeHint(self):
         attrTypehint = None
         attrName = self.data(settings.NAME_ROLE)
@@ -307,9 +407,7 @@ class StandardItem(QObject):
             if self.isUrlMedia or isinstance(content_value, bytes):
                 return MediaContent(content_value, content_type)
             elif isinstance(content_value, str) and content_value in self.package.fileStore:
-                file_content = io.BytesIO()
-                self.package.fileStore.write_file(content_value, file_content)
-                return MediaContent(file_content.getvalue(), content_type)
+                return MediaContent(readSupplementaryFile(self.package.fileStore, content_value), content_type)
             elif not content_value:
                 return MediaContent(b"Value is not given", "text/plain")
         return MediaContent(b"Media not found", "text/plain")
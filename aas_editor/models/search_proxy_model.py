@@ -19,7 +19,9 @@
 from typing import List, Any, Optional
 
 from PyQt6.QtCore import QSortFilterProxyModel, QModelIndex, Qt, \
-    QPersistentModelIndex, QObject, QAbstractItemModel, QRegularExpression
+    QObject, QAbstractItemModel, QRegularExpression
+
+from aas_editor.models.item_handle import ItemHandle
 
 
 class SearchProxyModel(QSortFilterProxyModel):
@@ -36,12 +38,17 @@ class SearchProxyModel(QSortFilterProxyModel):
                filterColumns: List[int],
                regExp: bool = True,
                filter: bool = False,
-               matchCase: bool = False) -> List[QPersistentModelIndex]:
+               matchCase: bool = False) -> List[ItemHandle]:
         foundItems = []
         if not pattern:
             self.show_all_items()
             return foundItems
 
+        # items which are not expanded yet must be searched too
+        fetchAll = getattr(self.sourceModel(), "fetchAll", None)
+        if fetchAll:
+            fetchAll()
+
         if matchCase:
             self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseSensitive)
         else:
@@ -55,15 +62,12 @@ class SearchProxyModel(QSortFilterProxyModel):
         for column in filterColumns:
             self.setFilterKeyColumn(column)
 
-            # save found items in column
+            # save found items in column, handles are mapped to the proxy after the filter is changed
             for index in self.iterItems():
-                srcIndex = self.mapToSource(index.siblingAtColumn(column))
-                foundItems.append(QPersistentModelIndex(srcIndex))
+                foundItems.append(ItemHandle.ofIndex(index.siblingAtColumn(column)))
 
         if not filter:
             self.show_all_items()
-
-        foundItems = [QPersistentModelIndex(self.mapFromSource(QModelIndex(i))) for i in foundItems]
         return foundItems
 
     def show_all_items(self):
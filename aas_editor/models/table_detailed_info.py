@@ -16,14 +16,16 @@
 #
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 
-from typing import Any
+import weakref
+from collections import OrderedDict
+from typing import Any, Type, Tuple, Set
 
-from PyQt6.QtCore import QModelIndex, QPersistentModelIndex
+from PyQt6.QtCore import QModelIndex, QSortFilterProxyModel
 from PyQt6.QtGui import QFont
 
-from aas_editor.models import DetailedInfoItem, StandardTable
+from aas_editor.models import DetailedInfoItem, StandardTable, StandardItem, ItemHandle
 from aas_editor.settings.app_settings import PACKAGE_ROLE, NAME_ROLE, OBJECT_ROLE, DEFAULT_COLUMNS_IN_DETAILED_INFO,\
-    PACK_ITEM_ROLE, DEFAULT_FONT
+    PACK_ITEM_ROLE, DEFAULT_FONT, MAX_CACHED_DETAIL_MODELS
 
 
 class DetailedInfoTable(StandardTable):
@@ -31,15 +33,122 @@ class DetailedInfoTable(StandardTable):
     currFont = QFont(DEFAULT_FONT)
 
     def __init__(self, packItem: QModelIndex):
-        self.packItem = QPersistentModelIndex(packItem)
+        self.packItem = ItemHandle.ofIndex(packItem)
         self.mainObj = packItem.data(OBJECT_ROLE)
         self.package = packItem.data(PACKAGE_ROLE)
         root = DetailedInfoItem(self.mainObj, name=packItem.data(NAME_ROLE),
                                 package=self.package, new=False)
+        # only the attributes of the object are populated, their children on expand
+        root.populate()
         super(DetailedInfoTable, self).__init__(DEFAULT_COLUMNS_IN_DETAILED_INFO, root)
 
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         if role == PACK_ITEM_ROLE:
-            return QModelIndex(self.packItem)
+            return self.packItem.index()
         else:
             return super(DetailedInfoTable, self).data(index, role)
+
+
+class DetailedInfoTableCache:
+    """
+    LRU cache of detail models of pack items, so that tabs showing the same item and the history navigation
+    reuse the models. Models are removed if the subtree of their pack item changes in the pack model.
+    """
+
+    def __init__(self, maxSize: int = MAX_CACHED_DETAIL_MODELS):
+        self.maxSize = maxSize
+        # (model class, pack item) -> model
+        self._models: OrderedDict[Tuple[Type[DetailedInfoTable], StandardItem], DetailedInfoTable] = OrderedDict()
+        self._watchedModels: Set[int] = set()
+
+    def model(self, treeModel: Type[DetailedInfoTable], packItem: QModelIndex) -> DetailedInfoTable:
+        srcPackItem = self._sourceIndex(packItem.siblingAtColumn(0))
+        if not srcPackItem.isValid():
+            return treeModel(packItem)
+
+        key = (treeModel, srcPackItem.internalPointer())
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key]
+
+        model = treeModel(packItem)
+        self._watch(srcPackItem.model())
+        self._watchDetails(model, ItemHandle.ofIndex(srcPackItem))
+        self._models[key] = model
+        while len(self._models) > self.maxSize:
+            self._models.popitem(last=False)
+        return model
+
+    @staticmethod
+    def _sourceIndex(index: QModelIndex) -> QModelIndex:
+        while isinstance(index.model(), QSortFilterProxyModel):
+            index = index.model().mapToSource(index)
+        return index
+
+    def _watch(self, packModel: StandardTable):
+        if id(packModel) in self._watchedModels:
+            return
+        self._watchedModels.add(id(packModel))
+        packModel.dataChanged.connect(
+            lambda topLeft, bottomRight, *args:
+            self.invalidate(packModel, topLeft.parent(), topLeft.row(), bottomRight.row()))
+        packModel.rowsInserted.connect(
+            lambda parent, first, last: self._onRowsChanged(packModel, parent, first, last))
+        packModel.rowsAboutToBeRemoved.connect(
+            lambda parent, first, last: self._onRowsChanged(packModel, parent, first, last))
+        packModel.modelReset.connect(self.clear)
+        packModel.destroyed.connect(lambda: self._watchedModels.discard(id(packModel)))
+
+    def _watchDetails(self, model: DetailedInfoTable, srcPackItem: ItemHandle):
+        """Edits in a detail model change the subtree of its pack item for the other cached models"""
+        # the slot is connected to the model's own signals, so it must not keep evicted models alive
+        modelRef = weakref.ref(model)
+
+        def onChanged(*args):
+            model = modelRef()
+            if model is None or model.fetching:
+                return
+            packItem = srcPackItem.index()
+            if not packItem.isValid():
+                return
+            self.invalidate(packItem.model(), packItem.parent(), packItem.row(), packItem.row(), exclude=model)
+        model.dataChanged.connect(onChanged)
+        model.rowsInserted.connect(onChanged)
+        model.rowsRemoved.connect(onChanged)
+
+    def _onRowsChanged(self, packModel: StandardTable, parent: QModelIndex, first: int, last: int):
+        if packModel.fetching:
+            # lazily populated rows are no change of the subtree
+            return
+        self.invalidate(packModel, parent, first, last)
+
+    def invalidate(self, packModel: StandardTable, parent: QModelIndex, first: int, last: int,
+                   exclude: DetailedInfoTable = None):
+        """Remove models of the changed rows, their descendants and ancestors"""
+        parentItem = packModel.objByIndex(parent)
+        ancestors = set()
+        item = parentItem
+        while item is not None:
+            ancestors.add(id(item))
+            item = item.parent()
+
+        for key in list(self._models):
+            if self._models[key] is exclude:
+                continue
+            item = key[1]
+            if id(item) in ancestors:
+                del self._models[key]
+                continue
+            while item is not None:
+                parentOfItem = item.parent()
+                if parentOfItem is parentItem:
+                    if first <= item.row() <= last:
+                        del self._models[key]
+                    break
+                item = parentOfItem
+
+    def clear(self):
+        self._models.clear()
+
+    def __len__(self):
+        return len(self._models)
@@ -18,6 +18,7 @@ from aas_editor.package import Package
 from aas_editor.settings.app_settings import PACKAGE_ROLE, DEFAULT_FONT, OPENED_PACKS_ROLE, OPENED_FILES_ROLE, \
     DEFAULT_COLUMNS_IN_PACKS_TABLE, OBJECT_ROLE, COLUMN_NAME_ROLE, NAME_ROLE
 from aas_editor.utils.util_classes import ClassesInfo
+from aas_editor.workers import PackageLoader
 
 
 class PacksTable(StandardTable):
@@ -56,7 +57,9 @@ class PacksTable(StandardTable):
             parentObj = index.data(OBJECT_ROLE)
             objName = index.data(COLUMN_NAME_ROLE)
             oldValue = getattr(parentObj, objName)
+            self._checkIdChange(index, parentObj, objName, value)
             setattr(parentObj, objName, value)
+            self._recordIdChange(index, parentObj, objName, oldValue)
             return value, oldValue
         else:
             return super().editItem(index, value)
@@ -83,7 +86,35 @@ class PacksTable(StandardTable):
             kwargs["new"] = False
         return kwargs
 
+    def addLoadingItem(self, loader: PackageLoader) -> QModelIndex:
+        """Add placeholder row for a package, which is being read, without undo entry"""
+        row = self.rowCount()
+        self.fetching = True
+        try:
+            self.beginInsertRows(QModelIndex(), row, row)
+            item = self.itemTyp(obj=loader, parent=self._rootItem, new=False)
+            self._indexItem(item)
+            self.endInsertRows()
+        finally:
+            self.fetching = False
+        return self.index(row)
+
+    def removeLoadingItem(self, loader: PackageLoader):
+        for row, item in enumerate(self._rootItem.children()):
+            if item.obj is loader:
+                self.fetching = True
+                try:
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    self._unindexItem(item)
+                    item.setParent(None)
+                    self.endRemoveRows()
+                finally:
+                    self.fetching = False
+                return
+
     def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if isinstance(index.data(OBJECT_ROLE), PackageLoader):
+            return Qt.ItemFlag.ItemIsEnabled
         flags = super().flags(index)
 
         if Qt.ItemFlag.ItemIsEditable & flags and not self._isEditable(index):
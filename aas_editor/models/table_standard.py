@@ -11,48 +11,87 @@
 import copy
 import logging
 import traceback
-from collections import namedtuple, deque
-from typing import Any, Iterable, Union, AbstractSet, List
+from collections import namedtuple, deque, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterable, Union, AbstractSet, List, Dict, Tuple, Optional, Type
 
 from PyQt6.QtCore import QAbstractItemModel, QVariant, QModelIndex, Qt, QItemSelection, QSize, \
-    QPersistentModelIndex
+    QPersistentModelIndex, QSortFilterProxyModel
 from PyQt6.QtGui import QFont
+from basyx.aas.model import Referable, Identifiable
 
-from aas_editor.models import StandardItem
+from aas_editor.models import StandardItem, ItemHandle
 from aas_editor.package import Package
+from aas_editor.undo_journal import UndoJournal, deepSizeOf
 from aas_editor.settings.app_settings import NAME_ROLE, OBJECT_ROLE, ATTRIBUTE_COLUMN, \
     VALUE_COLUMN, PACKAGE_ROLE, PACK_ITEM_ROLE, DEFAULT_FONT, ADD_ITEM_ROLE, CLEAR_ROW_ROLE, \
     DATA_CHANGE_FAILED_ROLE, IS_LINK_ROLE, TYPE_COLUMN, \
-    TYPE_CHECK_ROLE, TYPE_ROLE, UNDO_ROLE, REDO_ROLE, MAX_UNDOS, UPDATE_ROLE, TYPE_HINT_COLUMN, COLUMN_NAME_ROLE, \
-    LINKED_ITEM_ROLE, COPY_ROLE
+    TYPE_CHECK_ROLE, TYPE_ROLE, UNDO_ROLE, REDO_ROLE, UPDATE_ROLE, TYPE_HINT_COLUMN, COLUMN_NAME_ROLE, \
+    LINKED_ITEM_ROLE, COPY_ROLE, TRANSACTION_ROLE, ADD_ITEMS_ROLE, CLEAR_ROWS_ROLE, AppSettings
 from aas_editor.settings import NOT_GIVEN
 from aas_editor.settings.colors import LINK_BLUE, CHANGED_BLUE, NEW_GREEN
-from aas_editor.utils.util import actualizeAASParents
+from aas_editor.utils.util import actualizeAASParents, longestIncreasingSubsequence
 
 from aas_editor.utils.util_classes import ClassesInfo
 from aas_editor.additional.classes import DictItem
 from aas_editor.utils.util_type import isIterable
 
+# Command of the undo journal: setData(index, value, role) undoes an edit, index is an ItemHandle
 SetDataItem = namedtuple("SetDataItem", ("index", "value", "role"))
+# Estimated memory of an undo command without its value
+COMMAND_SIZE = 200
+# Columns with own fonts and colors, all other columns share the same style
+STYLED_COLUMNS = (ATTRIBUTE_COLUMN, TYPE_COLUMN, TYPE_HINT_COLUMN)
+# Objects of these types are not indexed by identity, as their instances are shared by many items
+UNINDEXED_TYPES = (type(None), bool, int, float, complex, str, bytes)
+# Roles of the strings, which are cached for the recently shown cells
+STRING_ROLES = (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole, Qt.ItemDataRole.StatusTipRole)
+# Max number of items per model, whose strings are cached
+MAX_ITEMS_WITH_CACHED_STRINGS = 2000
 
 
 class StandardTable(QAbstractItemModel):
     currFont = QFont(DEFAULT_FONT)
+    # Render styles shared by all models: (font, size, column, is link, new, changed) -> (font, color)
+    _styles: Dict[tuple, Tuple[QFont, Any]] = {}
+    _sizeHints: Dict[int, QSize] = {}
 
     def __init__(self, columns=("Item",), rootItem: StandardItem = None):
         super(StandardTable, self).__init__()
         self._rootItem = rootItem
         self._columns = columns
         self.lastErrorMsg = ""
-        self.undo: deque[SetDataItem] = deque(maxlen=MAX_UNDOS)
-        self.redo: List[SetDataItem] = []
+        self.undo: UndoJournal = self._newJournal()
+        self.redo: UndoJournal = self._newJournal()
         self.changedItems: List[QModelIndex] = []
+        # True while rows are inserted or removed, which are no edits of the user,
+        # e.g. lazily populated children or placeholders of packages being read
+        self.fetching = False
+        # Indexes of the created items for match(): id(obj) -> {id(item): item} and type(obj) -> {id(item): item}
+        self._itemsByObj: Dict[int, Dict[int, StandardItem]] = {}
+        self._itemsByType: Dict[Type, Dict[int, StandardItem]] = {}
+        # Keys the items are indexed under, as objects of items may be replaced: id(item) -> (type(obj), id(obj))
+        self._indexKeys: Dict[int, Tuple[Type, Optional[int]]] = {}
+        # Number of indexed items, whose children are not populated yet
+        self._numOfLazyItems = 0
+        # Nesting depth of transactions, undo entries of a transaction are collected apart and committed as one
+        self._transactionDepth = 0
+        self._outerUndo: UndoJournal = self.undo
+        # Edited items, which are updated once on commit: id(item) -> handle
+        self._pendingUpdates: Dict[int, ItemHandle] = {}
+        # LRU of the strings of recently shown items: id(item) -> {(role, column): string}
+        self._strings: OrderedDict[int, Dict[Tuple[int, int], Any]] = OrderedDict()
+        # the strings of changed cells are computed again, also if other models report the change
+        self.dataChanged.connect(self._onDataChanged)
+        self.modelReset.connect(self._strings.clear)
+        if rootItem is not None:
+            self._indexItem(rootItem)
 
     def index(self, row: int, column: int = 0, parent: QModelIndex = QModelIndex()) -> QModelIndex:
         if not self.hasIndex(row, column, parent):
             return QModelIndex()
         parentObj = self.objByIndex(parent)
-        return self.createIndex(row, column, parentObj.children()[row])
+        return self.createIndex(row, column, parentObj.child(row))
 
     def parent(self, child: QModelIndex) -> QModelIndex:
         if not child.isValid():
@@ -68,12 +107,10 @@ class StandardTable(QAbstractItemModel):
         if parentObj == self._rootItem or not parentObj:
             return QModelIndex()
 
-        grandParentObj = parentObj.parent()
-        row = grandParentObj.children().index(parentObj)
-        return self.createIndex(row, 0, parentObj)
+        return self.createIndex(parentObj.row(), 0, parentObj)
 
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
-        return len(self.objByIndex(parent).children())
+        return self.objByIndex(parent).childCount()
 
     def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
         return len(self._columns)
@@ -94,23 +131,223 @@ class StandardTable(QAbstractItemModel):
         return Qt.ItemFlag.ItemIsEditable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
 
     def hasChildren(self, parent: QModelIndex = ...) -> bool:
-        return True if self.rowCount(parent) else False
+        return self.objByIndex(parent).hasChildItems()
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return self.objByIndex(parent).canPopulate()
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        item = self.objByIndex(parent)
+        if not item.canPopulate():
+            return
+        item.populate()
+        if self._isIndexed(item):
+            self._numOfLazyItems -= 1
+        for child in item.children():
+            self._indexItem(child)
+        if not item.childCount():
+            return
+        # the row count is only known after populating, so the children are hidden until rows are announced
+        childItems, item._childItems = item._childItems, []
+        self.fetching = True
+        try:
+            self.beginInsertRows(parent, 0, len(childItems) - 1)
+            item._childItems = childItems
+            self.endInsertRows()
+        finally:
+            self.fetching = False
 
     def objByIndex(self, index: QModelIndex):
         if not index.isValid():
             return self._rootItem
         return index.internalPointer()
 
+    def indexOfItem(self, item: StandardItem) -> QModelIndex:
+        if item is self._rootItem:
+            return QModelIndex()
+        return self.createIndex(item.row(), 0, item)
+
+    def itemHandle(self, index: QModelIndex) -> ItemHandle:
+        """Return a handle of the item at index, which can be kept instead of a QPersistentModelIndex"""
+        item = self.objByIndex(index)
+        path = []
+        child = item
+        while child is not self._rootItem and child is not None:
+            path.append((child.row(), child.objectName))
+            child = child.parent()
+        return ItemHandle(self, item, tuple(reversed(path)), max(index.column(), 0))
+
+    def isInModel(self, item: StandardItem) -> bool:
+        while item is not None:
+            if item is self._rootItem:
+                return True
+            item = item.parent()
+        return False
+
+    def itemAtPath(self, path: Tuple[Tuple[int, str], ...]) -> Optional[StandardItem]:
+        """Return the item with the names of the path, the rows of the path are tried first"""
+        item = self._rootItem
+        for row, name in path:
+            self.fetchMore(self.indexOfItem(item))
+            if row < item.childCount() and item.child(row).objectName == name:
+                item = item.child(row)
+                continue
+            for child in item.children():
+                if child.objectName == name:
+                    item = child
+                    break
+            else:
+                return None
+        return item
+
+    @staticmethod
+    def _commandSize(command: SetDataItem, limit: int) -> int:
+        if command.role == TRANSACTION_ROLE:
+            return sum(StandardTable._commandSize(c, limit) for c in command.value)
+        return COMMAND_SIZE + deepSizeOf(command.value, limit)
+
+    def _newJournal(self, commands: Iterable[SetDataItem] = ()) -> UndoJournal:
+        maxBytes = AppSettings.UNDO_MAX_SIZE_MB.value() * 1024 * 1024
+        return UndoJournal(maxBytes, self._commandSize, commands)
+
+    def _indexItem(self, item: StandardItem, subtree=True):
+        """Add the item and the already created items of its subtree to the indexes"""
+        items = [item]
+        while items:
+            item = items.pop()
+            obj = item.obj
+            objId = None if isinstance(obj, UNINDEXED_TYPES) else id(obj)
+            keys = self._indexKeys.get(id(item))
+            if keys != (type(obj), objId):
+                if keys is not None:
+                    # the object of the item was replaced
+                    self._unindexItem(item, subtree=False)
+                self._strings.pop(id(item), None)
+                self._indexKeys[id(item)] = (type(obj), objId)
+                self._itemsByType.setdefault(type(obj), {})[id(item)] = item
+                if objId is not None:
+                    self._itemsByObj.setdefault(objId, {})[id(item)] = item
+                if item.canPopulate():
+                    self._numOfLazyItems += 1
+            if subtree:
+                items.extend(item._childItems)
+
+    def _unindexItem(self, item: StandardItem, subtree=True):
+        """Remove the item and its subtree from the indexes"""
+        items = [item]
+        while items:
+            item = items.pop()
+            if subtree:
+                items.extend(item._childItems)
+            self._strings.pop(id(item), None)
+            keys = self._indexKeys.pop(id(item), None)
+            if keys is None:
+                continue
+            typ, objId = keys
+            itemsOfType = self._itemsByType[typ]
+            del itemsOfType[id(item)]
+            if not itemsOfType:
+                del self._itemsByType[typ]
+            if objId is not None:
+                itemsOfObj = self._itemsByObj[objId]
+                del itemsOfObj[id(item)]
+                if not itemsOfObj:
+                    del self._itemsByObj[objId]
+            if item.canPopulate():
+                self._numOfLazyItems -= 1
+
+    def _isIndexed(self, item: StandardItem) -> bool:
+        return id(item) in self._indexKeys
+
+    def _itemsOf(self, obj) -> List[StandardItem]:
+        return [item for item in self._itemsByObj.get(id(obj), {}).values() if item.obj is obj]
+
+    def _itemsOfType(self, typ: Type) -> List[StandardItem]:
+        """Return the items of objects of typ or of its superclasses"""
+        items = []
+        for cls in getattr(typ, "__mro__", ()):
+            items.extend(item for item in self._itemsByType.get(cls, {}).values() if type(item.obj) is cls)
+        return items
+
+    @staticmethod
+    def _itemPath(item: StandardItem, ancestor: StandardItem) -> Optional[Tuple[int, ...]]:
+        """Return the rows from ancestor to item or None if item is not a descendant of ancestor"""
+        rows = []
+        while item is not ancestor:
+            parent = item.parent()
+            if parent is None:
+                return None
+            rows.append(parent.childRow(item))
+            item = parent
+        return tuple(reversed(rows))
+
+    def _fetchItemsOf(self, obj):
+        """Fetch the lazy children along the referable parents of obj, so that the items of obj are created"""
+        ancestors = []
+        while isinstance(obj, Referable):
+            ancestors.append(obj)
+            obj = obj.parent
+        parentItems = [self._rootItem]
+        for ancestor in reversed(ancestors):
+            items = self._itemsOf(ancestor)
+            for parentItem in parentItems:
+                if items:
+                    break
+                self._fetchContainers(parentItem, ancestor)
+                items = self._itemsOf(ancestor)
+            if not items:
+                return
+            parentItems = items
+
+    def _fetchContainers(self, item: StandardItem, obj):
+        """Fetch the children of item and of its descendants, which are no referables, until obj is found"""
+        items = deque([item])
+        while items and not self._itemsOf(obj):
+            item = items.popleft()
+            self.fetchMore(self.indexOfItem(item))
+            items.extend(child for child in item.children() if not isinstance(child.obj, Referable))
+
+    def _matchIndexed(self, start: QModelIndex, items: Iterable[StandardItem], hits: int) -> List[QModelIndex]:
+        """Return the indexes of the items under start in the order of the tree"""
+        startItem = self.objByIndex(start)
+        found = []
+        for item in items:
+            path = self._itemPath(item, startItem)
+            if path:
+                found.append((path, item))
+        found.sort(key=lambda pathAndItem: pathAndItem[0])
+        if isinstance(hits, int) and hits > 0:
+            found = found[:hits]
+        return [self.indexOfItem(item) for path, item in found]
+
+    def _matchScan(self, start: QModelIndex, matches, hits: int) -> List[QModelIndex]:
+        res = []
+        for item in self.iterItems(start):
+            try:
+                if matches(item):
+                    res.append(item)
+            except AttributeError:
+                continue
+            if hits == len(res):
+                break
+        return res
+
     def iterItems(self, parent: QModelIndex = QModelIndex()) -> QModelIndex:
         def recurse(parent: QModelIndex):
+            self.fetchMore(parent)
             for row in range(self.rowCount(parent)):
                 childIndex = self.index(row, 0, parent)
                 yield childIndex
                 child = self.objByIndex(childIndex)
-                if child.children():
+                if child.hasChildItems():
                     yield from recurse(childIndex)
         yield from recurse(parent)
 
+    def fetchAll(self, parent: QModelIndex = QModelIndex()):
+        """Populate all lazy children under parent"""
+        for _ in self.iterItems(parent):
+            pass
+
     def match(self, start: QModelIndex, role: int, value: Any, hits: int = ...,
               flags: Qt.MatchFlag = ...) -> List[QModelIndex]:
         kwargs = {}
@@ -120,51 +357,63 @@ class StandardTable(QAbstractItemModel):
             kwargs["flags"] = flags
 
         if role == OBJECT_ROLE and hits != 0:
-            res = []
-            for item in self.iterItems(start):
-                logging.info("match for: %s", item.data(NAME_ROLE))
-                try:
-                    if (item.data(OBJECT_ROLE) is value) or (item.data(OBJECT_ROLE) == value):
-                        res.append(item)
-                except AttributeError:
-                    continue
-                if hits == len(res):
-                    break
+            if isinstance(value, UNINDEXED_TYPES):
+                return self._matchScan(start, lambda item: item.data(OBJECT_ROLE) == value, hits)
+            res = self._matchIndexed(start, self._itemsOf(value), hits)
+            if not res:
+                self._fetchItemsOf(value)
+                res = self._matchIndexed(start, self._itemsOf(value), hits)
+            if not res and self._numOfLazyItems:
+                self.fetchAll(start)
+                res = self._matchIndexed(start, self._itemsOf(value), hits)
             return res
         elif role == TYPE_ROLE and hits != 0:
-            res = []
-            for item in self.iterItems(start):
-                logging.info("match for: %s", item.data(NAME_ROLE))
-                try:
-                    if issubclass(value, item.data(TYPE_ROLE)):
-                        res.append(item)
-                except AttributeError:
-                    continue
-                if hits == len(res):
-                    break
-            return res
+            if self._numOfLazyItems:
+                self.fetchAll(start)
+            return self._matchIndexed(start, self._itemsOfType(value), hits)
         elif role == Qt.ItemDataRole.DisplayRole and hits != 0:
-            res = []
-            for item in self.iterItems(start):
-                logging.info("match for: %s", item.data(NAME_ROLE))
-                try:
-                    if value == item.data(Qt.ItemDataRole.DisplayRole):
-                        res.append(item)
-                except AttributeError:
-                    continue
-                if hits == len(res):
-                    break
-            return res
+            return self._matchScan(start, lambda item: value == item.data(Qt.ItemDataRole.DisplayRole), hits)
         else:
             return super(StandardTable, self).match(start, role, value, **kwargs)
 
     def addItem(self, obj: Union[Package, 'SubmodelElement', Iterable],
                 parent: QModelIndex = QModelIndex()):
         parent = parent.siblingAtColumn(0)
+        # populate lazy children before, otherwise the new object would be populated twice
+        self.fetchMore(parent)
         self._addItemObjToParentObj(obj, parent)
         itemInitKwargs = self._getKwargsForItemInit(obj, parent)
         return self._addItem(parent, itemInitKwargs)
 
+    def addItems(self, objs: Iterable, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """
+        Add the objects to the parent object and their items in one block of rows with one undo entry.
+        Return the index of the first added item.
+        """
+        parent = parent.siblingAtColumn(0)
+        self.fetchMore(parent)
+        added = []
+        try:
+            for obj in objs:
+                self._addItemObjToParentObj(obj, parent)
+                added.append(obj)
+        finally:
+            # items of the already added objects must be created, even if adding of an object failed
+            if added:
+                firstIndex = self._addItems(parent, [self._getKwargsForItemInit(obj, parent) for obj in added])
+        return firstIndex if added else QModelIndex()
+
+    def _addItems(self, parent: QModelIndex, itemsInitKwargs: List[Dict[str, Any]]) -> QModelIndex:
+        first = self.rowCount(parent)
+        self.beginInsertRows(parent, first, first + len(itemsInitKwargs) - 1)
+        for itemInitKwargs in itemsInitKwargs:
+            self._indexItem(self.itemTyp(**itemInitKwargs))
+        self.endInsertRows()
+        self.undo.append(SetDataItem(index=self.itemHandle(parent), value=(first, len(itemsInitKwargs)),
+                                     role=CLEAR_ROWS_ROLE))
+        self.redo.clear()
+        return self.index(first, 0, parent)
+
     def _getKwargsForItemInit(self, obj: Union[Package, 'SubmodelElement', Iterable], parent):
         parentItem = self.objByIndex(parent)
         kwargs = {
@@ -174,7 +423,8 @@ class StandardTable(QAbstractItemModel):
         return kwargs
 
     def _addItemObjToParentObj(self, obj: Union[Package, 'SubmodelElement', Iterable], parent: QModelIndex):
-        parentObj = parent.data(OBJECT_ROLE)
+        # QModelIndex.data() converts lists to new lists, the object of the item must be changed
+        parentObj = self.objByIndex(parent).data(OBJECT_ROLE)
         if isinstance(parentObj, AbstractSet):
             parentObj.add(obj)
         elif isinstance(parentObj, list):
@@ -188,9 +438,10 @@ class StandardTable(QAbstractItemModel):
     def _addItem(self, parent: QModelIndex, itemInitKwargs):
         self.beginInsertRows(parent, self.rowCount(parent), self.rowCount(parent))
         item = self.itemTyp(**itemInitKwargs)
+        self._indexItem(item)
         self.endInsertRows()
         itemIndex = self.index(item.row(), 0, parent)
-        self.undo.append(SetDataItem(index=QPersistentModelIndex(itemIndex), value=NOT_GIVEN, role=CLEAR_ROW_ROLE))
+        self.undo.append(SetDataItem(index=self.itemHandle(itemIndex), value=NOT_GIVEN, role=CLEAR_ROW_ROLE))
         self.redo.clear()
         return itemIndex
 
@@ -199,37 +450,182 @@ class StandardTable(QAbstractItemModel):
         self.endInsertRows()
         return True
 
+    def beginTransaction(self):
+        """
+        Start a batch of edits. Edited items are updated once on commit()
+        and all edits of the batch are undone and redone as one step.
+        """
+        if not self._transactionDepth:
+            self._outerUndo = self.undo
+            self.undo = []
+        self._transactionDepth += 1
+
+    def commit(self):
+        """Finish the batch of edits started with beginTransaction()"""
+        self._transactionDepth -= 1
+        if self._transactionDepth:
+            return
+        try:
+            self._flushUpdates()
+        finally:
+            undos, self.undo = self.undo, self._outerUndo
+            if len(undos) == 1:
+                self.undo.append(undos[0])
+            elif undos:
+                self.undo.append(SetDataItem(index=self.itemHandle(QModelIndex()), value=undos, role=TRANSACTION_ROLE))
+
+    @contextmanager
+    def transaction(self):
+        self.beginTransaction()
+        try:
+            yield self
+        finally:
+            self.commit()
+
+    def _setChangedAndUpdate(self, index: QModelIndex):
+        self._invalidateStrings(index)
+        if self._transactionDepth:
+            self._pendingUpdates[id(self.objByIndex(index))] = self.itemHandle(index)
+        else:
+            self.setChanged(index)
+            self.update(index)
+
+    def _flushUpdates(self, index: Optional[QModelIndex] = None):
+        """Update the pending edited items, if index is given only the ancestors of its item"""
+        if not self._pendingUpdates:
+            return
+        if index is None:
+            pending = list(self._pendingUpdates.values())
+            self._pendingUpdates.clear()
+        else:
+            pending = []
+            item = self.objByIndex(index).parent()
+            while item is not None:
+                if id(item) in self._pendingUpdates:
+                    pending.append(self._pendingUpdates.pop(id(item)))
+                item = item.parent()
+        # update parents first, updated children may be removed by them
+        pending.sort(key=self._depth)
+        for handle in pending:
+            index = handle.index()
+            if index.isValid():
+                self.setChanged(index)
+                self.update(index)
+
+    @staticmethod
+    def _depth(handle: ItemHandle) -> int:
+        depth = 0
+        index = handle.index()
+        while index.isValid():
+            index = index.parent()
+            depth += 1
+        return depth
+
     def update(self, index: QModelIndex):
-        """Update item: remove all children rows, then add updated rows"""
+        """Update item: children of unchanged objects are kept, rows of the other children are removed and added"""
         if not index.isValid():
             return QVariant()
-        if self.hasChildren(index):
-            self.beginRemoveRows(index, 0, max(self.rowCount(index)-1, 0))
-            self.removeRows(0, self.rowCount(index), index)
-            self.endRemoveRows()
-            self.rowsRemoved.emit(index, 0, max(self.rowCount(index)-1, 0))
-            self.dataChanged.emit(index.siblingAtColumn(0),
-                                  index.model().index(self.rowCount(index) - 1, self.columnCount(index) - 1, index))
-
-        self.objByIndex(index).populate()
-        if self.hasChildren(index):
-            self.beginInsertRows(index, 0, max(self.rowCount(index)-1, 0))
+        self._invalidateStrings(index)
+        if self.canFetchMore(index):
+            # children are not populated yet, they are populated from the current object on expand
+            self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(self.columnCount() - 1))
+            return True
+
+        item = self.objByIndex(index)
+        oldChildren = item.children()
+        newChildren = self._populateAgain(item)
+        keptChildren = self._keptChildren(oldChildren, newChildren)
+        kept = {id(child) for child in keptChildren.values()}
+
+        # remove rows of children, which are not kept, from the last to the first
+        row = len(oldChildren) - 1
+        while row >= 0:
+            if id(oldChildren[row]) in kept:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and id(oldChildren[row]) not in kept:
+                row -= 1
+            self.removeRows(row + 1, last - row, index)
+
+        # insert rows of new children between the kept ones
+        row = 0
+        while row < len(newChildren):
+            if id(newChildren[row]) in keptChildren:
+                oldChild = keptChildren[id(newChildren[row])]
+                oldChild.objName = newChildren[row].objName
+                row += 1
+                continue
+            first = row
+            while row < len(newChildren) and id(newChildren[row]) not in keptChildren:
+                row += 1
+            self.beginInsertRows(index, first, row - 1)
+            item._childItems[first:first] = newChildren[first:row]
+            item._firstDirtyRow = min(item._firstDirtyRow, first)
+            for child in newChildren[first:row]:
+                self._indexItem(child)
             self.endInsertRows()
-            self.rowsInserted.emit(index, 0, max(self.rowCount(index)-1, 0))
-            self.dataChanged.emit(index.siblingAtColumn(0),
-                                  index.model().index(self.rowCount(index) - 1, self.columnCount(index) - 1, index))
-        else:
-            self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(self.columnCount()))
+
+        self.dataChanged.emit(index.siblingAtColumn(0), index.siblingAtColumn(self.columnCount() - 1))
+        if self.rowCount(index):
+            self.dataChanged.emit(self.index(0, 0, index),
+                                  self.index(self.rowCount(index) - 1, self.columnCount(index) - 1, index))
         return True
 
+    @staticmethod
+    def _populateAgain(item: StandardItem) -> List[StandardItem]:
+        """Return new children populated from the current object, the current children are not changed"""
+        childItems, firstDirtyRow = item._childItems, item._firstDirtyRow
+        item._childItems, item._firstDirtyRow = [], 0
+        try:
+            item.populate()
+            return item._childItems
+        finally:
+            item._childItems, item._firstDirtyRow = childItems, firstDirtyRow
+
+    @staticmethod
+    def _keptChildren(oldChildren: List[StandardItem],
+                      newChildren: List[StandardItem]) -> Dict[int, StandardItem]:
+        """
+        Match the new children to old children showing the same objects, preferably with the same names.
+        Return id(new child) -> old child, which is kept instead of it. Kept children keep their order.
+        """
+        oldRows = {id(child): row for row, child in enumerate(oldChildren)}
+        byObjAndName: Dict[Tuple[int, Any], deque] = {}
+        byObj: Dict[int, deque] = {}
+        for child in oldChildren:
+            byObjAndName.setdefault((id(child.obj), child.objName), deque()).append(child)
+            byObj.setdefault(id(child.obj), deque()).append(child)
+
+        matched: Dict[int, StandardItem] = {}
+        used = set()
+        for matchByName in (True, False):
+            for child in newChildren:
+                if id(child) in matched:
+                    continue
+                if matchByName:
+                    candidates = byObjAndName.get((id(child.obj), child.objName), ())
+                else:
+                    candidates = byObj.get(id(child.obj), ())
+                while candidates and id(candidates[0]) in used:
+                    candidates.popleft()
+                if candidates:
+                    oldChild = candidates.popleft()
+                    used.add(id(oldChild))
+                    matched[id(child)] = oldChild
+
+        # keep the longest run of matched children in the old order, the others are moved by removing and adding
+        rows = [oldRows[id(matched[id(child)])] for child in newChildren if id(child) in matched]
+        keptRows = set(longestIncreasingSubsequence(rows))
+        return {newId: oldChild for newId, oldChild in matched.items() if oldRows[id(oldChild)] in keptRows}
+
     def data(self, index: QModelIndex, role: int = ...) -> Any:
         if role == Qt.ItemDataRole.ForegroundRole:
             return self._getFgColor(index)
         if role == Qt.ItemDataRole.FontRole:
             return self._getFont(index)
         if role == Qt.ItemDataRole.SizeHintRole:
-            fontSize = self.currFont.pointSize()
-            return QSize(-1, int((fontSize+2)*1.9))
+            return self._getSizeHint()
         if role == Qt.ItemDataRole.TextAlignmentRole:
             return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
         if role == DATA_CHANGE_FAILED_ROLE:
@@ -262,66 +658,163 @@ class StandardTable(QAbstractItemModel):
                 self.lastErrorMsg = f"Error occurred copying {index.data(NAME_ROLE)}: {e}\n\n{tb}"
                 logging.exception(self.lastErrorMsg)
                 self.dataChanged.emit(index, index, [DATA_CHANGE_FAILED_ROLE])
+        elif role in STRING_ROLES:
+            return self._getString(index, role)
         else:
             item = self.objByIndex(index)
             column = index.column()
             return item.data(role, column, column_name=self._columns[column])
 
-    def _getFgColor(self, index: QModelIndex):
+    def _getString(self, index: QModelIndex, role: int):
+        item = self.objByIndex(index)
         column = index.column()
-        # color fg in red if obj type and typehint don't fit
-        if index.data(IS_LINK_ROLE):
-            return LINK_BLUE
-        elif column == ATTRIBUTE_COLUMN:
-            if self.objByIndex(index).new:
-                return NEW_GREEN
-            elif self.objByIndex(index).changed:
-                return CHANGED_BLUE
-        return QVariant()
+        strings = self._strings.get(id(item))
+        if strings is None:
+            strings = self._strings[id(item)] = {}
+            if len(self._strings) > MAX_ITEMS_WITH_CACHED_STRINGS:
+                self._strings.popitem(last=False)
+        else:
+            self._strings.move_to_end(id(item))
+        try:
+            return strings[(role, column)]
+        except KeyError:
+            string = strings[(role, column)] = item.data(role, column, column_name=self._columns[column])
+            return string
+
+    def _invalidateStrings(self, index: QModelIndex):
+        """Drop the cached strings of the item at index and of its ancestors, which may show its value"""
+        item = self.objByIndex(index)
+        while item is not None:
+            self._strings.pop(id(item), None)
+            item = item.parent()
+
+    def _onDataChanged(self, topLeft: QModelIndex, bottomRight: QModelIndex, roles=()):
+        if not topLeft.isValid():
+            return
+        parent = topLeft.parent()
+        last = bottomRight.row() if bottomRight.isValid() else self.rowCount(parent) - 1
+        for row in range(topLeft.row(), last + 1):
+            self._strings.pop(id(self.objByIndex(self.index(row, 0, parent))), None)
+        self._invalidateStrings(parent)
+
+    def _getFgColor(self, index: QModelIndex):
+        return self._getStyle(index)[1]
 
     def _getFont(self, index: QModelIndex):
+        return self._getStyle(index)[0]
+
+    def _getStyle(self, index: QModelIndex) -> Tuple[QFont, Any]:
+        """Return font and foreground color of the cell, shared by all cells with the same style"""
+        column = index.column()
+        item = self.objByIndex(index)
+        isLink = bool(item.data(IS_LINK_ROLE, column, self._columns[column]))
+        key = (id(self.currFont), self.currFont.pointSize(), column if column in STYLED_COLUMNS else None,
+               isLink, item.new, item.changed)
+        try:
+            return StandardTable._styles[key]
+        except KeyError:
+            pass
+
         font = QFont(self.currFont)
-        if index.data(IS_LINK_ROLE):
+        if isLink:
             font.setUnderline(True)
-        elif index.column() == ATTRIBUTE_COLUMN:
+        elif column == ATTRIBUTE_COLUMN:
             font.setBold(True)
             font.setUnderline(True)
-        elif index.column() not in (TYPE_COLUMN, TYPE_HINT_COLUMN):
+        elif column not in (TYPE_COLUMN, TYPE_HINT_COLUMN):
             font.setItalic(True)
-        return font
+
+        # color fg in red if obj type and typehint don't fit
+        if isLink:
+            color = LINK_BLUE
+        elif column == ATTRIBUTE_COLUMN and item.new:
+            color = NEW_GREEN
+        elif column == ATTRIBUTE_COLUMN and item.changed:
+            color = CHANGED_BLUE
+        else:
+            color = QVariant()
+        style = StandardTable._styles[key] = (font, color)
+        return style
+
+    def _getSizeHint(self) -> QSize:
+        fontSize = self.currFont.pointSize()
+        try:
+            return StandardTable._sizeHints[fontSize]
+        except KeyError:
+            sizeHint = StandardTable._sizeHints[fontSize] = QSize(-1, int((fontSize+2)*1.9))
+            return sizeHint
+
+    @staticmethod
+    def resetStyles():
+        """Reset cached fonts, colors and size hints, must be called if the font size or the theme is changed"""
+        StandardTable._styles.clear()
+        StandardTable._sizeHints.clear()
 
     def getLinkedItem(self, index: QModelIndex) -> QModelIndex:
         if not index.data(IS_LINK_ROLE):
             return QModelIndex()
         try:
             reference = self.data(index, OBJECT_ROLE)
-            objStore = self.data(index, PACKAGE_ROLE).objStore
-            obj = reference.resolve(objStore)
+            obj = self.data(index, PACKAGE_ROLE).resolveLink(reference)
+            if obj is None:
+                return QModelIndex()
             linkedPackItem, = self.data(index, PACK_ITEM_ROLE).model().match(QModelIndex(), OBJECT_ROLE, obj, hits=1)
             return linkedPackItem
         except AttributeError:
             return QModelIndex()
 
     def setData(self, index: QModelIndex, value: Any, role: int = ...) -> bool:
-        if isinstance(index, QPersistentModelIndex):
+        if isinstance(index, ItemHandle):
+            index = index.index()
+        elif isinstance(index, QPersistentModelIndex):
             index = QModelIndex(index)
-        if not index.isValid() and role not in (Qt.ItemDataRole.FontRole, ADD_ITEM_ROLE, UNDO_ROLE, REDO_ROLE):
+        if not index.isValid() and role not in (Qt.ItemDataRole.FontRole, ADD_ITEM_ROLE, ADD_ITEMS_ROLE,
+                                                CLEAR_ROWS_ROLE, UNDO_ROLE, REDO_ROLE, TRANSACTION_ROLE):
             return QVariant()
-        elif role == Qt.ItemDataRole.FontRole:
+        if role in (ADD_ITEM_ROLE, ADD_ITEMS_ROLE, CLEAR_ROW_ROLE, CLEAR_ROWS_ROLE, Qt.ItemDataRole.EditRole):
+            # items edited before in the transaction must be up to date before their children are changed
+            self._flushUpdates(index)
+
+        if role == Qt.ItemDataRole.FontRole:
             if isinstance(value, QFont):
                 font = QFont(value)
                 self.currFont.setPointSize(font.pointSize())
+                self.resetStyles()
                 self.dataChanged.emit(self.index(0), self.index(self.rowCount()))
                 return True
         elif role == ADD_ITEM_ROLE:
             try:
                 self.addItem(value, index)
+                self._invalidateStrings(index)
+                self._invalidateSerialization(index)
                 return True
             except Exception as e:
                 tb = traceback.format_exc()
                 self.lastErrorMsg = f"Error occurred while adding item to {index.data(NAME_ROLE)}: {e}\n\n{tb}"
                 logging.exception(self.lastErrorMsg)
                 self.dataChanged.emit(index, index, [DATA_CHANGE_FAILED_ROLE])
+        elif role == ADD_ITEMS_ROLE:
+            try:
+                self.addItems(value, index)
+                return True
+            except Exception as e:
+                tb = traceback.format_exc()
+                self.lastErrorMsg = f"Error occurred while adding items to {index.data(NAME_ROLE)}: {e}\n\n{tb}"
+                logging.exception(self.lastErrorMsg)
+                self.dataChanged.emit(index, index, [DATA_CHANGE_FAILED_ROLE])
+            finally:
+                self._invalidateStrings(index)
+                self._invalidateSerialization(index)
+        elif role == CLEAR_ROWS_ROLE:
+            try:
+                row, count = value
+                self.clearRows(row, count, index)
+                self.dataChanged.emit(index, index)
+                return True
+            except Exception as e:
+                tb = traceback.format_exc()
+                self.lastErrorMsg = f"Rows of {index.data(NAME_ROLE)} could not be deleted: {e}\n\n{tb}"
+                self.dataChanged.emit(index, index, [DATA_CHANGE_FAILED_ROLE])
         elif role == CLEAR_ROW_ROLE:
             try:
                 parent = index.parent()
@@ -334,10 +827,15 @@ class StandardTable(QAbstractItemModel):
                 self.dataChanged.emit(index, index, [DATA_CHANGE_FAILED_ROLE])
         elif role == Qt.ItemDataRole.EditRole:
             try:
-                newValue, oldValue = self.editItem(index, value)
-                self.setChanged(index)
-                self.update(index)
-                self.undo.append(SetDataItem(index=QPersistentModelIndex(index), value=oldValue, role=role))
+                item = self.objByIndex(index)
+                self._unindexItem(item, subtree=False)
+                try:
+                    newValue, oldValue = self.editItem(index, value)
+                finally:
+                    self._indexItem(item, subtree=False)
+                self._invalidateSerialization(index)
+                self._setChangedAndUpdate(index)
+                self.undo.append(SetDataItem(index=self.itemHandle(index), value=oldValue, role=role))
                 self.redo.clear()
                 return True
             except Exception as e:
@@ -354,7 +852,7 @@ class StandardTable(QAbstractItemModel):
                     self.redo.append(self.undo.pop())
                     return True
             elif isIterable(value):
-                self.undo = deque(value)
+                self.undo = self._newJournal(value)
                 return True
         elif role == REDO_ROLE:
             if value == NOT_GIVEN and self.redo:
@@ -365,9 +863,16 @@ class StandardTable(QAbstractItemModel):
                     self.redo = tempRedoList
                     return True
             elif isIterable(value):
-                self.redo = list(value)
+                self.redo = self._newJournal(value)
                 return True
+        elif role == TRANSACTION_ROLE:
+            # undo the edits of a transaction in reverse order, their undo entries form a new transaction
+            with self.transaction():
+                results = [self.setData(*undoItem) for undoItem in reversed(value)]
+            return all(results)
         elif role == UPDATE_ROLE:
+            # the object was changed outside of the model
+            self._invalidateSerialization(index)
             self.update(index)
         else:
             raise ValueError(f"Unknown role: {role}")
@@ -399,6 +904,7 @@ class StandardTable(QAbstractItemModel):
             parentObj.update([item.obj])
         else:
             oldValue = getattr(parentObj, item.objName)
+            self._checkIdChange(index, parentObj, item.objName, newValue)
             try:
                 setattr(parentObj, item.objName, newValue)
             except TypeError as e:
@@ -410,8 +916,52 @@ class StandardTable(QAbstractItemModel):
                     raise e
                 setattr(parentObj, item.objName, newValue)
             item.obj = getattr(parentObj, item.objName)
+            self._recordIdChange(index, parentObj, item.objName, oldValue)
         return newValue, oldValue
 
+    def _checkIdChange(self, index: QModelIndex, obj, attr: str, newValue):
+        """Reject an id which is already used by another Identifiable of the package"""
+        if attr == "id" and isinstance(obj, Identifiable) and newValue != obj.id:
+            package = self.data(index, PACKAGE_ROLE)
+            if isinstance(package, Package) and package.isIdUsed(newValue, obj):
+                raise KeyError(f"Id {newValue} is already used by another object of the package")
+
+    def _recordIdChange(self, index: QModelIndex, obj, attr: str, oldValue):
+        """Report a changed id of an Identifiable to its package, so that it is stored under the new id"""
+        if attr == "id" and isinstance(obj, Identifiable) and oldValue != obj.id:
+            package = self.data(index, PACKAGE_ROLE)
+            if isinstance(package, Package):
+                package.idChanged(obj, oldValue)
+
+    def _invalidateSerialization(self, index: QModelIndex):
+        """
+        Report the Identifiable containing the item at index as changed to its package.
+        Resolved links of the package are invalidated, as id_shorts or referables may have changed.
+        """
+        item = self.objByIndex(index)
+        package = item.data(PACKAGE_ROLE)
+        if not isinstance(package, Package):
+            return
+        package.invalidateLinks()
+
+        referable = None
+        while item is not None and not isinstance(item.obj, (Identifiable, Package)):
+            if referable is None and isinstance(item.obj, Referable):
+                referable = item.obj
+            item = item.parent()
+        if item is not None:
+            if not isinstance(item.obj, Package):
+                package.invalidateSerialization(item.obj)
+            # else only the set of objects of the package changed
+            return
+
+        # Roots of detail models of submodel elements are no Identifiables, so the parents of the objects are used
+        obj = referable
+        while isinstance(obj, Referable) and not isinstance(obj, Identifiable):
+            obj = obj.parent
+        # Invalidate all if the Identifiable is not known
+        package.invalidateSerialization(obj if isinstance(obj, Identifiable) else None)
+
     def setChanged(self, topLeft: QModelIndex, bottomRight: QModelIndex = None):
         """Set the item and all parents as changed"""
         self._setChanged(True, topLeft, bottomRight)
@@ -435,16 +985,18 @@ class StandardTable(QAbstractItemModel):
                 else:
                     packItem: QModelIndex = index.data(PACK_ITEM_ROLE)
                     if packItem and packItem.isValid():
+                        # emitted by the source model, so that it drops the cached strings of the pack item
+                        while isinstance(packItem.model(), QSortFilterProxyModel):
+                            packItem = packItem.model().mapToSource(packItem)
                         packItem.model().dataChanged.emit(packItem, packItem)
 
     def removeRows(self, row: int, count: int, parent: QModelIndex = ...) -> bool:
         parentItem = self.objByIndex(parent)
 
         self.beginRemoveRows(parent, row, row+count-1)
-        for n in range(count):
-            child = parentItem.children()[row]
-            child.setParent(None)
-            # child.deleteLater()
+        for child in parentItem._childItems[row:row + count]:
+            self._unindexItem(child)
+        parentItem._removeChildren(row, count)
         self.endRemoveRows()
         return True
 
@@ -463,43 +1015,59 @@ class StandardTable(QAbstractItemModel):
             except AttributeError:
                 pass
 
+        self._invalidateSerialization(parent)
+        self._invalidateStrings(parent)
+        if isinstance(parentObj, (list, dict, AbstractSet)):
+            self._removeObjsOfRows(row, count, parent, parentObj)
+            return True
+
         for currRow in range(row+count-1, row-1, -1):
-            child = parentItem.children()[currRow]
-            if isinstance(parentObj, (list, dict, AbstractSet)):
+            child = parentItem.child(currRow)
+            if not defaultVal == NOT_GIVEN:
+                index = self.index(currRow, 0, parent)
+                self.setData(index, defaultVal, Qt.ItemDataRole.EditRole)
+            elif isinstance(child.obj, Package):
+                # close package
+                oldValue = child.obj
+                self.removeRow(currRow, parent)
+                self.undo.append(
+                    SetDataItem(index=self.itemHandle(parent), value=oldValue,
+                                role=ADD_ITEM_ROLE))
+                self.redo.clear()
+            else:
+                raise TypeError(
+                    f"Unknown parent object type: "
+                    f"object could not be deleted or set to default: "
+                    f"{type(parentObj)}")
+        return True
+
+    def _removeObjsOfRows(self, row: int, count: int, parent: QModelIndex, parentObj: Union[list, dict, AbstractSet]):
+        """Remove the objects of the rows from the parent object, then the rows in one block with one undo entry"""
+        parentItem = self.objByIndex(parent)
+        oldValues = []
+        try:
+            for currRow in range(row+count-1, row-1, -1):
+                child = parentItem.child(currRow)
                 if isinstance(parentObj, list):
                     oldValue = parentObj.pop(currRow)
                 elif isinstance(parentObj, dict):
                     oldValue: DictItem = child.data(OBJECT_ROLE)
                     parentObj.pop(oldValue.key)
-                elif isinstance(parentObj, AbstractSet):
+                else:
                     parentObj.discard(child.obj)
                     oldValue = child.obj
+                oldValues.append(oldValue)
+        finally:
+            # rows of the already removed objects must be removed, even if removing of an object failed
+            if oldValues:
+                self.removeRows(row + count - len(oldValues), len(oldValues), parent)
+                oldValues.reverse()
+                if len(oldValues) == 1:
+                    undoItem = SetDataItem(index=self.itemHandle(parent), value=oldValues[0], role=ADD_ITEM_ROLE)
                 else:
-                    raise TypeError(
-                        f"Unknown parent object type: "
-                        f"object could not be deleted or set to default: "
-                        f"{type(parentObj)}")
-                self.removeRow(currRow, parent)
-                self.undo.append(SetDataItem(index=QPersistentModelIndex(parent), value=oldValue, role=ADD_ITEM_ROLE))
+                    undoItem = SetDataItem(index=self.itemHandle(parent), value=oldValues, role=ADD_ITEMS_ROLE)
+                self.undo.append(undoItem)
                 self.redo.clear()
-            else:
-                if not defaultVal == NOT_GIVEN:
-                    index = self.index(currRow, 0, parent)
-                    self.setData(index, defaultVal, Qt.ItemDataRole.EditRole)
-                elif isinstance(child.obj, Package):
-                    # close package
-                    oldValue = child.obj
-                    self.removeRow(currRow, parent)
-                    self.undo.append(
-                        SetDataItem(index=QPersistentModelIndex(parent), value=oldValue,
-                                    role=ADD_ITEM_ROLE))
-                    self.redo.clear()
-                else:
-                    raise TypeError(
-                        f"Unknown parent object type: "
-                        f"object could not be deleted or set to default: "
-                        f"{type(parentObj)}")
-        return True
 
     def clearRow(self, row: int, parent: QModelIndex = ..., defaultVal=NOT_GIVEN) -> bool:
         """Delete row if it is child of Iterable else set to Default"""
@@ -0,0 +1,204 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""Object store of packages without any Qt or GUI dependency."""
+
+from typing import Dict, Iterable, List, Optional, Type, Tuple, Set
+
+from basyx.aas.model import DictObjectStore, Identifiable, Identifier, AssetAdministrationShell, Submodel, \
+    ConceptDescription, ModelReference, Referable
+
+
+class IndexedObjectStore(DictObjectStore):
+    """DictObjectStore which additionally keeps the ids of the objects per type"""
+    INDEXED_TYPES: Tuple[Type[Identifiable], ...] = (AssetAdministrationShell, Submodel, ConceptDescription)
+
+    def __init__(self, objects: Iterable[Identifiable] = ()):
+        self._byType: Dict[Type[Identifiable], Dict[Identifier, Identifiable]] = {
+            typ: {} for typ in self.INDEXED_TYPES}
+        super(IndexedObjectStore, self).__init__(objects)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "_byType" not in state:
+            self._reindex()
+
+    def _reindex(self):
+        self._byType = {typ: {} for typ in self.INDEXED_TYPES}
+        for identifier, obj in self._backend.items():
+            self._index(obj)[identifier] = obj
+
+    def _index(self, obj: Identifiable) -> Dict[Identifier, Identifiable]:
+        for typ, objects in self._byType.items():
+            if isinstance(obj, typ):
+                return objects
+        return {}
+
+    def add(self, x: Identifiable) -> None:
+        super(IndexedObjectStore, self).add(x)
+        self._index(x)[x.id] = x
+
+    def discard(self, x: Identifiable) -> None:
+        if self._backend.get(x.id) is x:
+            del self._backend[x.id]
+            self._index(x).pop(x.id, None)
+
+    def rekey(self, oldId: Identifier, obj: Identifiable) -> None:
+        """Store obj, which was stored under oldId, under its current id"""
+        if self._backend.get(oldId) is not obj:
+            raise KeyError(f"Identifiable object is not stored under id {oldId}")
+        self.rekeyMany([(oldId, obj)])
+
+    def rekeyMany(self, changes: Iterable[Tuple[Identifier, Identifiable]]) -> None:
+        """
+        Store the objects, which were stored under the given old ids, under their current ids.
+        Objects can swap their ids, the store is only changed if no id conflicts.
+        """
+        changes = self._effectiveChanges(changes)
+        conflicts = self.conflictingChanges(changes)
+        if conflicts:
+            oldId, obj = conflicts[0]
+            raise KeyError(f"Identifiable object with same id {obj.id} is already stored in this store")
+        for oldId, obj in changes:
+            del self._backend[oldId]
+            self._index(obj).pop(oldId, None)
+        for oldId, obj in changes:
+            self._backend[obj.id] = obj
+            self._index(obj)[obj.id] = obj
+
+    def _effectiveChanges(self, changes: Iterable[Tuple[Identifier, Identifiable]]
+                          ) -> List[Tuple[Identifier, Identifiable]]:
+        return [(oldId, obj) for oldId, obj in changes if self._backend.get(oldId) is obj and oldId != obj.id]
+
+    def conflictingChanges(self, changes: Iterable[Tuple[Identifier, Identifiable]]
+                           ) -> List[Tuple[Identifier, Identifiable]]:
+        """Return the changes of rekeyMany() whose new id is used twice or by an object which keeps its id"""
+        changes = self._effectiveChanges(changes)
+        oldIds = {oldId for oldId, obj in changes}
+        newIds = set()
+        conflicts = []
+        for oldId, obj in changes:
+            if obj.id in newIds or (obj.id in self._backend and obj.id not in oldIds):
+                conflicts.append((oldId, obj))
+            newIds.add(obj.id)
+        return conflicts
+
+    def objectsOfType(self, typ: Type[Identifiable]) -> Tuple[Identifiable, ...]:
+        """Return the stored objects of an indexed type"""
+        return tuple(self._byType[typ].values())
+
+    def numOfType(self, typ: Type[Identifiable]) -> int:
+        return len(self._byType[typ])
+
+    def isIndexed(self, typ: Type[Identifiable]) -> bool:
+        return typ in self._byType
+
+
+def indexedObjectStore(objStore: Optional[DictObjectStore]) -> IndexedObjectStore:
+    """Return objStore as IndexedObjectStore, e.g. for stores of older package snapshots"""
+    if isinstance(objStore, IndexedObjectStore):
+        return objStore
+    return IndexedObjectStore(objStore if objStore is not None else ())
+
+
+class IdChangeJournal:
+    """
+    Journal of changed ids of identifiables. Pending changes are applied to the object store
+    in O(changes) before it is used by id, renamed ids are kept to find references to old ids.
+    """
+
+    def __init__(self):
+        # id(obj) -> (obj, id under which obj is stored)
+        self._pending: Dict[int, Tuple[Identifiable, Identifier]] = {}
+        # old id -> current id
+        self._renamed: Dict[Identifier, Identifier] = {}
+
+    def record(self, obj: Identifiable, oldId: Identifier):
+        """Record that the id of obj was changed from oldId to obj.id"""
+        newId = obj.id
+        if oldId == newId:
+            return
+        pendingObj, storedId = self._pending.get(id(obj), (obj, oldId))
+        if storedId == newId:
+            del self._pending[id(obj)]
+        else:
+            self._pending[id(obj)] = (obj, storedId)
+
+        for renamedId, currentId in self._renamed.items():
+            if currentId == oldId:
+                self._renamed[renamedId] = newId
+        self._renamed[oldId] = newId
+        # the id is current again, if it was renamed back
+        self._renamed.pop(newId, None)
+
+    def apply(self, objStore: IndexedObjectStore) -> List[Identifiable]:
+        """
+        Store objects with changed ids under their current ids. Objects whose new id is used by another object
+        stay stored under their old id, they are dropped from the journal and returned.
+        """
+        if not self._pending:
+            return []
+        changes = [(storedId, obj) for obj, storedId in self._pending.values()]
+        self._pending.clear()
+        conflicts = []
+        # objects which keep their old id can cause new conflicts
+        newConflicts = objStore.conflictingChanges(changes)
+        while newConflicts:
+            conflicts.extend(obj for storedId, obj in newConflicts)
+            changes = [change for change in changes if change not in newConflicts]
+            newConflicts = objStore.conflictingChanges(changes)
+        objStore.rekeyMany(changes)
+        return conflicts
+
+    def numOfPending(self) -> int:
+        return len(self._pending)
+
+    def oldIds(self) -> Set[Identifier]:
+        """Ids which were changed and are not used by the renamed objects anymore"""
+        return set(self._renamed)
+
+    def isOldId(self, identifier: Identifier) -> bool:
+        return identifier in self._renamed
+
+    def currentId(self, oldId: Identifier) -> Optional[Identifier]:
+        """Return the current id of the object, which had oldId, or None if the id was not changed"""
+        return self._renamed.get(oldId)
+
+
+class ReferenceCache:
+    """
+    Cache of resolved model references keyed by reference value. Must be invalidated if identifiables
+    are added, removed or renamed or if id_shorts or the structure of referables change.
+    """
+    RESOLVE_ERRORS = (AttributeError, KeyError, NotImplementedError, TypeError, IndexError, ValueError)
+
+    def __init__(self):
+        # reference -> referred object or None if the reference could not be resolved
+        self._resolved: Dict[ModelReference, Optional[Referable]] = {}
+        self.numOfFailures = 0
+
+    def resolve(self, reference: ModelReference, objStore: DictObjectStore) -> Optional[Referable]:
+        """Return the object referred by reference or None, failures are only counted"""
+        try:
+            return self._resolved[reference]
+        except KeyError:
+            pass
+        try:
+            obj = reference.resolve(objStore)
+        except self.RESOLVE_ERRORS:
+            obj = None
+            self.numOfFailures += 1
+        self._resolved[reference] = obj
+        return obj
+
+    def invalidate(self):
+        self._resolved.clear()
+
+    def __len__(self):
+        return len(self._resolved)
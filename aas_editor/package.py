@@ -8,34 +8,75 @@
 #
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 
+import copy
 import io
-from datetime import datetime
+import logging
 from pathlib import Path
-from typing import Union, Iterable, Optional
+from typing import Union, Iterable, Optional, List, IO, Dict, Tuple
 import mimetypes
 
-import pyecma376_2
-from basyx.aas.adapter.aasx import DictSupplementaryFileContainer, AASXReader, AASXWriter
-from basyx.aas.adapter.json import read_aas_json_file, write_aas_json_file
-from basyx.aas.adapter.xml import read_aas_xml_file, write_aas_xml_file
+from basyx.aas.adapter.aasx import AbstractSupplementaryFileContainer
 from basyx.aas.model import AssetAdministrationShell, Submodel, ConceptDescription, \
-    DictObjectStore, Key, ModelReference
-
-from aas_editor.settings import DEFAULT_COMPLETIONS, AppSettings
+    DictObjectStore, Key, ModelReference, Identifiable, Identifier, Referable, Reference
+from basyx.aas.util.traversal import walk_submodel
+
+from aas_editor.file_store import BlobSupplementaryFileContainer, ZipSupplementaryFileContainer, ArchiveRebase, \
+    readSupplementaryFile
+from aas_editor.object_store import IndexedObjectStore, IdChangeJournal, indexedObjectStore, ReferenceCache
+from aas_editor.package_reader import readPackageFile, PackageLoadCancelled, ProgressCallback, PackageCache
+from aas_editor.package_writer import writeAasxFile, writeXmlFile, writeJsonFile, SerializationCache, \
+    WriteProgress, FRAGMENT_XML, FRAGMENT_FILES, jsonFragment
+from aas_editor.settings import DEFAULT_COMPLETIONS, AppSettings, PACKAGE_CACHE_FOLDER
 from aas_editor.utils.util_classes import ClassesInfo
 
 
 class Package:
-    def __init__(self, file: Union[str, Path] = "", failsafe=False):
-        """:raise TypeError if file has wrong file type"""
-        self.objStore = DictObjectStore()
-        self.fileStore = DictSupplementaryFileContainer()
+    def __init__(self, file: Union[str, Path] = "", failsafe=False, progress: Optional[ProgressCallback] = None,
+                 cache: Optional[PackageCache] = None):
+        """
+        :param failsafe: skip faulty objects instead of raising, the errors are stored in readErrors
+        :param progress: callback(readBytes, fileSize), called while reading the file,
+                         can raise PackageLoadCancelled to abort reading
+        :param cache: snapshot cache, see Package.snapshotCache()
+        :raise TypeError if file has wrong file type
+        """
+        self.objStore = IndexedObjectStore()
+        self.fileStore = BlobSupplementaryFileContainer()
+        self.readErrors: List[str] = []
+        # Serialized objects reused on writing, changed objects must be reported with invalidateSerialization()
+        self.serializationCache = SerializationCache()
+        # Changed ids must be reported with idChanged(), objects are stored under their new ids before writing
+        self.idChanges = IdChangeJournal()
+        # Resolved references, invalidated if referables of the package are changed, see invalidateLinks()
+        self.links = ReferenceCache()
         self.file = file
         if file:
-            self._read(failsafe)
+            self._read(failsafe, progress, cache)
+        self._addCompletions()
+        self._changed = False
+
+    @classmethod
+    def fromStores(cls, file: Union[str, Path], objStore: DictObjectStore,
+                   fileStore: AbstractSupplementaryFileContainer, readErrors: Iterable[str] = ()) -> 'Package':
+        """Create package from stores, which were already read, e.g. in a worker process"""
+        pack = cls()
+        pack.file = file
+        pack.objStore = indexedObjectStore(objStore)
+        pack.fileStore = fileStore
+        pack.readErrors = list(readErrors)
+        pack._addCompletions()
+        return pack
+
+    @staticmethod
+    def snapshotCache() -> Optional[PackageCache]:
+        """Return the snapshot cache of read packages if it is enabled in the settings"""
+        if AppSettings.PACKAGE_CACHE_ENABLED.value():
+            return PackageCache(PACKAGE_CACHE_FOLDER, AppSettings.PACKAGE_CACHE_MAX_SIZE_MB.value() * 1024 * 1024)
+        return None
+
+    def _addCompletions(self):
         for obj in self.objStore:
             DEFAULT_COMPLETIONS[Key]["value"].append(obj.id)
-        self._changed = False
 
     @classmethod
     def addableAttrs(cls):
@@ -57,6 +98,10 @@ class Package:
     def writePrettyJson(self):
         return AppSettings.WRITE_PRETTY_JSON.value()
 
+    @property
+    def incrementalAasxSave(self):
+        return AppSettings.INCREMENTAL_AASX_SAVE.value()
+
     @property
     def allSubmodelRefsToAas(self):
         return AppSettings.ALL_SUBMODEL_REFS_TO_AAS.value()
@@ -67,33 +112,65 @@ class Package:
     def __repr__(self):
         return self.file.as_posix()
 
-    def _read(self, failsafe):
-        fileType = self.file.suffix.lower().strip()
-        if fileType == ".xml":
-            # The file must be opened in binary mode! The XML writer will handle
-            # character encoding internally.
-            with open(self.file, 'rb') as xml_file:
-                self.objStore = read_aas_xml_file(xml_file, failsafe=failsafe)
-        elif fileType == ".json":
-            # Using 'utf-8-sig' is recommended to handle unicode Byte Order
-            # Marks (BOM) correctly.
-            with open(self.file, "r", encoding='utf-8-sig') as f:
-                self.objStore = read_aas_json_file(f, failsafe=failsafe)
-        elif fileType == ".aasx":
-            reader = AASXReader(self.file.as_posix())
-            reader.read_into(self.objStore, self.fileStore, failsafe=failsafe)
-        else:
-            raise TypeError("Wrong file type:", self.file.suffix)
+    def _read(self, failsafe, progress: Optional[ProgressCallback] = None, cache: Optional[PackageCache] = None):
+        errors = self.readErrors if failsafe else None
+        self.objStore, self.fileStore = readPackageFile(self.file, failsafe, progress, errors, cache)
 
     def _update_objstore(self):
-        old_identifiers = list(self.objStore._backend.keys())
-        for i in old_identifiers:
-            obj = self.objStore.get_identifiable(i)
-            if i != obj.id:
-                self.objStore._backend[obj.id] = obj
-                del self.objStore._backend[i]
+        for obj in self.idChanges.apply(self.objStore):
+            logging.warning(f"Id {obj.id} is used by another object, the object stays stored under its old id")
+
+    def idChanged(self, obj: Identifiable, oldId: Identifier):
+        """Report that the id of obj was changed from oldId"""
+        self.idChanges.record(obj, oldId)
+        self._update_objstore()
+        self.invalidateLinks()
+
+    def isIdUsed(self, identifier: Identifier, obj: Optional[Identifiable] = None) -> bool:
+        """Return True if identifier is the id of an object of the package other than obj"""
+        try:
+            return self.objStore.get_identifiable(identifier) is not obj
+        except KeyError:
+            return False
+
+    def resolveLink(self, reference: ModelReference) -> Optional[Referable]:
+        """Return the object referred by reference or None if it can not be resolved"""
+        return self.links.resolve(reference, self.objStore)
+
+    def invalidateLinks(self):
+        """Must be called if referables were added, removed or renamed"""
+        self.links.invalidate()
+
+    def referencesToOldIds(self) -> List[Tuple[Referable, Reference]]:
+        """Return the references of the package which still point to changed ids, with the referables holding them"""
+        oldIds = self.idChanges.oldIds()
+        if not oldIds:
+            return []
+        references = []
+        for referable in self._iterReferables():
+            for value in vars(referable).values():
+                for reference in (value if isinstance(value, (set, list, tuple)) else (value,)):
+                    if isinstance(reference, Reference) and reference.key and reference.key[0].value in oldIds:
+                        references.append((referable, reference))
+        return references
+
+    def _iterReferables(self) -> Iterable[Referable]:
+        for obj in self.objStore:
+            yield obj
+            if isinstance(obj, Submodel):
+                yield from walk_submodel(obj)
 
     def write(self, file: str = None):
+        snapshot = self.snapshot(file, copyObjects=False)
+        snapshot.write()
+        snapshot.apply()
+
+    def snapshot(self, file: str = None, copyObjects=True) -> 'PackageSnapshot':
+        """
+        Prepare the package for writing and return its current state, which can be written in another thread
+        :param copyObjects: if False, the snapshot refers to the objects of the package, so they must not be
+                            changed until the snapshot is written
+        """
         self._update_objstore()
 
         if self.allSubmodelRefsToAas:
@@ -101,23 +178,9 @@ class Package:
         if file:
             self.file: Path = file
 
-        fileType = self.file.suffix.lower().strip()
-        if fileType == ".xml":
-            # The file must be opened in binary mode! The XML writer will handle
-            # character encoding internally.
-            with open(self.file.as_posix(), 'wb') as xml_file:
-                write_aas_xml_file(xml_file, self.objStore)
-        elif fileType == ".json":
-            with open(self.file.as_posix(), "w", encoding='utf-8') as fileIO:
-                indent = 2 if self.writePrettyJson else None
-                write_aas_json_file(fileIO, self.objStore, indent=indent)
-
-        elif fileType == ".aasx":
-            with AASXWriter(self.file.as_posix()) as writer:
-                writer.write_all_aas_objects("/aasx/data.{}".format("json" if self.writeJsonInAasx else "xml"),
-                                             self.objStore, self.fileStore, self.writeJsonInAasx)
-        else:
+        if self.file.suffix.lower().strip() not in (".xml", ".json", ".aasx"):
             raise TypeError("Wrong file type:", self.file.suffix)
+        return PackageSnapshot(self, copyObjects)
 
     def all_submodels_to_aas(self):
         """Add references of all existing submodels to submodel attribute of existing AAS."""
@@ -128,8 +191,13 @@ class Package:
                 if shell.submodel is None:
                     shell.submodel = set()
                 shell.submodel.add(reference)
+            self.invalidateSerialization(shell)
             break
 
+    def invalidateSerialization(self, obj: Optional[Identifiable] = None):
+        """Mark obj as changed, so that it is serialized again on the next write. If obj is None, all objects"""
+        self.serializationCache.invalidate(obj)
+
     @property
     def name(self):
         return self.file.name
@@ -158,6 +226,9 @@ class Package:
     #             yield obj
 
     def _iter_objects(self, objtype):
+        if self.objStore.isIndexed(objtype):
+            yield from self.objStore.objectsOfType(objtype)
+            return
         for obj in self.objStore:
             if isinstance(obj, objtype):
                 yield obj
@@ -169,29 +240,111 @@ class Package:
 
     def add(self, obj):
         if isinstance(obj, StoredFile):
-            newName = self.fileStore.add_file(name=obj.name, file=obj.file(), content_type=obj.mime_type)
+            with obj.file() as file:
+                newName = self.fileStore.add_file(name=obj.name, file=file, content_type=obj.mime_type)
             obj.setFileStore(newName, self.fileStore)
         else:
+            self._update_objstore()
             self.objStore.add(obj)
+            self.invalidateLinks()
 
     def discard(self, obj):
+        self._update_objstore()
         self.objStore.discard(obj)
+        self.invalidateLinks()
 
     @property
     def numOfShells(self) -> int:
-        return len(tuple(self.shells))
+        return self.objStore.numOfType(AssetAdministrationShell)
 
     @property
     def numOfSubmodels(self) -> int:
-        return len(tuple(self.submodels))
+        return self.objStore.numOfType(Submodel)
 
     @property
     def numOfConceptDescriptions(self) -> int:
-        return len(tuple(self.concept_descriptions))
+        return self.objStore.numOfType(ConceptDescription)
+
+
+class PackageSnapshot:
+    """
+    State of a package for writing, e.g. in another thread while the package is edited further.
+    Objects with cached serialization are written from the cache, only the other objects are copied.
+    """
+
+    def __init__(self, package: Package, copyObjects=True):
+        self.package = package
+        self.file: Path = package.file
+        self.fileType = package.file.suffix.lower().strip()
+        self.writeJsonInAasx = package.writeJsonInAasx
+        self.indent = 2 if package.writePrettyJson else None
+        self.incremental = package.incrementalAasxSave
+        self.generation = package.serializationCache.generation
+        # id of copied object -> original object
+        self._originals: Dict[int, Identifiable] = {}
+        self._archiveRebase: Optional[ArchiveRebase] = None
+
+        if not copyObjects:
+            self.objects: List[Identifiable] = list(package.objStore)
+            self.cache = package.serializationCache
+            self.fileStore = package.fileStore
+            return
+
+        self.cache = SerializationCache()
+        self.objects = []
+        fragmentKinds = self._fragmentKinds()
+        for obj in package.objStore:
+            fragments = package.serializationCache.fragments(obj)
+            if all(kind in fragments for kind in fragmentKinds):
+                self.cache.setFragments(obj, fragments)
+                self.objects.append(obj)
+            else:
+                objCopy = copy.deepcopy(obj)
+                self._originals[id(objCopy)] = obj
+                self.objects.append(objCopy)
+        self.fileStore = copy.deepcopy(package.fileStore)
+
+    def _fragmentKinds(self) -> Tuple[str, ...]:
+        if self.fileType == ".xml":
+            return FRAGMENT_XML,
+        elif self.fileType == ".json":
+            return jsonFragment(self.indent),
+        else:
+            return FRAGMENT_FILES, jsonFragment() if self.writeJsonInAasx else FRAGMENT_XML
+
+    @property
+    def numOfObjects(self) -> int:
+        return len(self.objects)
+
+    def write(self, progress: Optional[ProgressCallback] = None):
+        """:param progress: callback(writtenItems, numOfItems), items are objects and supplementary files"""
+        writeProgress = WriteProgress(progress, total=len(self.objects))
+        if self.fileType == ".xml":
+            writeXmlFile(self.file, self.objects, self.cache, writeProgress)
+        elif self.fileType == ".json":
+            writeJsonFile(self.file, self.objects, self.cache, self.indent, writeProgress)
+        elif self.fileType == ".aasx":
+            self._archiveRebase = writeAasxFile(self.file, self.objects, self.fileStore, self.writeJsonInAasx,
+                                                self.incremental, cache=self.cache, progress=writeProgress)
+
+    def apply(self):
+        """
+        Take over the fragments serialized while writing into the cache of the package and switch the files
+        of the package to the written archive. Must be called in the thread the package is edited in.
+        """
+        if self._originals:
+            self.package.serializationCache.merge(self.cache, self._originals, self.generation)
+        if self._archiveRebase is not None and isinstance(self.package.fileStore, ZipSupplementaryFileContainer):
+            self.package.fileStore.rebase(self._archiveRebase)
+        self._archiveRebase = None
+
+    def packageChanged(self) -> bool:
+        """Return True if objects of the package were changed after the snapshot was taken"""
+        return self.package.serializationCache.changedSince(self.generation)
 
 
 class StoredFile:
-    def __init__(self, name: Optional[str] = None, fileStore: Optional[DictSupplementaryFileContainer] = None,
+    def __init__(self, name: Optional[str] = None, fileStore: Optional[AbstractSupplementaryFileContainer] = None,
                  filePath: Optional[str] = None):
         if filePath:
             self._filePath = Path(filePath).absolute()
@@ -201,7 +354,7 @@ class StoredFile:
         self.setFileStore(name, fileStore)
 
     def savedInStore(self) -> bool:
-        return True if isinstance(self._fileStore, DictSupplementaryFileContainer) else False
+        return True if isinstance(self._fileStore, AbstractSupplementaryFileContainer) else False
 
     @property
     def name(self):
@@ -223,24 +376,26 @@ class StoredFile:
 
     @property
     def value(self) -> bytes:
-        return self.file().getvalue()
+        if self.savedInStore():
+            return readSupplementaryFile(self._fileStore, self.name)
+        with open(self._filePath, "rb") as f:
+            return f.read()
 
-    def file(self) -> io.BytesIO:
+    def file(self) -> IO[bytes]:
+        """Return a readable stream of the file content, the stream must be closed by the caller"""
         if self.savedInStore():
-            file_content = io.BytesIO()
-            self._fileStore.write_file(self.name, file_content)
-        else:
-            with open(self._filePath, "rb") as f:
-                file_content = io.BytesIO(f.read())
-        return file_content
+            if isinstance(self._fileStore, BlobSupplementaryFileContainer):
+                return self._fileStore.open(self.name)
+            return io.BytesIO(readSupplementaryFile(self._fileStore, self.name))
+        return open(self._filePath, "rb")
 
-    def setFileStore(self, name: str, fileStore: DictSupplementaryFileContainer):
+    def setFileStore(self, name: str, fileStore: AbstractSupplementaryFileContainer):
         if name is None or isinstance(name, str):
             self._name = name
         else:
             raise TypeError("arg 1 must be of type str or None")
 
-        if fileStore is None or isinstance(fileStore, DictSupplementaryFileContainer):
+        if fileStore is None or isinstance(fileStore, AbstractSupplementaryFileContainer):
             self._fileStore = fileStore
         else:
-            raise TypeError("arg 2 must be of type DictSupplementaryFileContainer or None")
+            raise TypeError("arg 2 must be of type AbstractSupplementaryFileContainer or None")
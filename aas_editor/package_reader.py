@@ -0,0 +1,316 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""
+Reading of AAS files without any Qt or GUI dependency.
+The module is imported by worker processes, so it must not import aas_editor.settings.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Union, Optional, Callable, Tuple, List
+
+from basyx.aas.adapter.aasx import AbstractSupplementaryFileContainer, AASXReader
+from basyx.aas.adapter.json import read_aas_json_file_into
+from basyx.aas.adapter.xml import read_aas_xml_file_into
+
+from aas_editor.file_store import BlobSupplementaryFileContainer, ZipSupplementaryFileContainer
+from aas_editor.object_store import IndexedObjectStore, indexedObjectStore
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class PackageLoadCancelled(Exception):
+    """Raised from a progress callback to abort reading of a package"""
+
+
+class PackageTransferError(Exception):
+    """Raised if the read package could not be sent back from a worker process"""
+
+
+class ProgressFile(io.RawIOBase):
+    """
+    Raw binary file, which reports the number of read bytes to the given callback
+    and feeds the read bytes to the given content hash
+    """
+    def __init__(self, file: Union[str, Path], progress: Optional[ProgressCallback] = None,
+                 contentHash: Optional["ContentHash"] = None):
+        super().__init__()
+        self._file = open(file, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._progress = progress
+        self._contentHash = contentHash
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        position = self._file.tell()
+        n = self._file.readinto(b)
+        if self._contentHash is not None and n:
+            self._contentHash.update(position, memoryview(b)[:n])
+        if self._progress is not None:
+            self._progress(self._file.tell(), self._size)
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class ContentHash:
+    """
+    Hash of the content of a file, which confirms that a cached snapshot was made of the file.
+    Zip archives like AASX are not read completely while parsing, so only their central directory
+    with the sizes and CRCs of all members is hashed. Other files are hashed while they are parsed
+    through a ProgressFile, which feeds every read byte to update(), so no extra pass over the file is needed.
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, file: Union[str, Path]):
+        self.file = Path(file)
+        self.isArchive = self.file.suffix.lower().strip() == ".aasx"
+        self._hash = hashlib.sha256()
+        self._hashedSize = 0
+
+    def update(self, position: int, data: memoryview):
+        """Hash the data read at the position, if it continues the bytes hashed so far"""
+        if self.isArchive or position > self._hashedSize or position + len(data) <= self._hashedSize:
+            return
+        self._hash.update(data[self._hashedSize - position:])
+        self._hashedSize = position + len(data)
+
+    def digest(self) -> bytes:
+        if self.isArchive:
+            with zipfile.ZipFile(self.file) as archive:
+                for info in archive.infolist():
+                    self._hash.update(f"{info.filename}|{info.CRC}|{info.compress_size}|{info.file_size}|"
+                                      f"{info.header_offset}\n".encode())
+            return self._hash.digest()
+        # hash the rest, which was not read while parsing, e.g. trailing whitespace
+        with open(self.file, "rb") as f:
+            f.seek(self._hashedSize)
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                self._hash.update(chunk)
+                self._hashedSize += len(chunk)
+        return self._hash.digest()
+
+
+class ReadErrorCollector(logging.Handler):
+    """
+    Collects the errors, which the basyx adapters log while reading in failsafe mode.
+    Only records of the current thread are collected, as several packages can be read at the same time.
+    """
+    LOGGER = "basyx"
+
+    def __init__(self, errors: List[str]):
+        super(ReadErrorCollector, self).__init__(logging.ERROR)
+        self.errors = errors
+        self._thread = threading.get_ident()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.thread == self._thread
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # the message without traceback is enough to show to the user
+            self.errors.append(record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+    def __enter__(self):
+        logging.getLogger(self.LOGGER).addHandler(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logging.getLogger(self.LOGGER).removeHandler(self)
+
+
+class PackageCache:
+    """
+    On-disk cache of pickled snapshots of read packages.
+    The key of a snapshot is made of path, size and modification time of the file and decides whether there is
+    a hit. A snapshot starts with the ContentHash of the file, which only confirms a hit before the snapshot
+    is unpickled, so changed files with the same size and modification time are read again.
+    The least recently used snapshots are removed if the cache exceeds maxSize.
+    """
+    SUFFIX = ".snapshot"
+    # Part of the key: increment it, if the pickled classes change,
+    # so that snapshots of an older layout are not unpickled
+    VERSION = 1
+
+    def __init__(self, folder: Union[str, Path], maxSize: int):
+        """:param maxSize: max size of the cache in bytes"""
+        self.folder = Path(folder)
+        self.maxSize = maxSize
+
+    def key(self, file: Union[str, Path], failsafe=False) -> str:
+        file = Path(file).absolute()
+        stat = file.stat()
+        fingerprint = f"{self.VERSION}|{file.as_posix()}|{stat.st_size}|{stat.st_mtime_ns}|{failsafe}"
+        return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+    @staticmethod
+    def contentHash(file: Union[str, Path], progress: Optional[ProgressCallback] = None) -> bytes:
+        contentHash = ContentHash(file)
+        if not contentHash.isArchive:
+            with openBinary(Path(file), progress, contentHash) as f:
+                while f.read(ContentHash.CHUNK_SIZE):
+                    pass
+        return contentHash.digest()
+
+    def _snapshotFile(self, key: str) -> Path:
+        return self.folder / f"{key}{self.SUFFIX}"
+
+    def load(self, key: str, file: Union[str, Path], progress: Optional[ProgressCallback] = None) -> Optional[tuple]:
+        """
+        Return the snapshot of the key, if it was made of the current content of the file.
+        On a hit, hashing the file is the only pass over it, as it is not parsed.
+        """
+        snapshotFile = self._snapshotFile(key)
+        try:
+            with open(snapshotFile, "rb") as f:
+                if f.read(hashlib.sha256().digest_size) != self.contentHash(file, progress):
+                    return None
+                snapshot = pickle.load(f)
+            # the modification time of a snapshot is its last usage
+            os.utime(snapshotFile)
+            return snapshot
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Snapshot {snapshotFile} could not be loaded and is removed: {e}")
+            snapshotFile.unlink(missing_ok=True)
+            return None
+
+    def store(self, key: str, snapshot: tuple, contentHash: bytes):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        fd, tmpFile = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contentHash)
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpFile, self._snapshotFile(key))
+        except Exception as e:
+            logging.warning(f"Snapshot of package could not be stored: {e}")
+            Path(tmpFile).unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def snapshots(self) -> List[Path]:
+        """Return snapshot files, least recently used first"""
+        try:
+            files = [file for file in self.folder.iterdir() if file.suffix == self.SUFFIX]
+        except FileNotFoundError:
+            return []
+        return sorted(files, key=lambda file: file.stat().st_mtime)
+
+    def size(self) -> int:
+        return sum(file.stat().st_size for file in self.snapshots())
+
+    def evict(self):
+        snapshots = self.snapshots()
+        size = sum(file.stat().st_size for file in snapshots)
+        for file in snapshots:
+            if size <= self.maxSize:
+                break
+            size -= file.stat().st_size
+            file.unlink(missing_ok=True)
+
+    def clear(self):
+        for file in self.snapshots():
+            file.unlink(missing_ok=True)
+
+
+def openBinary(file: Path, progress: Optional[ProgressCallback] = None, contentHash: Optional[ContentHash] = None):
+    if progress is None and contentHash is None:
+        return open(file, 'rb')
+    return io.BufferedReader(ProgressFile(file, progress, contentHash))
+
+
+def readPackageFile(file: Union[str, Path], failsafe=False, progress: Optional[ProgressCallback] = None,
+                    errors: Optional[List[str]] = None,
+                    cache: Optional[PackageCache] = None,
+                    contentHash: Optional[ContentHash] = None) -> Tuple[IndexedObjectStore, AbstractSupplementaryFileContainer]:
+    """
+    :param progress: callback(readBytes, fileSize), called while reading the file,
+                     can raise PackageLoadCancelled to abort reading
+    :param errors: list, to which the errors skipped in failsafe mode are appended
+    :param cache: snapshot cache to load the package from or to store it in after reading
+    :param contentHash: hash, which is fed with the bytes read while parsing
+    :raise TypeError if file has wrong file type
+    """
+    if cache is not None:
+        key = cache.key(file, failsafe)
+        snapshot = cache.load(key, file, progress)
+        if snapshot is None:
+            readErrors = []
+            contentHash = ContentHash(file)
+            objStore, fileStore = readPackageFile(file, failsafe, progress, readErrors, contentHash=contentHash)
+            snapshot = (objStore, fileStore, readErrors)
+            cache.store(key, snapshot, contentHash.digest())
+        objStore, fileStore, readErrors = snapshot
+        if errors is not None:
+            errors.extend(readErrors)
+        return indexedObjectStore(objStore), fileStore
+
+    if errors is not None:
+        with ReadErrorCollector(errors):
+            return readPackageFile(file, failsafe, progress, contentHash=contentHash)
+
+    file = Path(file)
+    objStore = IndexedObjectStore()
+    fileStore = BlobSupplementaryFileContainer()
+    fileType = file.suffix.lower().strip()
+    if fileType == ".xml":
+        # The file must be opened in binary mode! The XML writer will handle
+        # character encoding internally.
+        with openBinary(file, progress, contentHash) as xml_file:
+            read_aas_xml_file_into(objStore, xml_file, failsafe=failsafe)
+    elif fileType == ".json":
+        # Using 'utf-8-sig' is recommended to handle unicode Byte Order
+        # Marks (BOM) correctly.
+        with io.TextIOWrapper(openBinary(file, progress, contentHash), encoding='utf-8-sig') as f:
+            read_aas_json_file_into(objStore, f, failsafe=failsafe)
+    elif fileType == ".aasx":
+        fileStore = ZipSupplementaryFileContainer(file.absolute())
+        with openBinary(file, progress) as f, AASXReader(f) as reader, fileStore.indexing():
+            reader.read_into(objStore, fileStore, failsafe=failsafe)
+    else:
+        raise TypeError("Wrong file type:", file.suffix)
+    return objStore, fileStore
+
+
+def readPackageFileInProcess(file: Union[str, Path], failsafe=False, cache: Optional[PackageCache] = None) -> bytes:
+    """
+    Entry point for worker processes: read the file and return the pickled stores and read errors.
+    Pickling is done here, so that transfer problems can be told apart from reading errors.
+    """
+    errors = []
+    objStore, fileStore = readPackageFile(file, failsafe, errors=errors, cache=cache)
+    try:
+        return pickle.dumps((objStore, fileStore, errors), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        raise PackageTransferError(f"{file} could not be sent back from the worker process: {e}") from None
@@ -0,0 +1,469 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""
+Writing of AAS files without any Qt or GUI dependency.
+
+Serialized fragments of Identifiables are kept in a SerializationCache and reused
+until the Identifiable is reported as changed, so only changed objects are serialized again.
+
+AASX files are written into a temporary file, which replaces the target file at the end.
+In incremental mode, supplementary files which are unchanged since the last reading or saving
+are copied from the previous archive as they are, without decompressing and compressing them again.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Union, Dict, IO, Iterator, Optional, List, Tuple, Any, Callable, Iterable
+
+import pyecma376_2
+from lxml import etree
+from basyx.aas import model
+from basyx.aas.adapter._generic import XML_NS_MAP, XML_NS_AAS
+from basyx.aas.adapter.aasx import AbstractSupplementaryFileContainer, AASXWriter, RELATIONSHIP_TYPE_AAS_SUPL
+from basyx.aas.adapter.json import AASToJsonEncoder
+from basyx.aas.adapter.xml.xml_serialization import asset_administration_shell_to_xml, submodel_to_xml, \
+    concept_description_to_xml
+from basyx.aas.util import traversal
+
+from aas_editor.file_store import ZipSupplementaryFileContainer, ArchiveRebase, COPY_BUFFER_SIZE
+from aas_editor.package_reader import ProgressCallback
+
+# Kinds of cached fragments
+FRAGMENT_XML = "xml"
+FRAGMENT_FILES = "files"
+
+
+def jsonFragment(indent: Optional[int] = None) -> str:
+    return f"json{indent}"
+
+
+# Top level keys/tags of the environment and serializers of their objects
+XML_SERIALIZERS = (
+    (model.AssetAdministrationShell, "assetAdministrationShells", asset_administration_shell_to_xml),
+    (model.Submodel, "submodels", submodel_to_xml),
+    (model.ConceptDescription, "conceptDescriptions", concept_description_to_xml),
+)
+
+
+class SerializationCache:
+    """
+    Serialized fragments of Identifiables. A fragment is reused until its Identifiable
+    is reported as changed with invalidate().
+    """
+
+    def __init__(self):
+        # id(obj) -> (obj, {fragment kind: fragment})
+        self._entries: Dict[int, Tuple[model.Identifiable, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        # Incremented on every invalidation, used to merge fragments made from snapshots
+        self.generation = 0
+        self._invalidatedAt: Dict[int, int] = {}
+        self._allInvalidatedAt = 0
+
+    def invalidate(self, obj: Optional[model.Identifiable] = None):
+        """Drop the fragments of obj or, if obj is None, of all objects"""
+        with self._lock:
+            self.generation += 1
+            if obj is None:
+                self._entries.clear()
+                self._invalidatedAt.clear()
+                self._allInvalidatedAt = self.generation
+            else:
+                self._entries.pop(id(obj), None)
+                self._invalidatedAt[id(obj)] = self.generation
+
+    def changedSince(self, generation: int, obj: Optional[model.Identifiable] = None) -> bool:
+        """Return True if obj or, if obj is None, any object was invalidated after the generation"""
+        if obj is None:
+            return self.generation > generation
+        return max(self._allInvalidatedAt, self._invalidatedAt.get(id(obj), 0)) > generation
+
+    def fragments(self, obj: model.Identifiable) -> Dict[str, Any]:
+        """Return a copy of the cached fragments of obj"""
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            return dict(entry[1]) if entry is not None and entry[0] is obj else {}
+
+    def setFragments(self, obj: model.Identifiable, fragments: Dict[str, Any]):
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            if entry is None or entry[0] is not obj:
+                entry = (obj, {})
+                self._entries[id(obj)] = entry
+            entry[1].update(fragments)
+
+    def merge(self, other: 'SerializationCache', originals: Dict[int, model.Identifiable], generation: int):
+        """
+        Take over fragments of copied objects from another cache, if the originals were not changed since
+        :param originals: id of copied object -> original object
+        :param generation: generation of this cache, when the objects were copied
+        """
+        for copyId, original in originals.items():
+            entry = other._entries.get(copyId)
+            if entry is not None and not self.changedSince(generation, original):
+                self.setFragments(original, entry[1])
+
+    def prune(self, objects: Iterable[model.Identifiable]):
+        """Drop the fragments of objects which are not in objects anymore"""
+        existing = {id(obj) for obj in objects}
+        with self._lock:
+            for key in [key for key in self._entries if key not in existing]:
+                del self._entries[key]
+            for key in [key for key in self._invalidatedAt if key not in existing]:
+                del self._invalidatedAt[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fragment(self, obj: model.Identifiable, kind: str, serialize: Callable[[model.Identifiable], Any]):
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            if entry is None or entry[0] is not obj:
+                entry = (obj, {})
+                self._entries[id(obj)] = entry
+        fragments = entry[1]
+        if kind not in fragments:
+            fragments[kind] = serialize(obj)
+        return fragments[kind]
+
+    def xmlElement(self, obj: model.Identifiable, serialize: Callable[[model.Identifiable], etree.Element]):
+        return self.fragment(obj, FRAGMENT_XML, serialize)
+
+    def json(self, obj: model.Identifiable, indent: Optional[int] = None) -> str:
+        return self.fragment(obj, jsonFragment(indent),
+                             lambda o: json.dumps(o, cls=AASToJsonEncoder, indent=indent))
+
+    def supplementaryFiles(self, obj: model.Identifiable) -> List[str]:
+        """Names of local files referenced by File elements of the submodel"""
+        return self.fragment(obj, FRAGMENT_FILES, _supplementaryFiles)
+
+
+class WriteProgress:
+    """Counts written objects and supplementary files and reports them to the callback"""
+
+    def __init__(self, callback: Optional[ProgressCallback] = None, total: int = 0):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+
+    def step(self):
+        self.done += 1
+        if self.callback:
+            self.callback(self.done, self.total)
+
+
+def _supplementaryFiles(obj: model.Identifiable) -> List[str]:
+    files = []
+    if isinstance(obj, model.Submodel):
+        for element in traversal.walk_submodel(obj):
+            if isinstance(element, model.File):
+                fileName = element.value
+                # Skip empty values, absolute URIs and network-path URI references
+                if fileName is None or fileName.startswith('//') or ':' in fileName.split('/')[0]:
+                    continue
+                files.append(fileName)
+    return files
+
+
+def _objectsByKey(objStore: Iterable[model.Identifiable]) -> List[Tuple[str, Callable, List[model.Identifiable]]]:
+    objectsByKey = []
+    for objType, key, serializer in XML_SERIALIZERS:
+        objects = [obj for obj in objStore if isinstance(obj, objType)]
+        if objects:
+            objectsByKey.append((key, serializer, objects))
+    return objectsByKey
+
+
+def _stepped(items: Iterable, progress: Optional[WriteProgress]):
+    for item in items:
+        yield item
+        if progress:
+            progress.step()
+
+
+def writeXml(file: IO[bytes], objStore: Iterable[model.Identifiable], cache: SerializationCache,
+             progress: Optional[WriteProgress] = None):
+    """Same output as write_aas_xml_file, unchanged objects are taken from the cache"""
+    root = etree.Element(XML_NS_AAS + "environment", nsmap=XML_NS_MAP)
+    for key, serializer, objects in _objectsByKey(objStore):
+        element = etree.SubElement(root, XML_NS_AAS + key)
+        for obj in _stepped(objects, progress):
+            # Cached elements are moved from the previous tree into the new one
+            element.append(cache.xmlElement(obj, serializer))
+    etree.ElementTree(root).write(file, encoding="UTF-8", xml_declaration=True, method="xml")
+
+
+def writeJson(file: IO[str], objStore: Iterable[model.Identifiable], cache: SerializationCache,
+              indent: Optional[int] = None, progress: Optional[WriteProgress] = None):
+    """Same output as write_aas_json_file, unchanged objects are taken from the cache"""
+    objectsByKey = _objectsByKey(objStore)
+    if not objectsByKey:
+        file.write("{}")
+    elif indent is None:
+        file.write("{" + ", ".join(
+            f"{json.dumps(key)}: [" + ", ".join(cache.json(obj) for obj in _stepped(objects, progress)) + "]"
+            for key, serializer, objects in objectsByKey) + "}")
+    else:
+        # json.dumps output contains no raw line breaks apart from the indentation
+        indent1 = " " * indent
+        indent2 = indent1 * 2
+        file.write("{\n" + ",\n".join(
+            f"{indent1}{json.dumps(key)}: [\n" +
+            ",\n".join(indent2 + cache.json(obj, indent).replace("\n", "\n" + indent2)
+                       for obj in _stepped(objects, progress)) +
+            f"\n{indent1}]"
+            for key, serializer, objects in objectsByKey) + "\n}")
+
+
+def writeXmlFile(file: Union[str, Path], objStore: Iterable[model.Identifiable], cache: SerializationCache,
+                 progress: Optional[WriteProgress] = None):
+    # The file must be opened in binary mode! The XML writer will handle
+    # character encoding internally.
+    with open(file, 'wb') as xmlFile:
+        writeXml(xmlFile, objStore, cache, progress)
+    cache.prune(objStore)
+
+
+def writeJsonFile(file: Union[str, Path], objStore: Iterable[model.Identifiable], cache: SerializationCache,
+                  indent: Optional[int] = None, progress: Optional[WriteProgress] = None):
+    with open(file, "w", encoding='utf-8') as jsonFile:
+        writeJson(jsonFile, objStore, cache, indent, progress)
+    cache.prune(objStore)
+
+
+class CachingAASXWriter(AASXWriter):
+    """AASXWriter which takes the serialized objects and their referenced files from a SerializationCache"""
+
+    def __init__(self, file: Union[os.PathLike, str, IO], cache: SerializationCache,
+                 progress: Optional[WriteProgress] = None):
+        super(CachingAASXWriter, self).__init__(file)
+        self.cache = cache
+        self.progress = progress
+
+    def write_all_aas_objects(self,
+                              part_name: str,
+                              objects: model.AbstractObjectStore[model.Identifiable],
+                              file_store: AbstractSupplementaryFileContainer,
+                              write_json: bool = False,
+                              split_part: bool = False,
+                              additional_relationships: Iterable[pyecma376_2.OPCRelationship] = ()) -> None:
+        supplementaryFiles: List[str] = []
+        for obj in objects:
+            supplementaryFiles.extend(self.cache.supplementaryFiles(obj))
+        if self.progress:
+            self.progress.total += len(supplementaryFiles)
+
+        if not split_part:
+            self._aas_part_names.append(part_name)
+
+        with self.writer.open_part(part_name, "application/json" if write_json else "application/xml") as p:
+            if write_json:
+                f = io.TextIOWrapper(p, encoding='utf-8')
+                writeJson(f, objects, self.cache, progress=self.progress)
+                f.flush()
+                f.detach()
+            else:
+                writeXml(p, objects, self.cache, self.progress)
+
+        supplementaryFileNames = []
+        for fileName in _stepped(supplementaryFiles, self.progress):
+            try:
+                contentType = file_store.get_content_type(fileName)
+                sha = file_store.get_sha256(fileName)
+            except KeyError:
+                logging.warning(f"Could not find file {fileName} in file store.")
+                continue
+            if self._supplementary_part_names.get(fileName) == sha:
+                continue
+            elif fileName in self._supplementary_part_names:
+                logging.error(f"Trying to write supplementary file {fileName} to AASX twice with different contents")
+            with self.writer.open_part(fileName, contentType) as p:
+                file_store.write_file(fileName, p)
+            supplementaryFileNames.append(pyecma376_2.package_model.normalize_part_name(fileName))
+            self._supplementary_part_names[fileName] = sha
+
+        self.writer.write_relationships(
+            [*(pyecma376_2.OPCRelationship(f"r{i}", RELATIONSHIP_TYPE_AAS_SUPL, fileName,
+                                           pyecma376_2.OPCTargetMode.INTERNAL)
+               for i, fileName in enumerate(supplementaryFileNames)),
+             *additional_relationships],
+            part_name)
+        self.cache.prune(objects)
+
+
+ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+ZIP_EXTRA_ZIP64 = 0x0001
+
+
+class IncrementalFileStore(AbstractSupplementaryFileContainer):
+    """
+    Proxy of a file container used while writing. For files which can be copied from the previous archive
+    only empty placeholders are written, they are replaced by the copied archive members afterwards.
+    """
+
+    def __init__(self, fileStore: ZipSupplementaryFileContainer, copyable: Dict[str, str]):
+        """:param copyable: names of files which can be copied -> their item names in the previous archive"""
+        self.fileStore = fileStore
+        self.copyable = copyable
+        # item names in the written archive -> item names in the previous archive
+        self.placeholders: Dict[str, str] = {}
+
+    def add_file(self, name: str, file: IO[bytes], content_type: str) -> str:
+        return self.fileStore.add_file(name, file, content_type)
+
+    def get_content_type(self, name: str) -> str:
+        return self.fileStore.get_content_type(name)
+
+    def get_sha256(self, name: str) -> bytes:
+        # The writer uses the hash only to detect files written twice,
+        # so there is no need to read the whole file from the archive
+        if name in self.copyable:
+            return hashlib.sha256(f"{self.fileStore.archive}|{self.copyable[name]}".encode()).digest()
+        return self.fileStore.get_sha256(name)
+
+    def write_file(self, name: str, file: IO[bytes]) -> None:
+        if name in self.copyable:
+            self.placeholders[name[1:]] = self.copyable[name]
+        else:
+            self.fileStore.write_file(name, file)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.fileStore
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fileStore)
+
+
+def _stripZip64Extra(extra: bytes) -> bytes:
+    result = b""
+    i = 0
+    while i + 4 <= len(extra):
+        fieldId, fieldSize = struct.unpack("<HH", extra[i:i + 4])
+        if fieldId != ZIP_EXTRA_ZIP64:
+            result += extra[i:i + 4 + fieldSize]
+        i += 4 + fieldSize
+    return result
+
+
+def copyZipMember(source: zipfile.ZipFile, info: zipfile.ZipInfo, target: zipfile.ZipFile, name: str = None):
+    """Copy the compressed data of the member byte by byte from source into the target archive"""
+    newInfo = zipfile.ZipInfo(name or info.filename, info.date_time)
+    newInfo.compress_type = info.compress_type
+    newInfo.comment = info.comment
+    newInfo.create_system = info.create_system
+    newInfo.create_version = info.create_version
+    newInfo.extract_version = info.extract_version
+    newInfo.internal_attr = info.internal_attr
+    newInfo.external_attr = info.external_attr
+    newInfo.CRC = info.CRC
+    newInfo.compress_size = info.compress_size
+    newInfo.file_size = info.file_size
+    # Sizes are known, so they are written in the local header instead of a data descriptor
+    newInfo.flag_bits = info.flag_bits & ~ZIP_FLAG_DATA_DESCRIPTOR
+    newInfo.extra = _stripZip64Extra(info.extra)
+
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    nameLength, extraLength = struct.unpack("<HH", header[26:30])
+    source.fp.seek(info.header_offset + zipfile.sizeFileHeader + nameLength + extraLength)
+
+    newInfo.header_offset = target.fp.tell()
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    target.fp.write(newInfo.FileHeader(zip64))
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(COPY_BUFFER_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Member {info.filename} is truncated")
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+
+    target.filelist.append(newInfo)
+    target.NameToInfo[newInfo.filename] = newInfo
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+
+def mergeArchives(target: Union[str, Path], written: Union[str, Path], previous: Union[str, Path],
+                  placeholders: Dict[str, str]):
+    """Copy all members of the written archive into target, placeholders are replaced by members of previous"""
+    with zipfile.ZipFile(written) as writtenZip, zipfile.ZipFile(previous) as previousZip, \
+            zipfile.ZipFile(target, "w") as targetZip:
+        for info in writtenZip.infolist():
+            if info.filename in placeholders:
+                copyZipMember(previousZip, previousZip.getinfo(placeholders[info.filename]), targetZip,
+                              info.filename)
+            else:
+                copyZipMember(writtenZip, info, targetZip)
+
+
+def _copyableFiles(fileStore: AbstractSupplementaryFileContainer) -> Dict[str, str]:
+    if not isinstance(fileStore, ZipSupplementaryFileContainer) or not fileStore.archive.is_file():
+        return {}
+    try:
+        with zipfile.ZipFile(fileStore.archive) as previousZip:
+            itemNames = set(previousZip.namelist())
+    except zipfile.BadZipFile:
+        return {}
+    # Fragmented parts and parts with encoded names are not copied, they are written as usual
+    return {name: name[1:] for name in fileStore if fileStore.isArchived(name) and name[1:] in itemNames}
+
+
+def _tempFile(file: Path) -> str:
+    fd, tmpFile = tempfile.mkstemp(suffix=file.suffix, prefix=f".{file.stem}.", dir=file.parent)
+    os.close(fd)
+    return tmpFile
+
+
+def writeAasxFile(file: Union[str, Path], objStore: Iterable[model.Identifiable],
+                  fileStore: AbstractSupplementaryFileContainer, writeJson=False, incremental=True,
+                  cache: Optional[SerializationCache] = None,
+                  progress: Optional[WriteProgress] = None) -> Optional[ArchiveRebase]:
+    """
+    :param incremental: copy unchanged supplementary files from the archive the fileStore was read from
+    :param cache: cache of serialized objects, a temporary one is used if not given
+    :return: rebase of a ZipSupplementaryFileContainer to the written file, to be applied to the container
+             fileStore is a snapshot of, as the files of the replaced archive can no longer be read
+    """
+    file = Path(file)
+    copyable = _copyableFiles(fileStore) if incremental else {}
+    store = IncrementalFileStore(fileStore, copyable) if copyable else fileStore
+    tmpFiles = []
+    try:
+        tmpFile = _tempFile(file)
+        tmpFiles.append(tmpFile)
+        with CachingAASXWriter(tmpFile, cache if cache is not None else SerializationCache(), progress) as writer:
+            writer.write_all_aas_objects("/aasx/data.{}".format("json" if writeJson else "xml"),
+                                         objStore, store, writeJson)
+
+        if isinstance(store, IncrementalFileStore) and store.placeholders:
+            mergedFile = _tempFile(file)
+            tmpFiles.append(mergedFile)
+            mergeArchives(mergedFile, tmpFile, fileStore.archive, store.placeholders)
+            tmpFile = mergedFile
+
+        rebase = None
+        if isinstance(fileStore, ZipSupplementaryFileContainer):
+            rebase = fileStore.prepareRebase(file, tmpFile)
+            fileStore.close()
+        os.replace(tmpFile, file)
+        return rebase
+    finally:
+        for tmpFile in tmpFiles:
+            if os.path.exists(tmpFile):
+                os.remove(tmpFile)
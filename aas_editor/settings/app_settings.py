@@ -17,7 +17,7 @@ from PyQt6.QtGui import QFont, QIcon
 from PyQt6 import QtCore
 
 from aas_editor.directories import get_settings_file, get_themes_folder, get_custom_column_lists_file, get_icons_folder, \
-    get_pyproject_toml_file
+    get_pyproject_toml_file, get_package_cache_folder
 from aas_editor.settings.util_constants import NOT_GIVEN
 
 PYPROJECT_TOML = toml.load(get_pyproject_toml_file())
@@ -47,7 +47,8 @@ DEFAULT_FONT = QFont()
 DEFAULT_FONT.setWeight(40)
 DEFAULT_FONT.setPointSize(12)
 
-MAX_UNDOS = 10
+# Detail models of recently opened items, reused by tabs and history navigation
+MAX_CACHED_DETAIL_MODELS = 16
 MAX_RECENT_FILES = 10
 MAX_SIGNS_TO_SHOW = 1000
 MAX_SIGNS_TO_SHOW_IN_TREE = 150
@@ -67,11 +68,14 @@ MEDIA_CONTENT_ROLE = 1100
 OPENED_PACKS_ROLE = 1110
 OPENED_FILES_ROLE = 1120
 ADD_ITEM_ROLE = 1130
+ADD_ITEMS_ROLE = 1135
 CLEAR_ROW_ROLE = 1140
+CLEAR_ROWS_ROLE = 1145
 UPDATE_ROLE = 1150
 COPY_ROLE = 1155
 UNDO_ROLE = 1160
 REDO_ROLE = 1170
+TRANSACTION_ROLE = 1175
 DATA_CHANGE_FAILED_ROLE = 1180
 TYPE_ROLE = 1190
 TYPE_HINT_ROLE = 1200
@@ -96,6 +100,7 @@ SETTINGS_FILE = get_settings_file()
 THEMES_FOLDER = get_themes_folder()
 ICONS_FOLDER = get_icons_folder()
 CUSTOM_COLUMN_LISTS_FILE = get_custom_column_lists_file()
+PACKAGE_CACHE_FOLDER = get_package_cache_folder()
 
 # Themes
 APP_LOGO = QIcon(str(ICONS_FOLDER / 'logo.svg'))
@@ -143,3 +148,12 @@ class AppSettings:
     # instead of being included in the AAS part with in the AASX package.
     ALL_SUBMODEL_REFS_TO_AAS = Setting('allSubmodelRefsToAas', True, bool)
     WRITE_PRETTY_JSON = Setting('writePrettyJson', False, bool)
+    # If True, unchanged supplementary files are copied from the previous AASX file
+    # when saving instead of being compressed again.
+    INCREMENTAL_AASX_SAVE = Setting('incrementalAasxSave', True, bool)
+    # If True, snapshots of read packages are cached on disk,
+    # so that unchanged files are not deserialized again on the next opening.
+    PACKAGE_CACHE_ENABLED = Setting('packageCacheEnabled', False, bool)
+    PACKAGE_CACHE_MAX_SIZE_MB = Setting('packageCacheMaxSizeMb', 1024, int)
+    # Memory for undo and redo steps of each model, the oldest steps are dropped if it is exceeded
+    UNDO_MAX_SIZE_MB = Setting('undoMaxSizeMb', 64, int)
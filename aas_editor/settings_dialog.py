@@ -9,10 +9,12 @@
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 from typing import Dict
 
-from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QVBoxLayout, QLabel, QGroupBox, QHBoxLayout, QRadioButton
+from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QVBoxLayout, QLabel, QGroupBox, QHBoxLayout, QRadioButton, \
+    QPushButton
 from PyQt6.QtCore import Qt
 
-from aas_editor.settings import AppSettings, Setting, AAS_FILE_TYPES
+from aas_editor.package_reader import PackageCache
+from aas_editor.settings import AppSettings, Setting, AAS_FILE_TYPES, PACKAGE_CACHE_FOLDER
 
 
 class OptionGroupBox(QGroupBox):
@@ -63,6 +65,31 @@ class RadioBtnsGroupBox(OptionGroupBox):
         self.appSetting.setValue(self.chosenOption())
 
 
+class PackageCacheGroupBox(OptionGroupBox):
+    """Groupbox to show the size of the package snapshot cache and to clear it"""
+    def __init__(self, parent, title, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.setTitle(title)
+        self.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        layout = QHBoxLayout(self)
+        self.setLayout(layout)
+
+        self.cache = PackageCache(PACKAGE_CACHE_FOLDER, AppSettings.PACKAGE_CACHE_MAX_SIZE_MB.value() * 1024 * 1024)
+        self.sizeLabel = QLabel(self)
+        clearBtn = QPushButton("Clear cache", self)
+        clearBtn.clicked.connect(self.clearCache)
+        layout.addWidget(self.sizeLabel)
+        layout.addWidget(clearBtn)
+        self.updateSizeLabel()
+
+    def updateSizeLabel(self):
+        self.sizeLabel.setText(f"Cache size: {self.cache.size() / (1024 * 1024):.1f} MB")
+
+    def clearCache(self):
+        self.cache.clear()
+        self.updateSizeLabel()
+
+
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -88,6 +115,16 @@ class SettingsDialog(QDialog):
                                           "saving file",
                               options={"Yes": True, "No": False},
                               appSetting=AppSettings.ALL_SUBMODEL_REFS_TO_AAS),
+            RadioBtnsGroupBox(self, title="Copy unchanged supplementary files from the previous AASX file when saving",
+                              options={"Yes": True, "No": False},
+                              appSetting=AppSettings.INCREMENTAL_AASX_SAVE),
+            RadioBtnsGroupBox(self, title="Cache snapshots of opened files to open unchanged files faster",
+                              options={"Yes": True, "No": False},
+                              appSetting=AppSettings.PACKAGE_CACHE_ENABLED),
+            RadioBtnsGroupBox(self, title="Max size of the snapshot cache",
+                              options={"256 MB": 256, "1 GB": 1024, "4 GB": 4096},
+                              appSetting=AppSettings.PACKAGE_CACHE_MAX_SIZE_MB),
+            PackageCacheGroupBox(self, title="Snapshot cache"),
             ]
 
         self.layout = QVBoxLayout()
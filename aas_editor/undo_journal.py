@@ -0,0 +1,105 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""Undo and redo journal of the models without any Qt or GUI dependency."""
+
+import sys
+from collections import deque
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from typing import Any, Callable, Deque, Iterable, Iterator, Tuple
+
+# Attributes pointing to containing objects, e.g. of referables and namespace sets, are not counted
+SKIPPED_ATTRS = frozenset(("parent",))
+ATOMIC_TYPES = (type(None), bool, int, float, complex, str, bytes, bytearray)
+UNCOUNTED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def _slotValues(obj) -> Iterator[Any]:
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name not in SKIPPED_ATTRS and name not in ("__dict__", "__weakref__"):
+                try:
+                    yield getattr(obj, name)
+                except AttributeError:
+                    continue
+
+
+def deepSizeOf(obj, limit: int = sys.maxsize) -> int:
+    """
+    Estimate the memory used by obj and the objects it contains in bytes, shared objects are counted once.
+    Containing objects, types and functions are not followed. The estimation stops at limit.
+    """
+    size = 0
+    seen = set()
+    objs = [obj]
+    while objs and size < limit:
+        obj = objs.pop()
+        if id(obj) in seen or isinstance(obj, UNCOUNTED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj, 0)
+        if isinstance(obj, ATOMIC_TYPES):
+            continue
+        elif isinstance(obj, dict):
+            objs.extend(obj.keys())
+            objs.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            objs.extend(obj)
+        else:
+            attrs = getattr(obj, "__dict__", None)
+            if isinstance(attrs, dict):
+                size += sys.getsizeof(attrs, 0)
+                objs.extend(value for name, value in attrs.items() if name not in SKIPPED_ATTRS)
+            objs.extend(_slotValues(obj))
+    return min(size, limit)
+
+
+class UndoJournal:
+    """
+    Stack of undo or redo commands, limited by the estimated memory of the commands instead of their number.
+    If the limit is exceeded, the oldest commands are dropped. The newest command is always kept,
+    as the objects it holds were in memory before anyway.
+    """
+
+    def __init__(self, maxBytes: int, sizeOf: Callable[[Any, int], int] = deepSizeOf, commands: Iterable = ()):
+        """:param sizeOf: callback(command, limit) estimating the memory of a command in bytes"""
+        self.maxBytes = maxBytes
+        self._sizeOf = sizeOf
+        self._commands: Deque[Tuple[Any, int]] = deque()
+        self.numOfBytes = 0
+        for command in commands:
+            self.append(command)
+
+    def append(self, command):
+        size = self._sizeOf(command, self.maxBytes + 1)
+        self._commands.append((command, size))
+        self.numOfBytes += size
+        while self.numOfBytes > self.maxBytes and len(self._commands) > 1:
+            droppedCommand, droppedSize = self._commands.popleft()
+            self.numOfBytes -= droppedSize
+
+    def pop(self):
+        command, size = self._commands.pop()
+        self.numOfBytes -= size
+        return command
+
+    def clear(self):
+        self._commands.clear()
+        self.numOfBytes = 0
+
+    def __getitem__(self, item: int):
+        return self._commands[item][0]
+
+    def __len__(self):
+        return len(self._commands)
+
+    def __iter__(self) -> Iterator:
+        """Iterate the commands from the oldest to the newest"""
+        return (command for command, size in self._commands)
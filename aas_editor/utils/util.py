@@ -16,6 +16,7 @@
 #
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 
+import bisect
 import inspect
 import re
 import typing
@@ -353,6 +354,29 @@ def inheritors(klass) -> set:
     return subclasses
 
 
+def longestIncreasingSubsequence(values: List[int]) -> List[int]:
+    """Return the longest strictly increasing subsequence of values in O(n log n)"""
+    tailIndexes: List[int] = []  # index of the last value of the best subsequence of each length
+    tails: List[int] = []
+    predecessors: List[int] = [-1] * len(values)
+    for i, value in enumerate(values):
+        length = bisect.bisect_left(tails, value)
+        if length:
+            predecessors[i] = tailIndexes[length - 1]
+        if length == len(tails):
+            tails.append(value)
+            tailIndexes.append(i)
+        else:
+            tails[length] = value
+            tailIndexes[length] = i
+    res = []
+    i = tailIndexes[-1] if tailIndexes else -1
+    while i >= 0:
+        res.append(values[i])
+        i = predecessors[i]
+    return res[::-1]
+
+
 def getTreeItemPath(index: QModelIndex, role=Qt.ItemDataRole.DisplayRole, separator="/") -> str:
     path = ""
     while index.isValid():
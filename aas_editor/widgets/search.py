@@ -19,10 +19,11 @@
 from typing import List
 import logging
 
-from PyQt6.QtCore import QModelIndex, QPersistentModelIndex
+from PyQt6.QtCore import QModelIndex
 from PyQt6.QtGui import QBrush, QAction
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QToolButton, QTreeView
 
+from aas_editor.models.item_handle import ItemHandle
 from aas_editor.models.search_proxy_model import SearchProxyModel
 from aas_editor.settings.app_settings import NAME_ROLE
 from aas_editor.settings.colors import HIGHLIGHT_YELLOW
@@ -63,7 +64,7 @@ class SearchBar(ToolBar):
             self.closeBtn.hide()
         self.closeBtn.setAutoRaise(True)
 
-        self.foundItems: List[QPersistentModelIndex] = []
+        self.foundItems: List[ItemHandle] = []
 
         self.buildHandlers()
         self.initLayout()
@@ -98,13 +99,13 @@ class SearchBar(ToolBar):
                                             filter=self.filterBtn.isChecked(),
                                             matchCase=self.caseBtn.isChecked())
         if self.foundItems:
-            self.view.setCurrentIndex(QModelIndex(self.foundItems[0]))
+            self.view.setCurrentIndex(self.foundItems[0].index())
             for item in self.foundItems:
-                self.view.itemDelegate().setBgColor(QModelIndex(item), QBrush(HIGHLIGHT_YELLOW))
+                self.view.itemDelegate().setBgColor(item.index(), QBrush(HIGHLIGHT_YELLOW))
         self.model.dataChanged.emit(QModelIndex(), QModelIndex())
 
     def next(self):
-        items = [QModelIndex(i) for i in self.foundItems]
+        items = [i.index() for i in self.foundItems]
         items.sort(key=absRow)
         for item in items:
             logging.info(item.data(NAME_ROLE))
@@ -115,7 +116,7 @@ class SearchBar(ToolBar):
                 return
 
     def previous(self):
-        items = [QModelIndex(i) for i in self.foundItems]
+        items = [i.index() for i in self.foundItems]
         items.sort(key=absRow, reverse=True)
         for item in items:
             logging.info(item.data(NAME_ROLE))
@@ -16,6 +16,7 @@
 #
 #  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
 import logging
+from typing import List
 
 from PyQt6.QtWebEngineCore import QWebEngineSettings, QWebEngineProfile
 from PyQt6.QtWebEngineWidgets import QWebEngineView
@@ -26,6 +27,7 @@ from PyQt6.QtGui import QPixmap, QRegion, QDrag, QCursor, QMouseEvent, \
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QHBoxLayout, QFrame, \
     QTabBar, QMenu, QSplitter, QPushButton, QMessageBox, QToolButton, QFileDialog
 
+from aas_editor.models import ItemHandle
 from aas_editor.settings.app_settings import *
 from aas_editor.settings.icons import FORWARD_ICON, BACK_ICON, SPLIT_VERT_ICON, SPLIT_HORIZ_ICON, ZOOM_IN_ICON, \
     ZOOM_OUT_ICON, SETTINGS_ICON
@@ -267,8 +269,8 @@ class Tab(QWidget):
         self.openSearchBarSC = QShortcut(SC_SEARCH, self, activated=self.searchBar.showFocused)
 
         self.packItem = QPersistentModelIndex(QModelIndex())
-        self.prevItems = []
-        self.nextItems = []
+        self.prevItems: List[ItemHandle] = []
+        self.nextItems: List[ItemHandle] = []
         if packItem.isValid():
             self.openItem(packItem)
         else:
@@ -325,20 +327,20 @@ class Tab(QWidget):
         if not packItem == QModelIndex(self.packItem):
             self.nextItems.clear()
             if self.packItem.isValid():
-                self.prevItems.append(self.packItem)
+                self.prevItems.append(ItemHandle.ofIndex(QModelIndex(self.packItem)))
             self._openItem(packItem)
 
     def openPrevItem(self):
         if self.prevItems:
             prevItem = self.prevItems.pop()
-            self.nextItems.append(self.packItem)
-            self._openItem(QModelIndex(prevItem))
+            self.nextItems.append(ItemHandle.ofIndex(QModelIndex(self.packItem)))
+            self._openItem(prevItem.index())
 
     def openNextItem(self):
         if self.nextItems:
             nextItem = self.nextItems.pop()
-            self.prevItems.append(self.packItem)
-            self._openItem(QModelIndex(nextItem))
+            self.prevItems.append(ItemHandle.ofIndex(QModelIndex(self.packItem)))
+            self._openItem(nextItem.index())
 
     def openEmptyItem(self):
         self._openItem(QModelIndex())
@@ -435,11 +435,15 @@ class TreeView(BasicTreeView):
         # self.setCurrentIndex(bottomRight)
 
     def onRowsInserted(self, parent: QModelIndex, first: int, last: int):
+        if getattr(self.sourceModel(), "fetching", False):
+            return
         index = self.model().index(last, 0, parent)
         self.setCurrentIndex(index)
         QTimer.singleShot(100, self.updateUndoRedoActs)
 
     def onRowsRemoved(self, parent: QModelIndex, first: int, last: int):
+        if getattr(self.sourceModel(), "fetching", False):
+            return
         self.setCurrentIndex(parent)
         QTimer.singleShot(100, self.updateUndoRedoActs)
 
@@ -675,11 +679,10 @@ class TreeView(BasicTreeView):
             result = self.model().setData(index, value, Qt.ItemDataRole.EditRole)
         elif role == ADD_ITEM_ROLE:
             if isinstance(value, dict):
-                for key, value in value.items():
-                    result = self.model().setData(index, DictItem(key, value), ADD_ITEM_ROLE)
+                items = [DictItem(key, value) for key, value in value.items()]
+                result = self.model().setData(index, items, ADD_ITEMS_ROLE)
             elif isSimpleIterable(value):
-                for i in value:
-                    result = self.model().setData(index, i, ADD_ITEM_ROLE)
+                result = self.model().setData(index, list(value), ADD_ITEMS_ROLE)
             else:
                 result = self.model().setData(index, value, ADD_ITEM_ROLE)
         elif role == CLEAR_ROW_ROLE:
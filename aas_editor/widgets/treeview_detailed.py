@@ -20,7 +20,7 @@ from PyQt6 import QtCore
 from PyQt6.QtCore import Qt, QModelIndex
 from PyQt6.QtWidgets import QAbstractScrollArea
 
-from aas_editor.models import DetailedInfoTable
+from aas_editor.models import DetailedInfoTable, DetailedInfoTableCache
 from aas_editor.delegates import EditDelegate
 from aas_editor.settings.app_settings import ATTR_COLUMN_WIDTH, NAME_ROLE, ATTRIBUTE_COLUMN, \
     VALUE_COLUMN, LINKED_ITEM_ROLE, IS_LINK_ROLE, PARENT_OBJ_ROLE
@@ -30,6 +30,9 @@ from aas_editor import dialogs
 
 
 class AttrsTreeView(TreeView):
+    # detail models are shared by all tabs
+    modelCache = DetailedInfoTableCache()
+
     def __init__(self, parent=None, treeModel = DetailedInfoTable, **kwargs):
         super(AttrsTreeView, self).__init__(parent, **kwargs)
         self.treeModel = treeModel
@@ -44,7 +47,7 @@ class AttrsTreeView(TreeView):
         self.setContextMenuPolicy(QtCore.Qt.ContextMenuPolicy.CustomContextMenu)
         self.setSizeAdjustPolicy(QAbstractScrollArea.SizeAdjustPolicy.AdjustToContents)
         self.setObjectName("attrsTreeView")
-        self.setModelWithProxy(self.treeModel(packItem))
+        self.setModelWithProxy(self.modelCache.model(self.treeModel, packItem))
         self.setColumnWidth(ATTRIBUTE_COLUMN, ATTR_COLUMN_WIDTH)
         self.setItemDelegate(EditDelegate(self))
 
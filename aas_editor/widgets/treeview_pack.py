@@ -11,16 +11,16 @@
 import copy
 import json
 import logging
-import traceback
 import typing
 from functools import partial
 from pathlib import Path
 from typing import Optional
 
 from PyQt6 import QtCore
-from PyQt6.QtCore import Qt, QModelIndex, QSettings, QPoint
+from PyQt6.QtCore import Qt, QModelIndex, QSettings, QPoint, QEventLoop
 from PyQt6.QtGui import QDropEvent, QDragEnterEvent, QKeyEvent, QClipboard, QAction
-from PyQt6.QtWidgets import QMessageBox, QFileDialog, QMenu, QWidget, QApplication
+from PyQt6.QtWidgets import QMessageBox, QFileDialog, QMenu, QWidget, QApplication, QLabel, QProgressBar, \
+    QToolButton, QHBoxLayout
 from basyx.aas.adapter.aasx import AASXReader, DictSupplementaryFileContainer
 from basyx.aas.adapter.json import read_aas_json_file, AASToJsonEncoder
 from basyx.aas.adapter.xml import read_aas_xml_file
@@ -34,12 +34,14 @@ from aas_editor.settings.app_settings import NAME_ROLE, OBJECT_ROLE, PACKAGE_ROL
     CLEAR_ROW_ROLE, AppSettings, COLUMN_NAME_ROLE, OBJECT_COLUMN_NAME, \
     OBJECT_VALUE_COLUMN_NAME, DEFAULT_COLUMNS_IN_PACKS_TABLE_TO_SHOW, COPY_ROLE
 from aas_editor.settings.shortcuts import SC_OPEN, SC_SAVE_ALL
-from aas_editor.settings.icons import NEW_PACK_ICON, OPEN_ICON, OPEN_DRAG_ICON, SAVE_ICON, SAVE_ALL_ICON, ADD_ICON
+from aas_editor.settings.icons import NEW_PACK_ICON, OPEN_ICON, OPEN_DRAG_ICON, SAVE_ICON, SAVE_ALL_ICON, ADD_ICON, \
+    CLOSE_ICON
 from aas_editor.utils import util_type
 from aas_editor.utils.util import getDefaultVal, getReqParams4init
 from aas_editor.utils.util_classes import ClassesInfo
 from aas_editor.widgets import TreeView
 from aas_editor.widgets.treeview import HeaderView
+from aas_editor.workers import PackageLoader, PackageSaver, processPool
 from aas_editor import dialogs
 from settings import AAS_FILE_TYPES, APPLICATION_NAME, IAT
 
@@ -128,12 +130,56 @@ class PackHeaderView(HeaderView):
         self.menu.removeAction(hideChosenSection)
 
 
+class PackProgressWidget(QWidget):
+    """
+    Progress bar shown in the row of a package which is being read or saved,
+    with cancel button if the worker can be cancelled
+    """
+    def __init__(self, loader: typing.Union[PackageLoader, PackageSaver], parent=None):
+        super(PackProgressWidget, self).__init__(parent)
+        self.loader = loader
+
+        self.label = QLabel(str(loader), self)
+        self.progressBar = QProgressBar(self)
+        if loader.reportsProgress:
+            self.progressBar.setRange(0, 100)
+        else:
+            # busy indicator
+            self.progressBar.setRange(0, 0)
+        self.progressBar.setMaximumHeight(14)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(2, 0, 2, 0)
+        layout.addWidget(self.label)
+        layout.addWidget(self.progressBar, stretch=1)
+
+        if hasattr(loader, "cancel"):
+            self.cancelBtn = QToolButton(self)
+            self.cancelBtn.setIcon(CLOSE_ICON)
+            self.cancelBtn.setToolTip(f"Cancel opening of {loader.name}")
+            self.cancelBtn.setAutoRaise(True)
+            self.cancelBtn.clicked.connect(self.cancel)
+            layout.addWidget(self.cancelBtn)
+
+        loader.progress.connect(self.progressBar.setValue)
+
+    def cancel(self):
+        self.cancelBtn.setEnabled(False)
+        self.label.setText(f"Cancelling {self.loader.name}...")
+        self.loader.cancel()
+
+
 class PackTreeView(TreeView):
     EMPTY_VIEW_MSG = "Drop AAS files here"
     EMPTY_VIEW_ICON = OPEN_DRAG_ICON
 
     def __init__(self, parent=None, **kwargs):
         self.copyBufferObjStores = dict()
+        self.packLoaders: typing.Dict[Path, PackageLoader] = dict()
+        self.packSavers: typing.Dict[Package, PackageSaver] = dict()
+        # packages which are saved again, after their current saving is finished
+        self.pendingSaves: typing.Set[Package] = set()
+        self.savingFailed = False
         self.scanFolderForExistFiles()
         super(PackTreeView, self).__init__(parent,
                                            emptyViewMsg=self.EMPTY_VIEW_MSG,
@@ -221,6 +267,11 @@ class PackTreeView(TreeView):
                                     visible=False)
             self.recentFileActs.append(recentFileAct)
 
+        self.openAllRecentFilesAct = QAction("Open all recent files", self,
+                                             statusTip="Open all recent files",
+                                             triggered=lambda: self.openPacks(self.recentFiles()),
+                                             visible=False)
+
         self.saveAct = QAction(SAVE_ICON, "Save", self,
                                statusTip="Save current file",
                                triggered=lambda: self.savePack(),
@@ -513,47 +564,101 @@ class PackTreeView(TreeView):
                 # cancel pressed
                 return
 
-    def openPack(self, file: str) -> typing.Union[bool, Package]:
-        try:
-            try:
-                pack = Package(file, failsafe=False)
-            except Exception as e:
-                msgBox = QMessageBox()
-                msgBox.setIcon(QMessageBox.Icon.Warning)
-                msgBox.setText(f"Error while reading package:\n{file}")
-                msgBox.setInformativeText(
-                    "The file might not align with the official schema. "
-                    "Verify with the Tools/compliance tool for specifics. \n\n"
-                    "Proceeding may result in missing or incorrect objects. Continue anyway?")
-                msgBox.setStandardButtons(QMessageBox.StandardButton.Cancel | QMessageBox.StandardButton.Yes)
-                msgBox.setDefaultButton(QMessageBox.StandardButton.Yes)
-                msgBox.setDetailedText(f"{traceback.format_exc()}")
-                ret = msgBox.exec()
-                if ret == QMessageBox.StandardButton.Yes:
-                    pack = Package(file, failsafe=True)
-                else:
-                    return False
-            absFile = pack.file.absolute().as_posix()
-            self.updateRecentFiles(absFile)
-        except Exception as e:
-            self.removeFromRecentFiles(file)
-            dialogs.ErrorMessageBox.withTraceback(self, f"Package {file} couldn't be opened: {e}").exec()
-        else:
-            openedPacks = self.model().data(QModelIndex(), OPENED_FILES_ROLE)
-            if Path(file).absolute() in openedPacks:
-                QMessageBox.critical(self, "Error", f"Package {file} is already opened")
-            else:
-                self.add_pack_to_tree(pack)
+    def openPacks(self, files: typing.Iterable[str]) -> typing.List[PackageLoader]:
+        """Read the packages concurrently in worker processes, each is added to the tree when it is read"""
+        files = list(files)
+        executor = processPool() if len(files) > 1 else None
+        loaders = [self.openPack(file, executor=executor) for file in files]
+        return [loader for loader in loaders if loader]
+
+    def openPack(self, file: str, failsafe=True, wait=False,
+                 executor=None) -> typing.Union[bool, PackageLoader, Package]:
+        """
+        Read the package in background, it is added to the tree when reading is finished
+        :param failsafe: skip faulty objects and ask the user whether to accept the partial result
+        :param wait: block until the package is read and return the package
+        :param executor: process pool to read the package in, else it is read in a thread
+        :return: started PackageLoader or False if the package is already opened
+        """
+        absFile = Path(file).absolute()
+        openedPacks = self.model().data(QModelIndex(), OPENED_FILES_ROLE)
+        if absFile in openedPacks or absFile in self.packLoaders:
+            QMessageBox.critical(self, "Error", f"Package {file} is already opened")
+            return False
+
+        loader = PackageLoader(absFile, failsafe=failsafe, executor=executor, parent=self)
+        loader.loaded.connect(partial(self._onPackLoaded, loader))
+        loader.failed.connect(partial(self._onPackLoadFailed, loader))
+        loader.cancelled.connect(partial(self._onPackLoadCancelled, loader))
+        loader.finished.connect(partial(self._onPackLoaderFinished, loader))
+        self.packLoaders[absFile] = loader
+
+        loadingIndex = self.sourceModel().addLoadingItem(loader)
+        self.setIndexWidget(self.model().mapFromSource(loadingIndex), PackProgressWidget(loader, self))
+        loader.start()
+
+        if wait:
+            return self.waitForPack(absFile)
+        return loader
+
+    def waitForPack(self, file: Path) -> typing.Union[bool, Package]:
+        """Process events until the package is read, return the opened package or False"""
+        while file in self.packLoaders:
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        for pack in self.model().data(QModelIndex(), OPENED_PACKS_ROLE):
+            if pack.file == file:
                 return pack
         return False
 
+    def _onPackLoaded(self, loader: PackageLoader, pack: Package):
+        self.sourceModel().removeLoadingItem(loader)
+        if pack.readErrors and not self._acceptPackWithErrors(pack):
+            return
+        self.updateRecentFiles(pack.file.absolute().as_posix())
+        self.add_pack_to_tree(pack)
+
+    def _acceptPackWithErrors(self, pack: Package) -> bool:
+        msgBox = QMessageBox(self)
+        msgBox.setIcon(QMessageBox.Icon.Warning)
+        msgBox.setText(f"{len(pack.readErrors)} error(s) while reading package:\n{pack.file.as_posix()}")
+        msgBox.setInformativeText(
+            "The file might not align with the official schema. "
+            "Verify with the Tools/compliance tool for specifics. \n\n"
+            "Faulty objects were skipped, so objects may be missing or incorrect. Continue anyway?")
+        msgBox.setStandardButtons(QMessageBox.StandardButton.Cancel | QMessageBox.StandardButton.Yes)
+        msgBox.setDefaultButton(QMessageBox.StandardButton.Yes)
+        msgBox.setDetailedText("\n\n".join(pack.readErrors))
+        return msgBox.exec() == QMessageBox.StandardButton.Yes
+
+    def _onPackLoadFailed(self, loader: PackageLoader, error: str, tb: str):
+        self.sourceModel().removeLoadingItem(loader)
+        file = loader.file.as_posix()
+        self.removeFromRecentFiles(file)
+        box = dialogs.ErrorMessageBox(self)
+        box.setText(f"Package {file} couldn't be opened: {error}")
+        box.setDetailedText(tb)
+        box.exec()
+
+    def _onPackLoadCancelled(self, loader: PackageLoader):
+        self.sourceModel().removeLoadingItem(loader)
+
+    def _onPackLoaderFinished(self, loader: PackageLoader):
+        if self.packLoaders.get(loader.file) is loader:
+            del self.packLoaders[loader.file]
+        loader.deleteLater()
+
     def add_pack_to_tree(self, pack: Package):
         self.model().setData(QModelIndex(), pack, ADD_ITEM_ROLE)
 
     def savePack(self, pack: Package = None, file: str = None) -> bool:
         pack = self.currentIndex().data(PACKAGE_ROLE) if pack is None else pack
+        # the package must not be written twice at the same time
+        while pack in self.packSavers:
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
         try:
             pack.write(file)
+            if file:
+                self._onPackRenamed(pack)
             self.updateRecentFiles(pack.file.absolute().as_posix())
             if self.model().rowCount(QModelIndex()) == 1:
                 self.setWindowModified(False)
@@ -586,9 +691,88 @@ class PackTreeView(TreeView):
                     # cancel pressed
                     return
 
-    def saveAll(self):
-        saved = [self.savePack(pack) for pack in self.model().data(QModelIndex(), OPENED_PACKS_ROLE)]
-        if all(saved):
+    def saveAll(self, wait=False) -> bool:
+        """
+        Save all packages in background threads, they can be edited further meanwhile
+        :param wait: block until all packages are saved
+        :return: True if all packages were saved, if wait is False: True if saving was started
+        """
+        self.savingFailed = False
+        for pack in self.model().data(QModelIndex(), OPENED_PACKS_ROLE):
+            self.savePackInBackground(pack)
+        if wait:
+            return self.waitForSaving()
+        return not self.savingFailed
+
+    def savePackInBackground(self, pack: Package, file: str = None) -> typing.Optional[PackageSaver]:
+        """Write a snapshot of the package in the save pool, progress is shown in the row of the package"""
+        if pack in self.packSavers:
+            # Changes made since the running save started are saved afterwards
+            self.pendingSaves.add(pack)
+            return self.packSavers[pack]
+
+        try:
+            saver = PackageSaver(pack, file, parent=self)
+        except (TypeError, ValueError, KeyError) as e:
+            self.savingFailed = True
+            dialogs.ErrorMessageBox.withTraceback(self, f"Package couldn't be saved: {pack.file}: {e}").exec()
+            return None
+        if file:
+            self._onPackRenamed(pack)
+        saver.saved.connect(partial(self._onPackSaved, saver))
+        saver.failed.connect(partial(self._onPackSaveFailed, saver))
+        saver.finished.connect(partial(self._onPackSaverFinished, saver))
+        self.packSavers[pack] = saver
+
+        packIndex = self._packIndex(pack)
+        if packIndex.isValid():
+            self.setIndexWidget(packIndex, PackProgressWidget(saver, self))
+        saver.start()
+        return saver
+
+    def waitForSaving(self) -> bool:
+        """Process events until all packages are saved, return False if saving of any package failed"""
+        while self.packSavers or self.pendingSaves:
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        return not self.savingFailed
+
+    def _onPackRenamed(self, pack: Package):
+        """Show the new name of the package"""
+        model = self.sourceModel()
+        for packIndex in model.match(QModelIndex(), OBJECT_ROLE, pack, hits=1):
+            model.dataChanged.emit(packIndex, packIndex.siblingAtColumn(model.columnCount() - 1))
+
+    def _packIndex(self, pack: Package) -> QModelIndex:
+        try:
+            packIndex, = self.model().match(QModelIndex(), OBJECT_ROLE, pack, hits=1)
+            return packIndex
+        except ValueError:
+            return QModelIndex()
+
+    def _onPackSaved(self, saver: PackageSaver):
+        saver.snapshot.apply()
+        self.updateRecentFiles(saver.file.absolute().as_posix())
+
+    def _onPackSaveFailed(self, saver: PackageSaver, error: str, tb: str):
+        self.savingFailed = True
+        box = dialogs.ErrorMessageBox(self)
+        box.setText(f"Package couldn't be saved: {saver.file.as_posix()}: {error}")
+        box.setDetailedText(tb)
+        box.exec()
+
+    def _onPackSaverFinished(self, saver: PackageSaver):
+        pack = saver.package
+        if self.packSavers.get(pack) is saver:
+            del self.packSavers[pack]
+        packIndex = self._packIndex(pack)
+        if packIndex.isValid():
+            self.setIndexWidget(packIndex, None)
+        saver.deleteLater()
+
+        if pack in self.pendingSaves:
+            self.pendingSaves.discard(pack)
+            self.savePackInBackground(pack)
+        elif not self.packSavers and not self.savingFailed and not saver.snapshot.packageChanged():
             self.setWindowModified(False)
 
     def closeFileWithDialog(self):
@@ -665,13 +849,16 @@ class PackTreeView(TreeView):
             files = []
         settings.setValue('recentFiles', files)
 
-    def updateRecentFileActs(self):
+    def recentFiles(self) -> typing.List[str]:
         settings = QSettings(IAT, APPLICATION_NAME)
         files = settings.value('recentFiles', [])
         try:
-            files = files[:MAX_RECENT_FILES]
+            return files[:MAX_RECENT_FILES]
         except TypeError:
-            files = []
+            return []
+
+    def updateRecentFileActs(self):
+        files = self.recentFiles()
 
         for i, file in enumerate(files):
             recentFileAct = self.recentFileActs[i]
@@ -682,6 +869,7 @@ class PackTreeView(TreeView):
 
         for i in range(len(files), MAX_RECENT_FILES):
             self.recentFileActs[i].setVisible(False)
+        self.openAllRecentFilesAct.setVisible(len(files) > 1)
 
         self.recentFilesSeparator.setVisible(bool(files))
 
@@ -729,9 +917,7 @@ class PackTreeView(TreeView):
             event.accept()
 
     def dropEvent(self, e: QDropEvent) -> None:
-        for url in e.mimeData().urls():
-            file = str(url.toLocalFile())
-            self.openPack(file)
+        self.openPacks(str(url.toLocalFile()) for url in e.mimeData().urls())
 
     def onDelClear(self):
         index = self.currentIndex()
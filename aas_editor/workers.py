@@ -0,0 +1,203 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Union, Optional
+
+from PyQt6.QtCore import QThread, QObject, pyqtSignal
+
+from aas_editor.package import Package, PackageSnapshot
+from aas_editor.package_reader import PackageLoadCancelled, PackageTransferError, readPackageFileInProcess
+
+_processPool: Optional[ProcessPoolExecutor] = None
+_processPoolLock = threading.Lock()
+_savePool: Optional[ThreadPoolExecutor] = None
+_savePoolLock = threading.Lock()
+MAX_SAVING_THREADS = 4
+
+
+def processPool() -> Optional[ProcessPoolExecutor]:
+    """Shared pool of worker processes for reading packages, None if processes are not available"""
+    global _processPool
+    with _processPoolLock:
+        if _processPool is None:
+            try:
+                # "spawn" doesn't copy the Qt state of the GUI process into the workers
+                _processPool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                                   mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, ValueError, NotImplementedError) as e:
+                logging.exception(f"Process pool could not be started: {e}")
+                return None
+        return _processPool
+
+
+def resetProcessPool():
+    global _processPool
+    with _processPoolLock:
+        if _processPool is not None:
+            _processPool.shutdown(wait=False, cancel_futures=True)
+        _processPool = None
+
+
+def savePool() -> ThreadPoolExecutor:
+    """Shared pool of threads for writing packages"""
+    global _savePool
+    with _savePoolLock:
+        if _savePool is None:
+            _savePool = ThreadPoolExecutor(max_workers=min(MAX_SAVING_THREADS, os.cpu_count() or 1),
+                                           thread_name_prefix="PackageSaver")
+        return _savePool
+
+
+class PackageLoader(QThread):
+    """Reads a package in a background thread or, if executor is given, in a worker process"""
+    POLL_INTERVAL = 0.1  # sec
+
+    progress = pyqtSignal(int)  # percent of the read file
+    loaded = pyqtSignal(object)  # Package
+    failed = pyqtSignal(str, str)  # error message, traceback
+    cancelled = pyqtSignal()
+
+    def __init__(self, file: Union[str, Path], failsafe=True, executor: ProcessPoolExecutor = None, parent=None):
+        super(PackageLoader, self).__init__(parent)
+        self.file = Path(file).absolute()
+        self.failsafe = failsafe
+        self.executor = executor
+        # settings are read here in the GUI thread
+        self.cache = Package.snapshotCache()
+        self.package = None
+        self._percent = -1
+
+    def __str__(self):
+        return f"Loading {self.name}..."
+
+    @property
+    def name(self):
+        return self.file.name
+
+    @property
+    def reportsProgress(self) -> bool:
+        """Worker processes can't report the read progress"""
+        return self.executor is None
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            package = self._readInProcess() if self.executor else self._readInThread()
+        except Exception as e:
+            # Reader libs may wrap the PackageLoadCancelled, so check the interruption flag
+            if isinstance(e, PackageLoadCancelled) or self.isInterruptionRequested():
+                self.cancelled.emit()
+            else:
+                self.failed.emit(str(e), traceback.format_exc())
+            return
+
+        if self.isInterruptionRequested():
+            self.cancelled.emit()
+        else:
+            self.package = package
+            self.progress.emit(100)
+            self.loaded.emit(package)
+
+    def _readInThread(self) -> Package:
+        return Package(self.file, failsafe=self.failsafe, progress=self._onProgress, cache=self.cache)
+
+    def _readInProcess(self) -> Package:
+        try:
+            future: Future = self.executor.submit(readPackageFileInProcess, self.file, self.failsafe, self.cache)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logging.warning(f"Reading {self.file} in the current process: {e}")
+            resetProcessPool()
+            return self._readInThread()
+
+        while not future.done():
+            if self.isInterruptionRequested():
+                future.cancel()
+                raise PackageLoadCancelled(self.file)
+            wait([future], timeout=self.POLL_INTERVAL)
+
+        try:
+            objStore, fileStore, readErrors = pickle.loads(future.result())
+        except (PackageTransferError, BrokenProcessPool, pickle.UnpicklingError) as e:
+            logging.warning(f"Reading {self.file} in the current process: {e}")
+            if isinstance(e, BrokenProcessPool):
+                resetProcessPool()
+            return self._readInThread()
+        return Package.fromStores(self.file, objStore, fileStore, readErrors)
+
+    def _onProgress(self, readBytes: int, fileSize: int):
+        if self.isInterruptionRequested():
+            raise PackageLoadCancelled(self.file)
+        percent = int(readBytes * 100 / fileSize) if fileSize else 0
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+
+class PackageSaver(QObject):
+    """Writes a snapshot of a package in a thread of the save pool, while the package can be edited further"""
+    progress = pyqtSignal(int)  # percent of written objects and files
+    saved = pyqtSignal()
+    failed = pyqtSignal(str, str)  # error message, traceback
+    finished = pyqtSignal()
+
+    def __init__(self, package: Package, file: Union[str, Path] = None, parent=None):
+        """The snapshot is taken here, so the saver must be created in the GUI thread"""
+        super(PackageSaver, self).__init__(parent)
+        self.package = package
+        self.snapshot: PackageSnapshot = package.snapshot(file)
+        self.future: Optional[Future] = None
+        self._percent = -1
+
+    def __str__(self):
+        return f"Saving {self.name}..."
+
+    @property
+    def name(self):
+        return self.snapshot.file.name
+
+    @property
+    def file(self) -> Path:
+        return self.snapshot.file
+
+    @property
+    def reportsProgress(self) -> bool:
+        return True
+
+    def start(self, executor: ThreadPoolExecutor = None):
+        executor = savePool() if executor is None else executor
+        self.future = executor.submit(self.run)
+
+    def run(self):
+        try:
+            self.snapshot.write(progress=self._onProgress)
+        except Exception as e:
+            self.failed.emit(str(e), traceback.format_exc())
+        else:
+            self.progress.emit(100)
+            self.saved.emit()
+        finally:
+            self.finished.emit()
+
+    def _onProgress(self, writtenItems: int, numOfItems: int):
+        percent = int(writtenItems * 100 / numOfItems) if numOfItems else 0
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
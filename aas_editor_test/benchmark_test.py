@@ -0,0 +1,140 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+"""Timing and memory benchmarks of the models, run only if AAS_EDITOR_BENCHMARKS=1 is set."""
+
+import os
+import tracemalloc
+from time import perf_counter
+from unittest import TestCase, skipUnless
+
+from PyQt6.QtCore import QModelIndex
+from PyQt6.QtWidgets import QTreeView
+
+from aas_editor.models import StandardTable
+from aas_editor.settings.app_settings import OBJECT_ROLE, ADD_ITEM_ROLE
+from table_standard_test import table, objOf
+
+BENCHMARKS_ENABLED = os.environ.get("AAS_EDITOR_BENCHMARKS") == "1"
+SKIP_REASON = "benchmarks are enabled with AAS_EDITOR_BENCHMARKS=1"
+
+SIBLING_COUNTS = (1000, 10000, 50000)
+VISIBLE_ROWS = 50
+REPEATS = 20
+# Allowed growth of the cost per visible row from the smallest to the largest sibling count
+MAX_COST_GROWTH = 3
+NODE_COUNT = 10000
+MAX_BYTES_PER_NODE = 1024
+BULK_COUNT = 2000
+
+
+def scrollCost(model: StandardTable) -> float:
+    """Time per visible row of painting a page in the middle of the siblings"""
+    listIndex = model.index(0, 0)
+    firstRow = model.rowCount(listIndex) // 2
+    start = perf_counter()
+    for _ in range(REPEATS):
+        for row in range(firstRow, firstRow + VISIBLE_ROWS):
+            for column in range(model.columnCount()):
+                index = model.index(row, column, listIndex)
+                model.parent(index)
+                model.parent(index.parent())
+                model.objByIndex(index).row()
+    return (perf_counter() - start) / (REPEATS * VISIBLE_ROWS)
+
+
+def expandCost(model: StandardTable) -> float:
+    """Time per visible row of expanding the items at the end of the siblings after a row was removed"""
+    listIndex = model.index(0, 0)
+    model.removeRows(0, 1, listIndex)
+    lastRow = model.rowCount(listIndex) - 1
+    # the rows of the siblings are recalculated once by the first lookup after the removal
+    model.objByIndex(model.index(lastRow, 0, listIndex)).row()
+    start = perf_counter()
+    for row in range(lastRow, lastRow - VISIBLE_ROWS, -1):
+        index = model.index(row, 0, listIndex)
+        model.hasChildren(index)
+        model.fetchMore(index)
+        for childRow in range(model.rowCount(index)):
+            model.parent(model.index(childRow, 0, index))
+    return (perf_counter() - start) / VISIBLE_ROWS
+
+
+def matchCost(model: StandardTable) -> float:
+    """Time per lookup of the items of objects in the middle of the siblings"""
+    listIndex = model.index(0, 0)
+    firstRow = model.rowCount(listIndex) // 2
+    objs = [objOf(model, model.index(row, 0, listIndex)) for row in range(firstRow, firstRow + VISIBLE_ROWS)]
+    start = perf_counter()
+    for obj in objs:
+        model.match(QModelIndex(), OBJECT_ROLE, obj, hits=1)
+    return (perf_counter() - start) / VISIBLE_ROWS
+
+
+@skipUnless(BENCHMARKS_ENABLED, SKIP_REASON)
+class TestChildPositionBenchmark(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.models = {count: table(count) for count in SIBLING_COUNTS}
+
+    def _assertFlat(self, cost):
+        costs = {count: cost(model) for count, model in self.models.items()}
+        smallest, largest = costs[min(SIBLING_COUNTS)], costs[max(SIBLING_COUNTS)]
+        self.assertLess(largest, smallest * MAX_COST_GROWTH, f"Costs per row by sibling count: {costs}")
+
+    def testScrollCost(self):
+        self._assertFlat(scrollCost)
+
+    def testExpandCost(self):
+        self._assertFlat(expandCost)
+
+    def testMatchCost(self):
+        self._assertFlat(matchCost)
+
+
+@skipUnless(BENCHMARKS_ENABLED, SKIP_REASON)
+class TestItemMemoryBenchmark(TestCase):
+    def testBytesPerNode(self):
+        # fill the shared per-type tables before measuring
+        table(1).fetchAll()
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            model = table(NODE_COUNT)
+            model.fetchAll()
+            size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        # each list item and its int item, including the objects shown by them
+        bytesPerNode = size / (2 * NODE_COUNT)
+        self.assertLess(bytesPerNode, MAX_BYTES_PER_NODE)
+
+
+@skipUnless(BENCHMARKS_ENABLED, SKIP_REASON)
+class TestBulkInsertBenchmark(TestCase):
+    def _addCost(self, addObjs) -> float:
+        """Time of adding the objects to an expanded list shown in a view"""
+        model = table(10)
+        listIndex = model.index(0, 0)
+        view = QTreeView()
+        view.setModel(model)
+        view.expand(listIndex)
+        start = perf_counter()
+        addObjs(model, listIndex, [[i] for i in range(BULK_COUNT)])
+        return perf_counter() - start
+
+    def testAddItems(self):
+        def addOneByOne(model, parent, objs):
+            for obj in objs:
+                model.setData(parent, obj, ADD_ITEM_ROLE)
+
+        bulkSeconds = self._addCost(lambda model, parent, objs: model.addItems(objs, parent))
+        oneByOneSeconds = self._addCost(addOneByOne)
+        self.assertLess(bulkSeconds, oneByOneSeconds)
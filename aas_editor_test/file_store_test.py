@@ -0,0 +1,102 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import copy
+import gc
+import io
+import pickle
+import tempfile
+import uuid
+from unittest import TestCase
+
+from aas_editor.file_store import BlobStore, BlobSupplementaryFileContainer, blobStore, readSupplementaryFile
+
+
+def uniqueContent() -> bytes:
+    """Content, which is not stored by other tests in the shared blob store"""
+    return uuid.uuid4().bytes
+
+
+class TestBlobStore(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.store = BlobStore(self.tmpDir.name)
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def testIdenticalContentIsStoredOnce(self):
+        sha1 = self.store.add(io.BytesIO(b"content"))
+        sha2 = self.store.add(io.BytesIO(b"content"))
+        self.assertEqual(sha1, sha2)
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.size(), len(b"content"))
+        with self.store.open(sha1) as f:
+            self.assertEqual(f.read(), b"content")
+
+    def testBlobIsRemovedWithLastReference(self):
+        sha = self.store.add(io.BytesIO(b"content"))
+        self.store.acquire(sha)
+        self.store.release(sha)
+        self.assertIn(sha, self.store)
+        self.assertTrue(self.store.path(sha).exists())
+        self.store.release(sha)
+        self.assertNotIn(sha, self.store)
+        self.assertFalse(self.store.path(sha).exists())
+
+    def testUnknownBlobCanNotBeAcquired(self):
+        with self.assertRaises(KeyError):
+            self.store.acquire(b"unknown")
+
+
+class TestBlobSupplementaryFileContainer(TestCase):
+    def testContainersShareContent(self):
+        content = uniqueContent()
+        container1 = BlobSupplementaryFileContainer()
+        container2 = BlobSupplementaryFileContainer()
+        name1 = container1.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        name2 = container2.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        sha = container1.get_sha256(name1)
+        self.assertEqual(container2.get_sha256(name2), sha)
+
+        del container1
+        gc.collect()
+        self.assertIn(sha, blobStore())
+        self.assertEqual(readSupplementaryFile(container2, name2), content)
+        del container2
+        gc.collect()
+        self.assertNotIn(sha, blobStore())
+
+    def testSameFileIsAddedOnce(self):
+        content = uniqueContent()
+        container = BlobSupplementaryFileContainer()
+        name1 = container.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        name2 = container.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        self.assertEqual(name1, name2)
+        name3 = container.add_file("/aasx/file.txt", io.BytesIO(uniqueContent()), "text/plain")
+        self.assertNotEqual(name3, name1)
+
+    def testCopyKeepsContentOfRemovedOriginal(self):
+        content = uniqueContent()
+        container = BlobSupplementaryFileContainer()
+        name = container.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        containerCopy = copy.deepcopy(container)
+        del container
+        gc.collect()
+        self.assertEqual(readSupplementaryFile(containerCopy, name), content)
+
+    def testPickledContainerKeepsContent(self):
+        content = uniqueContent()
+        container = BlobSupplementaryFileContainer()
+        name = container.add_file("/aasx/file.txt", io.BytesIO(content), "text/plain")
+        containerCopy = pickle.loads(pickle.dumps(container))
+        del container
+        gc.collect()
+        self.assertEqual(readSupplementaryFile(containerCopy, name), content)
@@ -0,0 +1,134 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import pickle
+from unittest import TestCase
+
+from basyx.aas.model import Submodel, ConceptDescription, DictObjectStore, Property, ModelReference, datatypes
+
+from aas_editor.object_store import IndexedObjectStore, IdChangeJournal, ReferenceCache, indexedObjectStore
+
+
+def rename(journal: IdChangeJournal, obj, newId):
+    oldId = obj.id
+    obj.id = newId
+    journal.record(obj, oldId)
+
+
+class TestIndexedObjectStore(TestCase):
+    def setUp(self) -> None:
+        self.sm1 = Submodel("http://acplt.org/sm1")
+        self.sm2 = Submodel("http://acplt.org/sm2")
+        self.cd = ConceptDescription("http://acplt.org/cd")
+        self.store = IndexedObjectStore([self.sm1, self.sm2, self.cd])
+
+    def test_objectsAreIndexedByType(self):
+        self.assertEqual(set(self.store.objectsOfType(Submodel)), {self.sm1, self.sm2})
+        self.assertEqual(self.store.objectsOfType(ConceptDescription), (self.cd,))
+        self.assertEqual(self.store.numOfType(Submodel), 2)
+
+    def test_discardedObjectIsRemovedFromIndex(self):
+        self.store.discard(self.sm1)
+        self.assertEqual(self.store.objectsOfType(Submodel), (self.sm2,))
+        # other objects with the same id are not discarded
+        self.store.discard(Submodel("http://acplt.org/sm2"))
+        self.assertEqual(self.store.numOfType(Submodel), 1)
+
+    def test_rekeyedObjectIsFoundByNewId(self):
+        self.sm1.id = "http://acplt.org/renamed"
+        self.store.rekey("http://acplt.org/sm1", self.sm1)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/renamed"), self.sm1)
+        self.assertNotIn("http://acplt.org/sm1", self.store._backend)
+        self.assertEqual(set(self.store.objectsOfType(Submodel)), {self.sm1, self.sm2})
+
+    def test_rekeyToUsedIdFails(self):
+        self.sm1.id = "http://acplt.org/sm2"
+        with self.assertRaises(KeyError):
+            self.store.rekey("http://acplt.org/sm1", self.sm1)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm2"), self.sm2)
+
+    def test_indexIsKeptByPickling(self):
+        store = pickle.loads(pickle.dumps(self.store))
+        self.assertEqual(store.numOfType(Submodel), 2)
+
+    def test_plainStoreIsConverted(self):
+        store = indexedObjectStore(DictObjectStore([self.sm1, self.cd]))
+        self.assertEqual(store.objectsOfType(Submodel), (self.sm1,))
+        self.assertIs(indexedObjectStore(store), store)
+        self.assertEqual(len(indexedObjectStore(None)), 0)
+
+
+class TestIdChangeJournal(TestCase):
+    def setUp(self) -> None:
+        self.sm1 = Submodel("http://acplt.org/sm1")
+        self.sm2 = Submodel("http://acplt.org/sm2")
+        self.store = IndexedObjectStore([self.sm1, self.sm2])
+        self.journal = IdChangeJournal()
+
+    def test_swappedIdsAreApplied(self):
+        rename(self.journal, self.sm1, "http://acplt.org/tmp")
+        rename(self.journal, self.sm2, "http://acplt.org/sm1")
+        rename(self.journal, self.sm1, "http://acplt.org/sm2")
+        self.assertEqual(self.journal.apply(self.store), [])
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm1"), self.sm2)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm2"), self.sm1)
+        self.assertEqual(self.journal.numOfPending(), 0)
+
+    def test_conflictingChangeIsDropped(self):
+        sm3 = Submodel("http://acplt.org/sm3")
+        self.store.add(sm3)
+        rename(self.journal, self.sm1, "http://acplt.org/sm2")
+        rename(self.journal, sm3, "http://acplt.org/sm4")
+        self.assertEqual(self.journal.apply(self.store), [self.sm1])
+        self.assertEqual(self.journal.numOfPending(), 0)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm1"), self.sm1)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm2"), self.sm2)
+        self.assertIs(self.store.get_identifiable("http://acplt.org/sm4"), sm3)
+        self.assertEqual(self.journal.apply(self.store), [])
+
+    def test_idRenamedBackIsNotPending(self):
+        rename(self.journal, self.sm1, "http://acplt.org/tmp")
+        rename(self.journal, self.sm1, "http://acplt.org/sm1")
+        self.assertEqual(self.journal.numOfPending(), 0)
+        self.assertEqual(self.journal.oldIds(), {"http://acplt.org/tmp"})
+
+    def test_oldIdsPointToCurrentId(self):
+        rename(self.journal, self.sm1, "http://acplt.org/tmp")
+        rename(self.journal, self.sm1, "http://acplt.org/new")
+        self.assertTrue(self.journal.isOldId("http://acplt.org/sm1"))
+        self.assertEqual(self.journal.currentId("http://acplt.org/sm1"), "http://acplt.org/new")
+        self.assertEqual(self.journal.currentId("http://acplt.org/tmp"), "http://acplt.org/new")
+        self.assertIsNone(self.journal.currentId("http://acplt.org/sm2"))
+
+
+class TestReferenceCache(TestCase):
+    def setUp(self) -> None:
+        self.submodel = Submodel("http://acplt.org/sm1", id_short="sm1")
+        self.prop = Property("Prop", datatypes.Int, 1)
+        self.submodel.submodel_element.add(self.prop)
+        self.store = IndexedObjectStore([self.submodel])
+        self.cache = ReferenceCache()
+
+    def test_referenceIsResolvedOnce(self):
+        reference = ModelReference.from_referable(self.prop)
+        self.assertIs(self.cache.resolve(reference, self.store), self.prop)
+        self.submodel.submodel_element.remove(self.prop)
+        # resolved from the cache until it is invalidated
+        self.assertIs(self.cache.resolve(reference, self.store), self.prop)
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.resolve(reference, self.store))
+
+    def test_failuresAreCachedAndCounted(self):
+        reference = ModelReference.from_referable(self.prop)
+        self.submodel.submodel_element.remove(self.prop)
+        self.assertIsNone(self.cache.resolve(reference, self.store))
+        self.assertIsNone(self.cache.resolve(reference, self.store))
+        self.assertEqual(self.cache.numOfFailures, 1)
+        self.assertEqual(len(self.cache), 1)
@@ -0,0 +1,348 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import io
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from basyx.aas.adapter.json import write_aas_json_file
+from basyx.aas.adapter.xml import write_aas_xml_file
+from basyx.aas.model import Submodel, File, Property, AssetAdministrationShell, AssetInformation, \
+    AssetKind, DictObjectStore, datatypes
+
+from aas_editor.file_store import ZipSupplementaryFileContainer, readSupplementaryFile
+from aas_editor.package import Package
+from aas_editor.package_reader import ReadErrorCollector, PackageCache, readPackageFile, readPackageFileInProcess
+from aas_editor.package_writer import writeAasxFile, writeJson, writeXml, SerializationCache
+
+FILES = {"/aasx/kept.txt": b"kept", "/aasx/dropped.txt": b"dropped"}
+
+
+class TestAasxFiles(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.aasx")
+        pack = Package()
+        submodel = Submodel("http://acplt.org/Submodels/Test", id_short="Test")
+        for i, (name, content) in enumerate(FILES.items()):
+            pack.fileStore.add_file(name, io.BytesIO(content), "text/plain")
+            submodel.submodel_element.add(File(f"file{i}", "text/plain", name))
+        pack.add(submodel)
+        pack.write(self.file.as_posix())
+
+        self.pack = Package(self.file.as_posix())
+        self.submodel = self.pack.objStore.get_identifiable("http://acplt.org/Submodels/Test")
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def assertFilesReadable(self, pack: Package):
+        for name, content in FILES.items():
+            self.assertEqual(readSupplementaryFile(pack.fileStore, name), content)
+
+    def testFilesAreStreamedFromArchive(self):
+        self.assertIsInstance(self.pack.fileStore, ZipSupplementaryFileContainer)
+        for name in FILES:
+            self.assertTrue(self.pack.fileStore.isArchived(name))
+        # only indexed while reading
+        self.assertEqual(self.pack.fileStore._store, {})
+        self.assertFilesReadable(self.pack)
+
+    def testFilesAreReadableAfterWrite(self):
+        self.pack.write()
+        self.assertFilesReadable(self.pack)
+        self.assertFilesReadable(Package(self.file.as_posix()))
+
+    def testFilesAreWrittenToOtherFile(self):
+        otherFile = Path(self.tmpDir.name, "other.aasx")
+        self.pack.write(otherFile.as_posix())
+        self.assertFilesReadable(self.pack)
+        self.assertFilesReadable(Package(otherFile.as_posix()))
+
+    def testFileStoreCanBePickled(self):
+        fileStore = pickle.loads(pickle.dumps(self.pack.fileStore))
+        for name, content in FILES.items():
+            self.assertEqual(readSupplementaryFile(fileStore, name), content)
+
+    def testFilesAreSwitchedOnlyWhenApplied(self):
+        self.submodel.submodel_element.remove(self.submodel.get_referable("file1"))
+        self.pack.invalidateSerialization(self.submodel)
+
+        snapshot = self.pack.snapshot()
+        snapshot.write()
+        self.assertTrue(self.pack.fileStore.isArchived("/aasx/dropped.txt"))
+
+        snapshot.apply()
+        self.assertFalse(self.pack.fileStore.isArchived("/aasx/dropped.txt"))
+        self.assertTrue(self.pack.fileStore.isArchived("/aasx/kept.txt"))
+        self.assertEqual(readSupplementaryFile(self.pack.fileStore, "/aasx/kept.txt"), b"kept")
+
+    def testFilesAreSwitchedAfterSyncWrite(self):
+        self.submodel.submodel_element.remove(self.submodel.get_referable("file1"))
+        self.pack.invalidateSerialization(self.submodel)
+        self.pack.write()
+        self.assertFalse(self.pack.fileStore.isArchived("/aasx/dropped.txt"))
+        self.assertEqual(readSupplementaryFile(self.pack.fileStore, "/aasx/kept.txt"), b"kept")
+
+    def writtenFiles(self, incremental: bool):
+        """Write the package and return the names of files, which were decompressed for writing"""
+        with mock.patch.object(self.pack.fileStore, "write_file", wraps=self.pack.fileStore.write_file) as writeFile:
+            writeAasxFile(self.file, self.pack.objStore, self.pack.fileStore, incremental=incremental)
+        return {call.args[0] for call in writeFile.call_args_list}
+
+    def testUnchangedFilesAreCopied(self):
+        with zipfile.ZipFile(self.file) as previousZip:
+            previousInfos = {f"/{info.filename}": info for info in previousZip.infolist()}
+
+        self.assertEqual(self.writtenFiles(incremental=True), set())
+        with zipfile.ZipFile(self.file) as newZip:
+            self.assertIsNone(newZip.testzip())
+            for name in FILES:
+                info = newZip.getinfo(name[1:])
+                self.assertEqual(info.CRC, previousInfos[name].CRC)
+                self.assertEqual(info.compress_size, previousInfos[name].compress_size)
+        self.assertFilesReadable(self.pack)
+        self.assertFilesReadable(Package(self.file.as_posix()))
+
+    def testFilesAreCompressedAgainIfNotIncremental(self):
+        self.assertEqual(self.writtenFiles(incremental=False), set(FILES))
+        self.assertFilesReadable(Package(self.file.as_posix()))
+
+    def testChangedFilesAreWrittenIncrementally(self):
+        submodel = next(iter(self.pack.submodels))
+        submodel.submodel_element.remove(submodel.get_referable("file1"))
+        newName = self.pack.fileStore.add_file("/aasx/added.txt", io.BytesIO(b"added"), "text/plain")
+        submodel.submodel_element.add(File("file2", "text/plain", newName))
+
+        self.assertEqual(self.writtenFiles(incremental=True), {newName})
+        pack = Package(self.file.as_posix())
+        self.assertEqual(readSupplementaryFile(pack.fileStore, "/aasx/kept.txt"), b"kept")
+        self.assertEqual(readSupplementaryFile(pack.fileStore, newName), b"added")
+        with zipfile.ZipFile(self.file) as newZip:
+            self.assertNotIn("aasx/dropped.txt", newZip.namelist())
+
+
+class TestSerializationCache(TestCase):
+    def setUp(self) -> None:
+        self.submodel = Submodel("http://acplt.org/Submodels/Test", id_short="Test")
+        self.submodel.submodel_element.add(Property("Prop", datatypes.Int, 1))
+        shell = AssetAdministrationShell(AssetInformation(AssetKind.INSTANCE, global_asset_id="http://acplt.org/Asset"),
+                                         "http://acplt.org/Shells/Test", id_short="Shell")
+        self.objStore = DictObjectStore([self.submodel, shell])
+        self.cache = SerializationCache()
+
+    def assertSameAsBasyx(self):
+        for indent in (None, 4):
+            expected = io.StringIO()
+            write_aas_json_file(expected, self.objStore, indent=indent)
+            written = io.StringIO()
+            writeJson(written, self.objStore, self.cache, indent)
+            self.assertEqual(json.loads(written.getvalue()), json.loads(expected.getvalue()))
+            if indent is not None:
+                self.assertEqual(written.getvalue(), expected.getvalue())
+
+        expected = io.BytesIO()
+        write_aas_xml_file(expected, self.objStore)
+        written = io.BytesIO()
+        writeXml(written, self.objStore, self.cache)
+        self.assertEqual(written.getvalue(), expected.getvalue())
+
+    def testOutputIsSameAsOfBasyxWriters(self):
+        self.assertSameAsBasyx()
+        # second time from the cache
+        self.assertSameAsBasyx()
+
+    def testFragmentsAreReusedUntilInvalidated(self):
+        serialize = mock.Mock(return_value="fragment")
+        self.assertEqual(self.cache.fragment(self.submodel, "test", serialize), "fragment")
+        self.cache.fragment(self.submodel, "test", serialize)
+        self.assertEqual(serialize.call_count, 1)
+
+        self.cache.invalidate(self.submodel)
+        self.cache.fragment(self.submodel, "test", serialize)
+        self.assertEqual(serialize.call_count, 2)
+
+    def testChangedObjectIsWrittenAfterInvalidation(self):
+        self.assertSameAsBasyx()
+        self.submodel.id_short = "Changed"
+        self.cache.invalidate(self.submodel)
+        self.assertSameAsBasyx()
+
+
+class TestPackageSnapshot(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.json")
+        self.submodel = Submodel("http://acplt.org/Submodels/Test", id_short="Test")
+        self.pack = Package()
+        self.pack.add(self.submodel)
+        self.pack.write(self.file.as_posix())
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def readSubmodel(self) -> Submodel:
+        return Package(self.file.as_posix()).objStore.get_identifiable("http://acplt.org/Submodels/Test")
+
+    def testEditsAfterSnapshotAreNotWritten(self):
+        self.submodel.id_short = "Saved"
+        self.pack.invalidateSerialization(self.submodel)
+        snapshot = self.pack.snapshot()
+        self.submodel.id_short = "EditedLater"
+        self.pack.invalidateSerialization(self.submodel)
+
+        snapshot.write()
+        self.assertEqual(self.readSubmodel().id_short, "Saved")
+        self.assertTrue(snapshot.packageChanged())
+
+    def testFragmentsOfUneditedCopiesAreMergedBack(self):
+        self.pack.invalidateSerialization(self.submodel)
+        snapshot = self.pack.snapshot()
+        snapshot.write()
+        snapshot.apply()
+        self.assertFalse(snapshot.packageChanged())
+        self.assertTrue(self.pack.serializationCache.fragments(self.submodel))
+
+    def testFragmentsOfEditedCopiesAreNotMergedBack(self):
+        self.pack.invalidateSerialization(self.submodel)
+        snapshot = self.pack.snapshot()
+        self.submodel.id_short = "EditedLater"
+        self.pack.invalidateSerialization(self.submodel)
+        snapshot.write()
+        snapshot.apply()
+        self.assertFalse(self.pack.serializationCache.fragments(self.submodel))
+
+        self.pack.write()
+        self.assertEqual(self.readSubmodel().id_short, "EditedLater")
+
+
+class TestFailsafeReading(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.json")
+        pack = Package()
+        pack.add(Submodel("http://acplt.org/Submodels/Valid", id_short="Valid"))
+        pack.add(Submodel("http://acplt.org/Submodels/Faulty", id_short="Faulty"))
+        pack.write(self.file.as_posix())
+
+        with open(self.file, encoding="utf-8") as f:
+            env = json.load(f)
+        for submodel in env["submodels"]:
+            if submodel["idShort"] == "Faulty":
+                submodel["idShort"] = "1 is no valid idShort"
+        with open(self.file, "w", encoding="utf-8") as f:
+            json.dump(env, f)
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def testErrorsAreCollected(self):
+        pack = Package(self.file, failsafe=True)
+        self.assertEqual([submodel.id_short for submodel in pack.submodels], ["Valid"])
+        self.assertTrue(pack.readErrors)
+        for error in pack.readErrors:
+            self.assertIn("Faulty", error)
+
+    def testErrorsAreSentBackFromWorkerProcesses(self):
+        objStore, fileStore, errors = pickle.loads(readPackageFileInProcess(self.file, failsafe=True))
+        self.assertEqual(len(objStore), 1)
+        self.assertTrue(errors)
+
+    def testFaultyFileRaisesIfNotFailsafe(self):
+        with self.assertRaises(Exception):
+            Package(self.file, failsafe=False)
+
+    def testErrorsOfOtherThreadsAreNotCollected(self):
+        errors = []
+        with ReadErrorCollector(errors):
+            thread = threading.Thread(target=logging.getLogger("basyx").error, args=("other",))
+            thread.start()
+            thread.join()
+            logging.getLogger("basyx").error("own")
+        self.assertEqual(errors, ["own"])
+
+
+class TestPackageCache(TestCase):
+    SUFFIX = ".json"
+
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, f"test{self.SUFFIX}")
+        self.cache = PackageCache(Path(self.tmpDir.name, "cache"), 1024 * 1024)
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def writeSubmodel(self, idShort: str):
+        pack = Package()
+        pack.add(Submodel("http://acplt.org/Submodels/Test", id_short=idShort))
+        pack.write(self.file.as_posix())
+
+    def readSubmodel(self) -> Submodel:
+        objStore, fileStore = readPackageFile(self.file, cache=self.cache)
+        return objStore.get_identifiable("http://acplt.org/Submodels/Test")
+
+    def testSnapshotIsUsedForUnchangedFile(self):
+        self.writeSubmodel("Test1")
+        self.readSubmodel()
+        key = self.cache.key(self.file)
+        self.assertIsNotNone(self.cache.load(key, self.file))
+        self.assertEqual(self.readSubmodel().id_short, "Test1")
+
+    def testChangedContentWithSameSizeAndTimeIsReadAgain(self):
+        self.writeSubmodel("Test1")
+        self.readSubmodel()
+        stat = self.file.stat()
+        key = self.cache.key(self.file)
+
+        self.writeSubmodel("Test2")
+        os.utime(self.file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.cache.key(self.file), key)
+        self.assertIsNone(self.cache.load(key, self.file))
+        self.assertEqual(self.readSubmodel().id_short, "Test2")
+
+    def testContentIsHashedWhileParsing(self):
+        self.writeSubmodel("Test1")
+        self.readSubmodel()
+        with open(self.cache._snapshotFile(self.cache.key(self.file)), "rb") as f:
+            self.assertEqual(f.read(32), PackageCache.contentHash(self.file))
+
+    def testSnapshotOfOtherVersionIsNotUsed(self):
+        self.writeSubmodel("Test1")
+        self.readSubmodel()
+        key = self.cache.key(self.file)
+        self.cache.VERSION = PackageCache.VERSION + 1
+        self.assertNotEqual(self.cache.key(self.file), key)
+        self.assertIsNone(self.cache.load(self.cache.key(self.file), self.file))
+
+
+class TestXmlPackageCache(TestPackageCache):
+    SUFFIX = ".xml"
+
+
+class TestAasxPackageCache(TestPackageCache):
+    SUFFIX = ".aasx"
+
+    def testChangedContentWithSameSizeAndTimeIsReadAgain(self):
+        # the size of a rewritten archive differs, so the snapshot of the old key is checked directly
+        self.writeSubmodel("Test1")
+        self.readSubmodel()
+        key = self.cache.key(self.file)
+
+        self.writeSubmodel("Test2")
+        self.assertIsNone(self.cache.load(key, self.file))
+        self.assertEqual(self.readSubmodel().id_short, "Test2")
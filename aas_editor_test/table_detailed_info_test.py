@@ -0,0 +1,100 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import gc
+import weakref
+from unittest import TestCase
+
+from PyQt6.QtCore import QModelIndex, Qt
+from basyx.aas.model import Submodel, Qualifier, datatypes
+
+from aas_editor.models import PacksTable, PackTreeViewItem, DetailedInfoTable
+from aas_editor.models.table_detailed_info import DetailedInfoTableCache
+from aas_editor.package import Package
+from aas_editor.settings.app_settings import DEFAULT_COLUMNS_IN_PACKS_TABLE, ADD_ITEM_ROLE, OBJECT_ROLE
+
+
+class TestDetailedInfoTablePopulation(TestCase):
+    def setUp(self) -> None:
+        self.submodel = Submodel("http://acplt.org/Submodels/Test", id_short="Test")
+        self.qualifier = Qualifier("Test", datatypes.Int)
+        self.submodel.qualifier.add(self.qualifier)
+        pack = Package()
+        pack.add(self.submodel)
+        self.packModel = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE, PackTreeViewItem(None, None))
+        self.packModel.setData(QModelIndex(), pack, ADD_ITEM_ROLE)
+        packItem, = self.packModel.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        self.model = DetailedInfoTable(packItem)
+
+    def attrIndex(self, attr: str) -> QModelIndex:
+        """Index of the attribute row, found without populating other rows"""
+        for row in range(self.model.rowCount()):
+            index = self.model.index(row, 0)
+            if index.data(Qt.ItemDataRole.DisplayRole) == attr:
+                return index
+        raise KeyError(attr)
+
+    def testOnlyRootIsPopulated(self):
+        qualifierIndex = self.attrIndex("qualifier")
+        self.assertTrue(self.model.hasChildren(qualifierIndex))
+        self.assertTrue(self.model.canFetchMore(qualifierIndex))
+        self.assertEqual(self.model.rowCount(qualifierIndex), 0)
+        self.assertFalse(self.model.hasChildren(self.attrIndex("extension")))
+
+    def testChildrenArePopulatedOnFetch(self):
+        qualifierIndex = self.attrIndex("qualifier")
+        self.model.fetchMore(qualifierIndex)
+        self.assertFalse(self.model.canFetchMore(qualifierIndex))
+        self.assertEqual(self.model.rowCount(qualifierIndex), 1)
+        self.assertIs(self.model.objByIndex(self.model.index(0, 0, qualifierIndex)).obj, self.qualifier)
+
+
+class TestDetailedInfoTableCache(TestCase):
+    def setUp(self) -> None:
+        self.submodels = [Submodel(f"http://acplt.org/Submodels/Test{i}", id_short=f"Test{i}") for i in range(2)]
+        pack = Package()
+        for submodel in self.submodels:
+            pack.add(submodel)
+        self.packModel = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE + ("id_short",), PackTreeViewItem(None, None))
+        self.packModel.setData(QModelIndex(), pack, ADD_ITEM_ROLE)
+        self.cache = DetailedInfoTableCache(maxSize=1)
+
+    def packItem(self, obj) -> QModelIndex:
+        return self.packModel.match(QModelIndex(), OBJECT_ROLE, obj, hits=1)[0]
+
+    def testModelIsReused(self):
+        model = self.cache.model(DetailedInfoTable, self.packItem(self.submodels[0]))
+        # e.g. the same item opened in another tab
+        self.assertIs(self.cache.model(DetailedInfoTable, self.packItem(self.submodels[0])), model)
+
+    def testEvictedModelsAreFreed(self):
+        # freed by reference counting, without waiting for the cycle collector
+        gc.disable()
+        self.addCleanup(gc.enable)
+        model = self.cache.model(DetailedInfoTable, self.packItem(self.submodels[0]))
+        modelRef = weakref.ref(model)
+        del model
+
+        self.cache.model(DetailedInfoTable, self.packItem(self.submodels[1]))
+        self.assertIsNone(modelRef())
+
+    def testEditInPackModelInvalidates(self):
+        packItem = self.packItem(self.submodels[0])
+        model = self.cache.model(DetailedInfoTable, packItem)
+        idShortIndex = packItem.siblingAtColumn(self.packModel.columnCount() - 1)
+        self.assertTrue(self.packModel.setData(idShortIndex, "Renamed", Qt.ItemDataRole.EditRole))
+        self.assertIsNot(self.cache.model(DetailedInfoTable, packItem), model)
+
+    def testFetchedRowsDoNotInvalidate(self):
+        packItem = self.packItem(self.submodels[0])
+        model = self.cache.model(DetailedInfoTable, packItem)
+        self.packModel.fetchMore(packItem)
+        model.fetchAll()
+        self.assertIs(self.cache.model(DetailedInfoTable, packItem), model)
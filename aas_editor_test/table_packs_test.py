@@ -0,0 +1,207 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from PyQt6.QtCore import QModelIndex, Qt
+from basyx.aas.model import Submodel, Property, Qualifier, ModelReference, datatypes
+
+from aas_editor.models import PacksTable, PackTreeViewItem, DetailedInfoTable
+from aas_editor.package import Package
+from aas_editor.settings.app_settings import DEFAULT_COLUMNS_IN_PACKS_TABLE, ADD_ITEM_ROLE, OBJECT_ROLE, \
+    CLEAR_ROW_ROLE, UPDATE_ROLE
+from aas_editor.settings import NOT_GIVEN
+
+SUBMODEL_ID = "http://acplt.org/Submodels/Test"
+
+
+class TestPacksTableSave(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.json")
+        self.submodel = Submodel(SUBMODEL_ID, id_short="Test")
+        self.pack = Package()
+        self.pack.add(self.submodel)
+        self.pack.write(self.file.as_posix())
+
+        self.model = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE + ("id_short",), PackTreeViewItem(None, None))
+        self.model.setData(QModelIndex(), self.pack, ADD_ITEM_ROLE)
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def testEditedColumnIsSaved(self):
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        # the last column shows the id_short
+        index = index.siblingAtColumn(self.model.columnCount() - 1)
+        self.assertTrue(self.model.setData(index, "Renamed", Qt.ItemDataRole.EditRole))
+        self.pack.write()
+
+        readSubmodel = Package(self.file.as_posix()).objStore.get_identifiable(SUBMODEL_ID)
+        self.assertEqual(readSubmodel.id_short, "Renamed")
+
+    def readSubmodel(self) -> Submodel:
+        return Package(self.file.as_posix()).objStore.get_identifiable(SUBMODEL_ID)
+
+    def testAddedAndRemovedChildrenAreSaved(self):
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        self.assertTrue(self.model.setData(index, Property("Added", datatypes.Int, 1), ADD_ITEM_ROLE))
+        self.pack.write()
+        self.assertIsNotNone(self.readSubmodel().get_referable("Added"))
+
+        childIndex, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel.get_referable("Added"), hits=1)
+        self.assertTrue(self.model.setData(childIndex, NOT_GIVEN, CLEAR_ROW_ROLE))
+        self.pack.write()
+        self.assertEqual(len(self.readSubmodel().submodel_element), 0)
+
+    def testChildAddedInDetailsIsSaved(self):
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        details = DetailedInfoTable(index)
+        qualifiersIndex, = details.match(QModelIndex(), Qt.ItemDataRole.DisplayRole, "qualifier", hits=1)
+        self.assertTrue(details.setData(qualifiersIndex, Qualifier("Added", datatypes.Int), ADD_ITEM_ROLE))
+        self.pack.write()
+        self.assertEqual([q.type for q in self.readSubmodel().qualifier], ["Added"])
+
+    def testUpdatedChildIsSaved(self):
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        # objects changed outside of the model, e.g. by dialogs, are reported by an update
+        self.submodel.id_short = "Updated"
+        self.model.setData(index, NOT_GIVEN, UPDATE_ROLE)
+        self.pack.write()
+        self.assertEqual(self.readSubmodel().id_short, "Updated")
+
+    def idIndexInDetails(self) -> QModelIndex:
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        details = DetailedInfoTable(index)
+        idIndex, = details.match(QModelIndex(), Qt.ItemDataRole.DisplayRole, "id", hits=1)
+        return idIndex.siblingAtColumn(1)
+
+    def testEditedIdIsSaved(self):
+        idIndex = self.idIndexInDetails()
+        self.assertTrue(idIndex.model().setData(idIndex, "http://acplt.org/Submodels/Renamed",
+                                                Qt.ItemDataRole.EditRole))
+        # applied right away, so links to the renamed object resolve
+        self.assertIs(self.pack.objStore.get_identifiable("http://acplt.org/Submodels/Renamed"), self.submodel)
+        self.pack.write()
+        readPack = Package(self.file.as_posix())
+        self.assertIsNotNone(readPack.objStore.get_identifiable("http://acplt.org/Submodels/Renamed"))
+        self.assertEqual(readPack.numOfSubmodels, 1)
+
+    def testUsedIdIsRejected(self):
+        other = Submodel("http://acplt.org/Submodels/Other")
+        self.pack.add(other)
+        idIndex = self.idIndexInDetails()
+        self.assertFalse(idIndex.model().setData(idIndex, other.id, Qt.ItemDataRole.EditRole))
+        self.assertEqual(self.submodel.id, SUBMODEL_ID)
+        self.assertIs(self.pack.objStore.get_identifiable(other.id), other)
+
+    def testUsedIdIsRejectedInPackTreeColumns(self):
+        other = Submodel("http://acplt.org/Submodels/Other")
+        self.pack.add(other)
+        model = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE + ("id",), PackTreeViewItem(None, None))
+        model.setData(QModelIndex(), self.pack, ADD_ITEM_ROLE)
+        index, = model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        index = index.siblingAtColumn(model.columnCount() - 1)
+        self.assertFalse(model.setData(index, other.id, Qt.ItemDataRole.EditRole))
+        self.assertEqual(self.submodel.id, SUBMODEL_ID)
+
+    def testLinksAreResolvedThroughPackage(self):
+        prop = Property("Prop", datatypes.Int, 1)
+        self.submodel.submodel_element.add(prop)
+        reference = ModelReference.from_referable(prop)
+        self.assertIs(self.pack.resolveLink(reference), prop)
+        # an edit reported by the model invalidates the resolved links
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, prop, hits=1)
+        self.assertTrue(self.model.setData(index.siblingAtColumn(self.model.columnCount() - 1), "Renamed",
+                                           Qt.ItemDataRole.EditRole))
+        self.assertIsNone(self.pack.resolveLink(reference))
+        self.assertIs(self.pack.resolveLink(ModelReference.from_referable(prop)), prop)
+
+    def testReferencesToOldIdsAreFound(self):
+        other = Submodel("http://acplt.org/Submodels/Other",
+                         semantic_id=ModelReference.from_referable(self.submodel))
+        self.pack.add(other)
+        self.assertEqual(self.pack.referencesToOldIds(), [])
+        oldId = self.submodel.id
+        self.submodel.id = "http://acplt.org/Submodels/Renamed"
+        self.pack.idChanged(self.submodel, oldId)
+        self.assertEqual(self.pack.referencesToOldIds(), [(other, other.semantic_id)])
+
+    def testEditOfDetachedElementInvalidatesOnlyItsSubmodel(self):
+        other = Submodel("http://acplt.org/Submodels/Other")
+        self.pack.add(other)
+        self.model.update(self.model.index(0, 0))
+        element = Property("Element", datatypes.Int, 1)
+        self.submodel.submodel_element.add(element)
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        self.model.update(index)
+
+        # e.g. elements which are not attached yet
+        element.parent = None
+        elementIndex, = self.model.match(QModelIndex(), OBJECT_ROLE, element, hits=1)
+        elementIndex = elementIndex.siblingAtColumn(self.model.columnCount() - 1)
+        cache = self.pack.serializationCache
+        with mock.patch.object(cache, "invalidate", wraps=cache.invalidate) as invalidate:
+            self.assertTrue(self.model.setData(elementIndex, "Renamed", Qt.ItemDataRole.EditRole))
+        invalidate.assert_called_once_with(self.submodel)
+
+
+class TestLazyPopulation(TestCase):
+    def setUp(self) -> None:
+        self.submodel = Submodel(SUBMODEL_ID, id_short="Test")
+        self.submodel.submodel_element.add(Property("Prop", datatypes.Int, 1))
+        self.pack = Package()
+        self.pack.add(self.submodel)
+        self.model = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE, PackTreeViewItem(None, None))
+        self.model.setData(QModelIndex(), self.pack, ADD_ITEM_ROLE)
+        self.packIndex = self.model.index(0, 0)
+
+    def testChildrenArePopulatedOnFetch(self):
+        self.assertTrue(self.model.hasChildren(self.packIndex))
+        self.assertTrue(self.model.canFetchMore(self.packIndex))
+        self.assertEqual(self.model.rowCount(self.packIndex), 0)
+
+        self.model.fetchMore(self.packIndex)
+        self.assertFalse(self.model.canFetchMore(self.packIndex))
+        self.assertGreater(self.model.rowCount(self.packIndex), 0)
+        for row in range(self.model.rowCount(self.packIndex)):
+            # children of the package are populated on their own expand
+            self.assertTrue(self.model.canFetchMore(self.model.index(row, 0, self.packIndex)))
+
+    def testEmptyObjectHasNoChildren(self):
+        self.model.fetchMore(self.packIndex)
+        shellsIndex, = self.model.match(self.packIndex, Qt.ItemDataRole.DisplayRole, "shells", hits=1)
+        self.assertFalse(self.model.hasChildren(shellsIndex))
+
+    def testMatchPopulatesOnTheWay(self):
+        prop = self.submodel.get_referable("Prop")
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, prop, hits=1)
+        self.assertIs(self.model.objByIndex(index).obj, prop)
+        self.assertEqual(self.model.parent(self.model.parent(index)).parent(), self.packIndex)
+
+    def testMatchFetchesOnlyAlongParents(self):
+        other = Submodel("http://acplt.org/Submodels/Other")
+        other.submodel_element.add(Property("OtherProp", datatypes.Int, 1))
+        self.pack.add(other)
+        prop = self.submodel.get_referable("Prop")
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, prop, hits=1)
+        self.assertIs(self.model.objByIndex(index).obj, prop)
+        otherIndex, = self.model.match(QModelIndex(), OBJECT_ROLE, other, hits=1)
+        self.assertTrue(self.model.canFetchMore(otherIndex))
+
+    def testAddedObjectIsPopulatedOnce(self):
+        index, = self.model.match(QModelIndex(), OBJECT_ROLE, self.submodel, hits=1)
+        self.assertTrue(self.model.canFetchMore(index))
+        self.assertTrue(self.model.setData(index, Property("Added", datatypes.Int, 1), ADD_ITEM_ROLE))
+        names = [self.model.index(row, 0, index).data(Qt.ItemDataRole.DisplayRole)
+                 for row in range(self.model.rowCount(index))]
+        self.assertEqual(names, ["Prop", "Added"])
@@ -0,0 +1,381 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import gc
+from unittest import TestCase
+
+from PyQt6.QtCore import QModelIndex, QPersistentModelIndex, Qt
+from PyQt6.QtGui import QFont
+
+from aas_editor.models import DetailedInfoItem, StandardTable, PackTreeViewItem, ItemHandle
+from aas_editor.models.table_standard import MAX_ITEMS_WITH_CACHED_STRINGS
+from aas_editor.settings import NOT_GIVEN
+from aas_editor.settings.app_settings import OBJECT_ROLE, TYPE_ROLE, UNDO_ROLE, REDO_ROLE, \
+    CLEAR_ROW_ROLE, CLEAR_ROWS_ROLE
+
+
+class ItemTable(StandardTable):
+    itemTyp = DetailedInfoItem
+
+
+def table(siblingCount: int) -> StandardTable:
+    """Table with a list item, which has siblingCount list items with one int item each"""
+    root = DetailedInfoItem([[[i] for i in range(siblingCount)]], name="root", new=False)
+    model = ItemTable(("Item", "Value"), root)
+    model.fetchMore(QModelIndex())
+    model.fetchMore(model.index(0, 0))
+    return model
+
+
+def objOf(model: StandardTable, index: QModelIndex):
+    """Object of the index, index.data(OBJECT_ROLE) returns copies of lists"""
+    return model.objByIndex(index).obj
+
+
+class TestChildPositions(TestCase):
+    def testRowsAndParentsAfterRemoval(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        model.removeRows(10, 5, listIndex)
+        self.assertEqual(model.rowCount(listIndex), 95)
+        for row in (0, 9, 10, 50, 94):
+            index = model.index(row, 1, listIndex)
+            self.assertEqual(model.objByIndex(index).row(), row)
+            self.assertEqual(model.parent(index), listIndex)
+
+
+class TestLazyPopulation(TestCase):
+    def testChildrenArePopulatedOnFetch(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        index = model.index(3, 0, listIndex)
+        self.assertTrue(model.hasChildren(index))
+        self.assertTrue(model.canFetchMore(index))
+        self.assertEqual(model.rowCount(index), 0)
+
+        model.fetchMore(index)
+        self.assertFalse(model.canFetchMore(index))
+        self.assertEqual(model.rowCount(index), 1)
+        self.assertEqual(model.objByIndex(model.index(0, 0, index)).obj, 3)
+
+    def testEmptyListHasNoChildren(self):
+        root = DetailedInfoItem([[]], name="root", new=False)
+        model = ItemTable(("Item", "Value"), root)
+        model.fetchMore(QModelIndex())
+        self.assertFalse(model.hasChildren(model.index(0, 0)))
+
+
+class TestItemNodes(TestCase):
+    def testItemsHaveNoInstanceDict(self):
+        model = table(1)
+        model.fetchAll()
+        for item in (model.objByIndex(model.index(0, 0)), PackTreeViewItem(None, None)):
+            self.assertFalse(hasattr(item, "__dict__"), type(item))
+
+    def testRemovedItemIsDetached(self):
+        model = table(3)
+        listIndex = model.index(0, 0)
+        listItem = model.objByIndex(listIndex)
+        item = listItem.child(1)
+        model.removeRows(1, 1, listIndex)
+        self.assertIsNone(item.parent())
+        self.assertNotIn(item, listItem.children())
+
+
+class TestStrings(TestCase):
+    def testEditDropsOnlyStringsOfItemAndAncestors(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        rowIndexes = [model.index(row, 0, listIndex) for row in range(10)]
+        for rowIndex in rowIndexes:
+            model.fetchMore(rowIndex)
+        intIndex = model.index(0, 1, rowIndexes[5])
+        self.assertEqual(intIndex.data(Qt.ItemDataRole.DisplayRole), "5")
+        cached = {id(model.objByIndex(rowIndex)) for rowIndex in rowIndexes[:5]}
+        for rowIndex in rowIndexes:
+            rowIndex.siblingAtColumn(1).data(Qt.ItemDataRole.DisplayRole)
+
+        self.assertTrue(model.setData(intIndex, 42, Qt.ItemDataRole.EditRole))
+        self.assertEqual(model.index(0, 1, rowIndexes[5]).data(Qt.ItemDataRole.DisplayRole), "42")
+        self.assertNotIn(id(model.objByIndex(rowIndexes[5])), model._strings)
+        self.assertTrue(cached <= set(model._strings))
+
+    def testCacheIsBounded(self):
+        model = table(MAX_ITEMS_WITH_CACHED_STRINGS + 100)
+        listIndex = model.index(0, 0)
+        for row in range(model.rowCount(listIndex)):
+            model.index(row, 1, listIndex).data(Qt.ItemDataRole.DisplayRole)
+        self.assertEqual(len(model._strings), MAX_ITEMS_WITH_CACHED_STRINGS)
+
+    def testStringsOfChangedCellsAreDropped(self):
+        model = table(3)
+        listIndex = model.index(0, 0)
+        index = model.index(1, 1, listIndex)
+        index.data(Qt.ItemDataRole.DisplayRole)
+        # e.g. reported by another model, which changed the object
+        model.dataChanged.emit(index, index)
+        self.assertNotIn(id(model.objByIndex(index)), model._strings)
+
+    def testStringsOfRemovedItemsAreDropped(self):
+        model = table(3)
+        listIndex = model.index(0, 0)
+        index = model.index(1, 1, listIndex)
+        index.data(Qt.ItemDataRole.DisplayRole)
+        item = model.objByIndex(index)
+        model.removeRows(1, 1, listIndex)
+        self.assertNotIn(id(item), model._strings)
+
+
+class TestStyles(TestCase):
+    def setUp(self) -> None:
+        self.model = table(3)
+        self.listIndex = self.model.index(0, 0)
+        self.addCleanup(StandardTable.currFont.setPointSize, StandardTable.currFont.pointSize())
+
+    def testCellsShareStyles(self):
+        # data() returns copies, so the shared style is compared
+        style = self.model._getStyle(self.model.index(0, 1, self.listIndex))
+        self.assertIs(self.model._getStyle(self.model.index(1, 1, self.listIndex)), style)
+        self.assertTrue(self.model.index(1, 1, self.listIndex).data(Qt.ItemDataRole.FontRole).italic())
+
+    def testAttributeColumnIsBoldAndUnderlined(self):
+        font = self.model.index(0, 0, self.listIndex).data(Qt.ItemDataRole.FontRole)
+        self.assertTrue(font.bold())
+        self.assertTrue(font.underline())
+
+    def testStylesAreResetOnZoom(self):
+        index = self.model.index(0, 1, self.listIndex)
+        fontSize = index.data(Qt.ItemDataRole.FontRole).pointSize()
+        sizeHint = index.data(Qt.ItemDataRole.SizeHintRole)
+        zoomedFont = QFont(StandardTable.currFont)
+        zoomedFont.setPointSize(fontSize + 4)
+        self.assertTrue(self.model.setData(QModelIndex(), zoomedFont, Qt.ItemDataRole.FontRole))
+        self.assertEqual(index.data(Qt.ItemDataRole.FontRole).pointSize(), fontSize + 4)
+        self.assertGreater(index.data(Qt.ItemDataRole.SizeHintRole).height(), sizeHint.height())
+
+
+class TestMatch(TestCase):
+    def testMatchFindsItemsOfType(self):
+        model = table(3)
+        model.fetchAll()
+        self.assertEqual(len(model.match(QModelIndex(), TYPE_ROLE, int, hits=-1)), 3)
+        self.assertEqual(model.match(QModelIndex(), TYPE_ROLE, int, hits=1),
+                         [model.index(0, 0, model.index(0, 0, model.index(0, 0)))])
+
+    def testMatchFindsItemsOfObjects(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        self.assertEqual(model.match(QModelIndex(), OBJECT_ROLE, lists[42], hits=1),
+                         [model.index(42, 0, listIndex)])
+
+        model.removeRows(0, 2, listIndex)
+        self.assertEqual(model.match(QModelIndex(), OBJECT_ROLE, lists[42], hits=1),
+                         [model.index(40, 0, listIndex)])
+
+    def testReplacedObjectsAreUnindexed(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        rowIndex = model.index(5, 0, listIndex)
+        model.fetchMore(rowIndex)
+        item = model.objByIndex(rowIndex)
+        oldObj = item.obj
+        # objects of items are replaced in place, e.g. by the pack tree
+        item.obj = (-1,)
+        model.removeRows(5, 1, listIndex)
+
+        self.assertEqual(model.match(QModelIndex(), OBJECT_ROLE, oldObj, hits=1), [])
+        self.assertEqual(model.match(QModelIndex(), OBJECT_ROLE, item.obj, hits=1), [])
+        indexedItems = [item for items in model._itemsByType.values() for item in items.values()]
+        self.assertEqual(len(indexedItems), len(list(model.iterItems())) + 1)
+        for item in indexedItems:
+            while item.parent() is not None:
+                item = item.parent()
+            self.assertIs(item, model.objByIndex(QModelIndex()))
+
+
+class TestIncrementalUpdate(TestCase):
+    def testUnchangedRowsAreKept(self):
+        model = table(1000)
+        listIndex = model.index(0, 0)
+        expandedIndex = model.index(10, 0, listIndex)
+        model.fetchMore(expandedIndex)
+        expandedItem = model.objByIndex(expandedIndex)
+
+        lists = objOf(model, listIndex)
+        lists[500] = [-1]
+        del lists[20]
+        model.update(listIndex)
+
+        self.assertEqual(model.rowCount(listIndex), 999)
+        self.assertIs(model.objByIndex(model.index(10, 0, listIndex)), expandedItem)
+        self.assertEqual(model.rowCount(model.index(10, 0, listIndex)), 1)
+        self.assertIs(objOf(model, model.index(499, 0, listIndex)), lists[499])
+        self.assertEqual(model.match(QModelIndex(), OBJECT_ROLE, lists[499], hits=1),
+                         [model.index(499, 0, listIndex)])
+
+    def testPersistentIndexesOfKeptRowsAreKept(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        persistent = QPersistentModelIndex(model.index(8, 1, listIndex))
+        lists = objOf(model, listIndex)
+        del lists[2]
+        lists.insert(0, [-1])
+        model.update(listIndex)
+        self.assertEqual(persistent.row(), 8)
+        self.assertEqual(objOf(model, QModelIndex(persistent).siblingAtColumn(0)), [8])
+
+
+class TestTransaction(TestCase):
+    def testEditsAreUndoneAsOneStep(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        intIndexes = []
+        for row in range(50):
+            rowIndex = model.index(row, 0, listIndex)
+            model.fetchMore(rowIndex)
+            intIndexes.append(model.index(0, 0, rowIndex))
+
+        with model.transaction():
+            for index in intIndexes:
+                self.assertTrue(model.setData(index, -1, Qt.ItemDataRole.EditRole))
+        self.assertEqual(len(model.undo), 1)
+        self.assertEqual([l[0] for l in lists[:50]], [-1] * 50)
+
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual([l[0] for l in lists[:50]], list(range(50)))
+        self.assertEqual(len(model.undo), 0)
+        self.assertEqual(len(model.redo), 1)
+
+        model.setData(QModelIndex(), NOT_GIVEN, REDO_ROLE)
+        self.assertEqual([l[0] for l in lists[:50]], [-1] * 50)
+        self.assertEqual(len(model.undo), 1)
+
+    def testNestedTransactionsAreOneStep(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        intIndexes = []
+        for row in range(2):
+            rowIndex = model.index(row, 0, listIndex)
+            model.fetchMore(rowIndex)
+            intIndexes.append(model.index(0, 0, rowIndex))
+
+        model.beginTransaction()
+        with model.transaction():
+            self.assertTrue(model.setData(intIndexes[0], -1, Qt.ItemDataRole.EditRole))
+        self.assertTrue(model.setData(intIndexes[1], -1, Qt.ItemDataRole.EditRole))
+        model.commit()
+        self.assertEqual(len(model.undo), 1)
+        self.assertEqual(lists[:2], [[-1], [-1]])
+
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(lists[:2], [[0], [1]])
+
+
+class TestAddItems(TestCase):
+    def testItemsAreAddedAndUndoneAsOneStep(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        model.addItems([[i] for i in range(1000)], listIndex)
+        self.assertEqual(model.rowCount(listIndex), 1010)
+        self.assertEqual(len(lists), 1010)
+        self.assertEqual(len(model.undo), 1)
+
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(model.rowCount(listIndex), 10)
+        self.assertEqual(len(lists), 10)
+
+        model.setData(QModelIndex(), NOT_GIVEN, REDO_ROLE)
+        self.assertEqual(model.rowCount(listIndex), 1010)
+        self.assertEqual(len(lists), 1010)
+
+    def testRowsAreRemovedAndRestoredAsOneStep(self):
+        model = table(10)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        self.assertTrue(model.setData(listIndex, (2, 5), CLEAR_ROWS_ROLE))
+        self.assertEqual(lists, [[0], [1], [7], [8], [9]])
+        self.assertEqual(model.rowCount(listIndex), 5)
+        self.assertEqual(len(model.undo), 1)
+
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(model.rowCount(listIndex), 10)
+        self.assertEqual(sorted(lists), [[i] for i in range(10)])
+
+    def testRemovedRowIsRestoredToList(self):
+        model = table(3)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        self.assertTrue(model.setData(model.index(1, 0, listIndex), NOT_GIVEN, CLEAR_ROW_ROLE))
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(len(lists), 3)
+        self.assertEqual(model.rowCount(listIndex), 3)
+
+
+
+class TestUndoJournal(TestCase):
+    def testJournalKeepsMemoryBudget(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        intIndexes = []
+        for row in range(100):
+            rowIndex = model.index(row, 0, listIndex)
+            model.fetchMore(rowIndex)
+            intIndexes.append(model.index(0, 0, rowIndex))
+            model.setData(intIndexes[-1], "x" * 10000, Qt.ItemDataRole.EditRole)
+
+        # the old values of these edits are the large strings
+        model.undo.maxBytes = 100 * 1024
+        for index in intIndexes:
+            model.setData(index, -1, Qt.ItemDataRole.EditRole)
+        self.assertLessEqual(model.undo.numOfBytes, model.undo.maxBytes)
+        self.assertLess(len(model.undo), 100)
+
+    def testUndoAfterRowsBeforeWereRemoved(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        lists = objOf(model, listIndex)
+        edited = lists[50]
+        rowIndex = model.index(50, 0, listIndex)
+        model.fetchMore(rowIndex)
+        model.setData(model.index(0, 0, rowIndex), -1, Qt.ItemDataRole.EditRole)
+        with model.transaction():
+            for _ in range(10):
+                model.setData(model.index(0, 0, listIndex), NOT_GIVEN, CLEAR_ROW_ROLE)
+
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(len(lists), 100)
+        model.setData(QModelIndex(), NOT_GIVEN, UNDO_ROLE)
+        self.assertEqual(edited, [50])
+
+
+class TestItemHandle(TestCase):
+    def testHandlesFollowRowChanges(self):
+        model = table(1000)
+        listIndex = model.index(0, 0)
+        handles = [ItemHandle.ofIndex(model.index(row, 1, listIndex)) for row in range(1000)]
+        obj = objOf(model, handles[500].index())
+        model.removeRows(0, 10, listIndex)
+        self.assertFalse(handles[0].isValid())
+        self.assertEqual(handles[500].index().row(), 490)
+        self.assertEqual(handles[500].index().column(), 1)
+        self.assertIs(objOf(model, handles[500].index()), obj)
+
+    def testHandlesDontKeepRemovedItems(self):
+        model = table(100)
+        listIndex = model.index(0, 0)
+        handle = ItemHandle.ofIndex(model.index(99, 0, listIndex))
+        model.setData(handle.index(), NOT_GIVEN, CLEAR_ROW_ROLE)
+        gc.collect()
+        self.assertIsNone(handle.item)
+        self.assertFalse(handle.isValid())
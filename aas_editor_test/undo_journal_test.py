@@ -0,0 +1,48 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+from unittest import TestCase
+
+from basyx.aas.model import Submodel, Property, datatypes
+
+from aas_editor.undo_journal import UndoJournal, deepSizeOf
+
+
+class TestDeepSizeOf(TestCase):
+    def test_sharedObjectsAreCountedOnce(self):
+        value = "x" * 1000
+        self.assertLess(deepSizeOf([value, value]), 2 * deepSizeOf(value))
+
+    def test_parentsAreNotFollowed(self):
+        submodel = Submodel("http://acplt.org/Submodels/Test",
+                            submodel_element=[Property(f"prop{i}", datatypes.Int, i) for i in range(100)])
+        prop = submodel.get_referable("prop0")
+        self.assertLess(deepSizeOf(prop), deepSizeOf(submodel) / 10)
+
+    def test_limit(self):
+        self.assertEqual(deepSizeOf(["x" * 1000] * 10, limit=100), 100)
+
+
+class TestUndoJournal(TestCase):
+    def test_oldestCommandsAreDropped(self):
+        journal = UndoJournal(100, sizeOf=lambda command, limit: 30)
+        for command in range(5):
+            journal.append(command)
+        self.assertEqual(list(journal), [2, 3, 4])
+        self.assertEqual(journal.numOfBytes, 90)
+
+        self.assertEqual(journal.pop(), 4)
+        self.assertEqual(journal.numOfBytes, 60)
+
+    def test_newestCommandIsKept(self):
+        journal = UndoJournal(100, sizeOf=lambda command, limit: 1000)
+        journal.append(1)
+        journal.append(2)
+        self.assertEqual(list(journal), [2])
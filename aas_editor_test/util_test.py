@@ -19,6 +19,7 @@ import basyx.aas as aas
 import dateutil
 from basyx.aas.model import ModelReference, Reference, Submodel, Referable
 
+from aas_editor.utils.util import longestIncreasingSubsequence
 from aas_editor.utils.util_type import checkType, issubtype, isoftype
 
 
@@ -86,4 +87,10 @@ class TestUtilFuncs(TestCase):
         for typ in test_set:
             typeHint = test_set[typ]
             print("Check", typeHint, type)
-            self.assertTrue(checkType(typ, typeHint))
\ No newline at end of file
+            self.assertTrue(checkType(typ, typeHint))
+
+    def test_longestIncreasingSubsequence(self):
+        self.assertEqual(longestIncreasingSubsequence([]), [])
+        self.assertEqual(longestIncreasingSubsequence([3, 1, 2, 5, 4, 6]), [1, 2, 4, 6])
+        self.assertEqual(longestIncreasingSubsequence([5, 4, 3]), [3])
+        self.assertEqual(longestIncreasingSubsequence([1, 1, 2]), [1, 2])
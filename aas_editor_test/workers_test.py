@@ -0,0 +1,156 @@
+#  Copyright (C) 2021  Igor Garmaev, garmaev@gmx.net
+#
+#  This program is made available under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+#  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+#  A copy of the GNU General Public License is available at http://www.gnu.org/licenses/
+
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+
+from PyQt6.QtCore import QModelIndex, Qt
+from PyQt6.QtWidgets import QApplication
+from basyx.aas.model import Submodel
+
+from aas_editor.models import PacksTable, PackTreeViewItem
+from aas_editor.package import Package
+from aas_editor.settings.app_settings import DEFAULT_COLUMNS_IN_PACKS_TABLE
+from aas_editor.workers import PackageLoader, PackageSaver
+
+SUBMODEL_ID = "http://acplt.org/Submodels/Test"
+
+
+def writePackage(file: Path, *identifiers: str):
+    pack = Package()
+    for identifier in identifiers:
+        pack.add(Submodel(identifier))
+    pack.write(file.as_posix())
+
+
+def runLoader(loader: PackageLoader, cancel=False) -> list:
+    """Run the loader to the end and return the names of the emitted signals"""
+    signals = []
+    loader.loaded.connect(lambda pack: signals.append("loaded"))
+    loader.failed.connect(lambda error, tb: signals.append("failed"))
+    loader.cancelled.connect(lambda: signals.append("cancelled"))
+    if cancel:
+        # cancelled by the first progress report of the reading thread
+        loader.progress.connect(lambda percent: loader.cancel(), Qt.ConnectionType.DirectConnection)
+    loader.start()
+    loader.wait()
+    QApplication.processEvents()
+    return signals
+
+
+class TestPackageLoader(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.json")
+        writePackage(self.file, SUBMODEL_ID)
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def testPackageIsLoaded(self):
+        loader = PackageLoader(self.file)
+        self.assertEqual(runLoader(loader), ["loaded"])
+        self.assertIsNotNone(loader.package.objStore.get_identifiable(SUBMODEL_ID))
+
+    def testLoadingIsCancelled(self):
+        loader = PackageLoader(self.file)
+        self.assertEqual(runLoader(loader, cancel=True), ["cancelled"])
+        self.assertIsNone(loader.package)
+
+    def testMissingFileFails(self):
+        loader = PackageLoader(Path(self.tmpDir.name, "missing.json"))
+        self.assertEqual(runLoader(loader), ["failed"])
+
+
+class TestPackageLoaderInProcess(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.executor.shutdown()
+
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def testPackagesAreLoadedConcurrently(self):
+        files = [Path(self.tmpDir.name, f"test{i}{suffix}") for i, suffix in enumerate((".json", ".xml", ".aasx"))]
+        for i, file in enumerate(files):
+            writePackage(file, f"{SUBMODEL_ID}{i}")
+        loaders = [PackageLoader(file, executor=self.executor) for file in files]
+        for loader in loaders:
+            loader.start()
+        for loader in loaders:
+            loader.wait()
+        for i, loader in enumerate(loaders):
+            self.assertFalse(loader.reportsProgress)
+            self.assertIsNotNone(loader.package.objStore.get_identifiable(f"{SUBMODEL_ID}{i}"))
+
+    def testMissingFileFails(self):
+        loader = PackageLoader(Path(self.tmpDir.name, "missing.json"), executor=self.executor)
+        self.assertEqual(runLoader(loader), ["failed"])
+
+
+class TestLoadingItem(TestCase):
+    def testPlaceholderIsNoEdit(self):
+        model = PacksTable(DEFAULT_COLUMNS_IN_PACKS_TABLE, PackTreeViewItem(None, None))
+        loader = PackageLoader("test.json")
+        editedRows = []
+        model.rowsInserted.connect(lambda *args: editedRows.append(model.fetching))
+        model.rowsRemoved.connect(lambda *args: editedRows.append(model.fetching))
+
+        model.addLoadingItem(loader)
+        self.assertEqual(model.rowCount(), 1)
+        model.removeLoadingItem(loader)
+        self.assertEqual(model.rowCount(), 0)
+        # views skip rows inserted or removed while fetching
+        self.assertEqual(editedRows, [True, True])
+        self.assertEqual(len(model.undo), 0)
+        self.assertEqual(model.match(QModelIndex(), 0, loader), [])
+
+
+class TestPackageSaver(TestCase):
+    def setUp(self) -> None:
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmpDir.name, "test.json")
+        writePackage(self.file, SUBMODEL_ID)
+        self.pack = Package(self.file.as_posix())
+
+    def tearDown(self) -> None:
+        self.tmpDir.cleanup()
+
+    def runSaver(self, saver: PackageSaver) -> list:
+        signals = []
+        saver.saved.connect(lambda: signals.append("saved"))
+        saver.failed.connect(lambda error, tb: signals.append("failed"))
+        saver.start()
+        saver.future.result()
+        QApplication.processEvents()
+        return signals
+
+    def testPackageIsSaved(self):
+        otherId = "http://acplt.org/Submodels/Other"
+        self.pack.add(Submodel(otherId))
+        saver = PackageSaver(self.pack)
+        # edits after the saver was created are not saved
+        self.pack.add(Submodel("http://acplt.org/Submodels/Later"))
+        self.assertEqual(self.runSaver(saver), ["saved"])
+        self.assertEqual({obj.id for obj in Package(self.file.as_posix()).objStore}, {SUBMODEL_ID, otherId})
+
+    def testSaveToUnknownFolderFails(self):
+        saver = PackageSaver(self.pack, Path(self.tmpDir.name, "unknown", "test.json"))
+        self.assertEqual(self.runSaver(saver), ["failed"])
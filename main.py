@@ -10,16 +10,17 @@
 
 import sys
 import logging
+import multiprocessing
 
 from PyQt6 import QtWidgets
 # from aas_editor.utils import exceptionhook
 from PyQt6 import QtWebEngineWidgets
 
-logging.basicConfig(level=logging.INFO, filename="log.log", filemode="w",
-                    format="%(asctime)s | %(levelname)s | %(message)s")
-
 
 def main():
+    # configured here and not on import, so that spawned worker processes don't truncate the log
+    logging.basicConfig(level=logging.INFO, filename="log.log", filemode="w",
+                        format="%(asctime)s | %(levelname)s | %(message)s")
     app = QtWidgets.QApplication(sys.argv)
     from aas_editor.editorApp import EditorApp as CurrentApp
 
@@ -35,4 +36,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # needed for worker processes in the frozen (pyinstaller) app
+    multiprocessing.freeze_support()
     main()